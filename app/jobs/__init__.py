@@ -0,0 +1,3 @@
+"""
+Procesos batch del microservicio (ejecutables con `python -m app.jobs.<job>`)
+"""
@@ -0,0 +1,121 @@
+"""
+Débito automático en bloque de todas las cuotas vencidas.
+
+Selecciona las cuotas pendientes por keyset en lotes y procesa cada lote en
+su propia transacción, con paralelismo acotado. Un lote fallido se reporta y
+no detiene la ejecución.
+
+    python -m app.jobs.auto_debit [--chunk-size 500] [--parallelism 4]
+"""
+
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional
+
+from app.config.settings import settings
+from app.repositories import payment_schedule_repository
+from app.services.payment import payment_service
+from app.utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def iter_due_chunks(session_factory, as_of: datetime, chunk_size: int) -> Iterator[List[int]]:
+    db = session_factory()
+    try:
+        after_id = 0
+        while True:
+            schedule_ids = payment_schedule_repository.get_due_installment_ids(db, as_of, after_id, chunk_size)
+            if not schedule_ids:
+                return
+            yield schedule_ids
+            after_id = schedule_ids[-1]
+    finally:
+        db.close()
+
+
+def _process_chunk(session_factory, schedule_ids: List[int], payment_date: datetime) -> dict:
+    db = session_factory()
+    try:
+        return payment_service.process_automatic_payments(db, schedule_ids, payment_date)
+    finally:
+        db.close()
+
+
+def run(as_of: Optional[datetime] = None, chunk_size: int = settings.AUTO_DEBIT_CHUNK_SIZE,
+        parallelism: int = settings.AUTO_DEBIT_PARALLELISM, session_factory=SessionLocal) -> dict:
+    as_of = as_of or datetime.now()
+    metrics = {
+        "chunks": 0,
+        "failed_chunks": [],
+        "installments_paid": 0,
+        "credits_updated": 0,
+        "amount": Decimal("0"),
+        "elapsed_seconds": 0.0,
+        "installments_per_sec": 0.0
+    }
+    lock = threading.Lock()
+    # Limita los lotes en cola para no leer toda la cartera por adelantado
+    slots = threading.BoundedSemaphore(parallelism * 2)
+    started = time.perf_counter()
+    
+    def on_done(index: int, schedule_ids: List[int], future):
+        slots.release()
+        with lock:
+            metrics["chunks"] += 1
+            error = future.exception()
+            if error is not None:
+                metrics["failed_chunks"].append({
+                    "chunk": index,
+                    "first_id": schedule_ids[0],
+                    "last_id": schedule_ids[-1],
+                    "size": len(schedule_ids),
+                    "error": str(error)
+                })
+                logger.error(f"Lote {index} [{schedule_ids[0]}..{schedule_ids[-1]}] falló: {error}")
+                return
+            result = future.result()
+            metrics["installments_paid"] += result["installments_paid"]
+            metrics["credits_updated"] += result["credits_updated"]
+            metrics["amount"] += result["amount"]
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Lote {index}: {result['installments_paid']} cuotas, "
+                f"{metrics['installments_paid'] / elapsed:,.0f} cuotas/s acumulado"
+            )
+    
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        for index, schedule_ids in enumerate(iter_due_chunks(session_factory, as_of, chunk_size), start=1):
+            slots.acquire()
+            future = executor.submit(_process_chunk, session_factory, schedule_ids, as_of)
+            future.add_done_callback(lambda f, i=index, ids=schedule_ids: on_done(i, ids, f))
+    
+    metrics["elapsed_seconds"] = time.perf_counter() - started
+    if metrics["elapsed_seconds"]:
+        metrics["installments_per_sec"] = metrics["installments_paid"] / metrics["elapsed_seconds"]
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débito automático de las cuotas vencidas")
+    parser.add_argument("--chunk-size", type=int, default=settings.AUTO_DEBIT_CHUNK_SIZE,
+                        help="Cuotas por lote y transacción")
+    parser.add_argument("--parallelism", type=int, default=settings.AUTO_DEBIT_PARALLELISM,
+                        help="Lotes procesados en paralelo")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    metrics = run(chunk_size=args.chunk_size, parallelism=args.parallelism)
+    logger.info(
+        f"Débito automático: {metrics['installments_paid']} cuotas, {metrics['amount']} cobrados, "
+        f"{metrics['installments_per_sec']:,.0f} cuotas/s, {len(metrics['failed_chunks'])} lotes fallidos"
+    )
+
+
+if __name__ == "__main__":
+    main()
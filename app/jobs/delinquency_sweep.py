@@ -0,0 +1,51 @@
+"""
+Barrido nocturno de mora de toda la cartera.
+
+    python -m app.jobs.delinquency_sweep [--chunk-size 10000]
+"""
+
+import argparse
+import logging
+
+from app.config.settings import settings
+from app.services.credit import credit_service
+from app.utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def log_progress(metrics: dict):
+    elapsed = metrics["elapsed_seconds"]
+    rate = metrics["ids_processed"] / elapsed if elapsed else 0.0
+    logger.info(
+        f"Rango {metrics['chunks']}/{metrics['total_chunks']} "
+        f"[{metrics['start_id']}, {metrics['end_id']}): "
+        f"+{metrics['to_delinquent']} en mora, +{metrics['to_active']} al día, "
+        f"{rate:,.0f} ids/s"
+    )
+
+
+def run(chunk_size: int = settings.DELINQUENCY_SWEEP_CHUNK_SIZE) -> dict:
+    db = SessionLocal()
+    try:
+        return credit_service.sweep_delinquency(db, chunk_size, on_chunk=log_progress)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcular la mora de todos los créditos")
+    parser.add_argument("--chunk-size", type=int, default=settings.DELINQUENCY_SWEEP_CHUNK_SIZE,
+                        help="Cantidad de ids por UPDATE")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    metrics = run(args.chunk_size)
+    logger.info(
+        f"Barrido completo: {metrics['to_delinquent']} créditos a mora, "
+        f"{metrics['to_active']} al día en {metrics['elapsed_seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Carga masiva de pagos desde un archivo de conciliación.
+
+    python -m app.jobs.ingest_payments pagos.csv [--format csv] [--report resultado.ndjson]
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from app.config.settings import settings
+from app.services.payment_ingestion import INGESTION_FORMATS, payment_ingestion_service
+from app.utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def run(path: str, fmt: str, chunk_size: int = settings.PAYMENT_INGESTION_CHUNK_SIZE) -> dict:
+    with open(path, "rb") as source:
+        content = source.read()
+    db = SessionLocal()
+    try:
+        return payment_ingestion_service.ingest(db, content, fmt, chunk_size)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registrar pagos en bloque desde CSV o NDJSON")
+    parser.add_argument("path", help="Archivo de conciliación")
+    parser.add_argument("--format", choices=INGESTION_FORMATS,
+                        help="Formato del archivo (por defecto, su extensión)")
+    parser.add_argument("--chunk-size", type=int, default=settings.PAYMENT_INGESTION_CHUNK_SIZE,
+                        help="Filas por transacción")
+    parser.add_argument("--report", help="Ruta del resultado por fila en NDJSON (por defecto, stdout)")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    fmt = args.format or args.path.rsplit(".", 1)[-1].lower()
+    if fmt not in INGESTION_FORMATS:
+        parser.error("indique --format csv o --format ndjson")
+    
+    report = run(args.path, fmt, args.chunk_size)
+    output = open(args.report, "w") if args.report else sys.stdout
+    try:
+        for result in report["results"]:
+            output.write(json.dumps(result, default=str) + "\n")
+    finally:
+        if args.report:
+            output.close()
+    logger.info(
+        f"Carga completa: {report['accepted']} aceptados, {report['rejected']} rechazados, "
+        f"monto {report['total_amount']}, {report['credits_updated']} créditos actualizados"
+    )
+
+
+if __name__ == "__main__":
+    main()
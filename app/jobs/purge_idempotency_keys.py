@@ -0,0 +1,43 @@
+"""
+Limpieza de las Idempotency-Key vencidas (más antiguas que IDEMPOTENCY_TTL_SECONDS).
+
+    python -m app.jobs.purge_idempotency_keys [--chunk-size 10000]
+"""
+
+import argparse
+import logging
+
+from app.config.settings import settings
+from app.services.idempotency import idempotency_service
+from app.utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def log_progress(metrics: dict):
+    elapsed = metrics["elapsed_seconds"]
+    rate = metrics["deleted"] / elapsed if elapsed else 0.0
+    logger.info(f"Lote {metrics['chunks']}: {metrics['deleted']} claves borradas, {rate:,.0f} claves/s")
+
+
+def run(chunk_size: int = settings.IDEMPOTENCY_PURGE_CHUNK_SIZE) -> dict:
+    db = SessionLocal()
+    try:
+        return idempotency_service.purge_expired(db, chunk_size, on_chunk=log_progress)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Borrar las Idempotency-Key vencidas")
+    parser.add_argument("--chunk-size", type=int, default=settings.IDEMPOTENCY_PURGE_CHUNK_SIZE,
+                        help="Cantidad de claves por DELETE")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    metrics = run(args.chunk_size)
+    logger.info(f"Limpieza completa: {metrics['deleted']} claves en {metrics['elapsed_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
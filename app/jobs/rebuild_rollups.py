@@ -0,0 +1,49 @@
+"""
+Reconstrucción de los rollups por crédito (reparación de desvíos).
+
+    python -m app.jobs.rebuild_rollups [--chunk-size 10000] [--credit-id 42 ...]
+"""
+
+import argparse
+import logging
+
+from app.config.settings import settings
+from app.services.credit import credit_service
+from app.utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def log_progress(metrics: dict):
+    elapsed = metrics["elapsed_seconds"]
+    rate = metrics["ids_processed"] / elapsed if elapsed else 0.0
+    logger.info(
+        f"Rango {metrics['chunks']}/{metrics['total_chunks']} "
+        f"[{metrics['start_id']}, {metrics['end_id']}): "
+        f"{metrics['rebuilt']} rollups, {rate:,.0f} ids/s"
+    )
+
+
+def run(chunk_size: int = settings.ROLLUP_REBUILD_CHUNK_SIZE, credit_ids=None) -> dict:
+    db = SessionLocal()
+    try:
+        return credit_service.rebuild_rollups(db, chunk_size, credit_ids, on_chunk=log_progress)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcular los rollups de los créditos")
+    parser.add_argument("--chunk-size", type=int, default=settings.ROLLUP_REBUILD_CHUNK_SIZE,
+                        help="Cantidad de ids por rango")
+    parser.add_argument("--credit-id", type=int, action="append", dest="credit_ids",
+                        help="Reconstruir solo estos créditos (repetible)")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    metrics = run(args.chunk_size, args.credit_ids)
+    logger.info(f"Reconstrucción completa: {metrics['rebuilt']} rollups en {metrics['elapsed_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
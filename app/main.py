@@ -1,17 +1,39 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 
-from app.utils.database import engine, Base
+from app.utils.database import engine, Base, ReadYourWritesMiddleware, all_engines, replica_router
+from app.utils.metrics import CONTENT_TYPE, cache_collector, instrument_engine, pool_collector, registry
+from app.utils.query_stats import SERVER_TIMING_HEADER, QueryStatsMiddleware
+from app.utils.slow_queries import slow_query_log
+from app.utils.pagination import NEXT_CURSOR_HEADER
 from app.config.settings import settings
-from app.routers import credits_router, payments_router
+from app.routers import credits_router, exports_router, payments_router
+from app.services.user import user_service
+from app.services.idempotency import REPLAYED_HEADER, idempotency_service
+from app.utils.security import token_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def cache_stats() -> dict:
+    return {
+        "user_info": user_service.cache_stats(),
+        "tokens": token_cache.stats(),
+        "idempotency": idempotency_service.cache_stats()
+    }
+
+
+if settings.METRICS_ENABLED:
+    for engine_name, metrics_engine in all_engines().items():
+        instrument_engine(metrics_engine, engine_name)
+    registry.add_collector(pool_collector(all_engines))
+    registry.add_collector(cache_collector(cache_stats))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Iniciando Credit Management Service...")
@@ -22,9 +44,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error al crear tablas: {e}")
     
+    await user_service.startup()
+    
     yield
     
     logger.info("Cerrando Credit Management Service...")
+    await user_service.shutdown()
 
 
 app = FastAPI(
@@ -40,10 +65,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER, SERVER_TIMING_HEADER],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
 
 app.include_router(credits_router, prefix="/api/v1", tags=["credits"])
 app.include_router(payments_router, prefix="/api/v1", tags=["payments"])
+app.include_router(exports_router, prefix="/api/v1", tags=["exports"])
 
 
 @app.get("/", tags=["root"])
@@ -61,10 +90,21 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "credit-service",
-        "version": settings.API_VERSION
+        "version": settings.API_VERSION,
+        "caches": cache_stats(),
+        "database": replica_router.stats(),
+        "slow_queries": slow_query_log.stats()
     }
 
 
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.exception_handler(ValueError)
 async def value_error_handler(request: Request, exc: ValueError):
     return JSONResponse(
@@ -4,6 +4,8 @@ from .credit_model import Credit
 from .credit_request_model import CreditRequest
 from .payment_model import Payment
 from .payment_schedule_model import PaymentSchedule
+from .idempotency_model import IdempotencyKey
+from .credit_rollup_model import CreditRollup
 
 __all__ = [
     "CreditStatus",
@@ -11,5 +13,7 @@ __all__ = [
     "CreditRequest",
     "Payment",
     "Credit",
-    "PaymentSchedule"
+    "PaymentSchedule",
+    "IdempotencyKey",
+    "CreditRollup"
 ]
\ No newline at end of file
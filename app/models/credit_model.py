@@ -1,4 +1,4 @@
-from sqlalchemy import UUID, Column, Integer, DateTime, Numeric, Enum
+from sqlalchemy import Uuid, Column, Integer, DateTime, Numeric, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..utils.database import Base
@@ -8,7 +8,7 @@ class Credit(Base):
     __tablename__ = "credits"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(Uuid(as_uuid=False), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     interest_rate = Column(Numeric(5, 2), nullable=False)
     term_months = Column(Integer, nullable=False)
@@ -19,5 +19,11 @@ class Credit(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     approved_at = Column(DateTime(timezone=True), nullable=True)
     
+    __table_args__ = (
+        Index("ix_credits_user_id_id", user_id, id),
+        Index("ix_credits_status_id", status, id),
+        Index("ix_credits_created_at", created_at),
+    )
+    
     payments = relationship("Payment", back_populates="credit", cascade="all, delete-orphan")
     payment_schedule = relationship("PaymentSchedule", back_populates="credit", cascade="all, delete-orphan")
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey
+from sqlalchemy.sql import func
+from ..utils.database import Base
+
+class CreditRollup(Base):
+    """
+    Totales por crédito mantenidos en la misma transacción que los pagos y cuotas.
+
+    Las cuotas vencidas no se almacenan porque cambian con el paso del tiempo:
+    se derivan de `next_due_date` (no hay vencidas si es futura o nula).
+    """
+    __tablename__ = "credit_rollups"
+    
+    credit_id = Column(Integer, ForeignKey("credits.id"), primary_key=True)
+
+    # Pagos en estado PAID
+    payments_count = Column(Integer, nullable=False, default=0)
+    total_paid = Column(Numeric(12, 2), nullable=False, default=0)
+    last_payment_date = Column(DateTime(timezone=True), nullable=True)
+
+    # Calendario de cuotas
+    paid_installments = Column(Integer, nullable=False, default=0)
+    pending_installments = Column(Integer, nullable=False, default=0)
+    paid_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    pending_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    next_due_date = Column(DateTime(timezone=True), nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, DateTime, Text, JSON, Index, UniqueConstraint
+from ..utils.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Text, nullable=False)
+    scope = Column(Text, nullable=False)
+    key = Column(Text, nullable=False)
+    request_hash = Column(Text, nullable=False)
+    # NULL mientras la primera solicitud sigue en proceso
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    # Vencimiento de la reserva en curso: pasado IDEMPOTENCY_LEASE_SECONDS otra solicitud puede tomarla
+    claimed_at = Column(DateTime(timezone=True), nullable=False)
+    # Se completa en la misma transacción que el primer commit del trabajo de la solicitud
+    committed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint(user_id, scope, key, name="uq_idempotency_keys_user_id_scope_key"),
+        Index("ix_idempotency_keys_created_at", created_at),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, Numeric, Enum, Text, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, Numeric, Enum, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..utils.database import Base
@@ -9,14 +9,23 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, index=True)
-
+    
     credit_id = Column(Integer, ForeignKey("credits.id"), nullable=False)
-
+    
     amount = Column(Numeric(10, 2), nullable=False)
     payment_date = Column(DateTime(timezone=True), nullable=False)
     payment_method = Column(Text, nullable=False)
     description = Column(Text, nullable=True)
+    # Referencia del archivo de conciliación (o hash del archivo y fila); evita registrar dos veces una carga
+    external_reference = Column(Text, nullable=True)
     status = Column(Enum(PaymentStatus), default=PaymentStatus.PAID)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        Index("ix_payments_credit_id_id", credit_id, id),
+        Index("ix_payments_created_at_id", created_at, id),
+        Index("ix_payments_payment_date", payment_date),
+        Index("ix_payments_external_reference", external_reference, unique=True),
+    )
+    
     credit = relationship("Credit", back_populates="payments")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, Numeric, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, Numeric, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..utils.database import Base
@@ -19,4 +19,17 @@ class PaymentSchedule(Base):
     paid_date = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Índices parciales: solo las cuotas pendientes, que son las que se consultan en caliente
+    __table_args__ = (
+        Index("ix_payment_schedule_credit_id_installment_number", credit_id, installment_number),
+        Index(
+            "ix_payment_schedule_pending_credit_id", credit_id, installment_number,
+            postgresql_where=is_paid == False, sqlite_where=is_paid == False
+        ),
+        Index(
+            "ix_payment_schedule_pending_due_date", due_date,
+            postgresql_where=is_paid == False, sqlite_where=is_paid == False
+        ),
+    )
+    
     credit = relationship("Credit", back_populates="payment_schedule")
@@ -1,2 +1,4 @@
 from .credit import *
-from .payment import *
\ No newline at end of file
+from .payment import *
+from .rollup import *
+from .idempotency import *
\ No newline at end of file
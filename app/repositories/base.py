@@ -1,6 +1,8 @@
-from typing import List, Optional, Generic, Type, TypeVar, Any
+from typing import Iterator, List, Optional, Generic, Sequence, Type, TypeVar, Any
+from sqlalchemy import Row, Select, select, func
 from sqlalchemy.orm import Session
 from ..utils.database import Base
+from ..utils.pagination import Keyset
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=Any)
@@ -9,41 +11,62 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=Any)
 
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
-    Repositorio base que implementa operaciones CRUD comunes
+    Repositorio base que implementa operaciones CRUD comunes.
+
+    Las consultas se definen en métodos `*_query` que devuelven sentencias
+    `select()`. Los repositorios son síncronos también con DATABASE_ASYNC:
+    las rutas los ejecutan vía `run_db`, que usa `AsyncSession.run_sync`.
+    Los listados admiten paginación por offset o por cursor sobre `id`.
     """
     
     def __init__(self, model: Type[ModelType]):
         self.model = model
+        self.keyset = Keyset(model.id)
+    
+    def get_query(self, id: int) -> Select:
+        return select(self.model).where(self.model.id == id)
+    
+    def get_multi_query(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+        return self.keyset.apply(select(self.model), skip, limit, cursor)
+    
+    def count_query(self) -> Select:
+        return select(func.count()).select_from(self.model)
     
     def get(self, db: Session, id: int) -> Optional[ModelType]:
-        """Obtener un registro por ID"""
-        return db.query(self.model).filter(self.model.id == id).first()
+        """Obtener un registro por ID (sin consulta si ya está en el identity map de la sesión)"""
+        return db.get(self.model, id)
     
-    def get_multi(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelType]:
+    def get_multi(self, db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[ModelType]:
         """Obtener múltiples registros con paginación"""
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return db.scalars(self.get_multi_query(skip, limit, cursor)).all()
+    
+    def build(self, obj_in: CreateSchemaType) -> ModelType:
+        return self.model(**obj_in.dict() if hasattr(obj_in, 'dict') else obj_in)
     
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """Crear un nuevo registro"""
-        db_obj = self.model(**obj_in.dict() if hasattr(obj_in, 'dict') else obj_in)
+        db_obj = self.build(obj_in)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
     
-    def update(self, db: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
-        """Actualizar un registro"""
+    def apply_update(self, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
         update_data = obj_in.dict(exclude_unset=True) if hasattr(obj_in, 'dict') else obj_in
         for field, value in update_data.items():
             setattr(db_obj, field, value)
-        db.add(db_obj)
+        return db_obj
+    
+    def update(self, db: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
+        """Actualizar un registro"""
+        db.add(self.apply_update(db_obj, obj_in))
         db.commit()
         db.refresh(db_obj)
         return db_obj
     
     def remove(self, db: Session, *, id: int) -> bool:
         """Eliminar un registro"""
-        obj = db.query(self.model).get(id)
+        obj = db.get(self.model, id)
         if obj:
             db.delete(obj)
             db.commit()
@@ -52,4 +75,13 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     
     def count(self, db: Session) -> int:
         """Contar todos los registros"""
-        return db.query(self.model).count()
\ No newline at end of file
+        return db.scalar(self.count_query())
+    
+    def stream(self, db: Session, query: Select, batch_size: int = 1000) -> Iterator[Sequence[Row]]:
+        """Recorrer el resultado por lotes con cursor del servidor (yield_per) sin materializarlo"""
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
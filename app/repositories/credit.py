@@ -1,32 +1,77 @@
-from typing import Optional, List
+from decimal import Decimal
+from typing import Dict, Optional, List, Sequence, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
-from ..models import Credit, CreditStatus
+from datetime import datetime
+from sqlalchemy import Select, Update, and_, bindparam, case, desc, exists, func, literal, select, update
+from ..models import Credit, CreditStatus, PaymentSchedule
 from ..schemas import CreditCreate, CreditUpdate
 from .base import BaseRepository
 
 
 class CreditRepository(BaseRepository[Credit, CreditCreate, CreditUpdate]):
     
-    def get_by_user(self, db: Session, user_id: str, skip: int = 0, limit: int = 100) -> List[Credit]:
-        return db.query(Credit).filter(Credit.user_id == user_id).offset(skip).limit(limit).all()
+    def by_user_query(self, user_id: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+        return self.keyset.apply(select(Credit).where(Credit.user_id == user_id), skip, limit, cursor)
     
-    def get_by_status(self, db: Session, status: CreditStatus, skip: int = 0, limit: int = 100) -> List[Credit]:
-        return db.query(Credit).filter(Credit.status == status).offset(skip).limit(limit).all()
+    def by_status_query(self, status: CreditStatus, skip: int = 0, limit: int = 100,
+                        cursor: Optional[str] = None) -> Select:
+        return self.keyset.apply(select(Credit).where(Credit.status == status), skip, limit, cursor)
     
-    def get_active_credits(self, db: Session, user_id: int) -> List[Credit]:
-        return db.query(Credit).filter(
+    def active_credits_query(self, user_id: int) -> Select:
+        return select(Credit).where(
             and_(
                 Credit.user_id == user_id,
                 Credit.status.in_([CreditStatus.ACTIVE, CreditStatus.DELINQUENT])
             )
-        ).all()
+        )
+    
+    def overdue_credits_query(self) -> Select:
+        return select(Credit).where(Credit.status == CreditStatus.DELINQUENT)
+    
+    def recent_credits_query(self, limit: int = 10) -> Select:
+        return select(Credit).order_by(desc(Credit.created_at)).limit(limit)
+    
+    def id_bounds_query(self) -> Select:
+        return select(func.min(Credit.id), func.max(Credit.id))
+    
+    def delinquency_sweep_queries(self, start_id: int, end_id: int, now: datetime) -> Tuple[Update, Update]:
+        """
+        UPDATE en bloque del rango [start_id, end_id): ACTIVE con cuotas vencidas
+        pasa a DELINQUENT y DELINQUENT sin cuotas vencidas vuelve a ACTIVE
+        """
+        has_overdue = exists().where(
+            and_(
+                PaymentSchedule.credit_id == Credit.id,
+                PaymentSchedule.is_paid == False,
+                PaymentSchedule.due_date < now
+            )
+        )
+        in_range = and_(Credit.id >= start_id, Credit.id < end_id)
+        to_delinquent = update(Credit).where(
+            in_range, Credit.status == CreditStatus.ACTIVE, has_overdue
+        ).values(status=CreditStatus.DELINQUENT)
+        to_active = update(Credit).where(
+            in_range, Credit.status == CreditStatus.DELINQUENT, ~has_overdue
+        ).values(status=CreditStatus.ACTIVE)
+        return to_delinquent, to_active
+    
+    def get_by_user(self, db: Session, user_id: str, skip: int = 0, limit: int = 100,
+                    cursor: Optional[str] = None) -> List[Credit]:
+        return db.scalars(self.by_user_query(user_id, skip, limit, cursor)).all()
+    
+    def get_by_status(self, db: Session, status: CreditStatus, skip: int = 0, limit: int = 100,
+                      cursor: Optional[str] = None) -> List[Credit]:
+        return db.scalars(self.by_status_query(status, skip, limit, cursor)).all()
     
-    def get_pending_credits(self, db: Session, skip: int = 0, limit: int = 100) -> List[Credit]:
-        return db.query(Credit).filter(Credit.status == CreditStatus.PENDING).offset(skip).limit(limit).all()
+    def get_active_credits(self, db: Session, user_id: int) -> List[Credit]:
+        return db.scalars(self.active_credits_query(user_id)).all()
+    
+    def get_pending_credits(self, db: Session, skip: int = 0, limit: int = 100,
+                            cursor: Optional[str] = None) -> List[Credit]:
+        return db.scalars(self.by_status_query(CreditStatus.PENDING, skip, limit, cursor)).all()
     
     def get_overdue_credits(self, db: Session) -> List[Credit]:
-        return db.query(Credit).filter(Credit.status == CreditStatus.DELINQUENT).all()
+        return db.scalars(self.overdue_credits_query()).all()
     
     def update_status(self, db: Session, credit_id: int, status: CreditStatus) -> Optional[Credit]:
         credit = self.get(db, credit_id)
@@ -45,7 +90,75 @@ class CreditRepository(BaseRepository[Credit, CreditCreate, CreditUpdate]):
         return credit
     
     def get_recent_credits(self, db: Session, limit: int = 10) -> List[Credit]:
-        return db.query(Credit).order_by(desc(Credit.created_at)).limit(limit).all()
+        return db.scalars(self.recent_credits_query(limit)).all()
+    
+    def decrement_balances_query(self) -> Update:
+        """UPDATE parametrizado (executemany) que descuenta un monto del saldo y salda el crédito en cero"""
+        credits = Credit.__table__
+        new_balance = credits.c.remaining_balance - bindparam("b_amount")
+        return update(credits).where(credits.c.id == bindparam("b_credit_id")).values(
+            remaining_balance=case((new_balance < 0, 0), else_=new_balance),
+            status=case((new_balance <= 0, literal(CreditStatus.PAID, credits.c.status.type)), else_=credits.c.status)
+        )
+    
+    def decrement_balances(self, db: Session, amounts: Dict[int, Decimal]) -> int:
+        """Descontar montos agregados por crédito en una sola sentencia, sin commit"""
+        if not amounts:
+            return 0
+        db.execute(self.decrement_balances_query(), [
+            {"b_credit_id": credit_id, "b_amount": amount} for credit_id, amount in amounts.items()
+        ])
+        return len(amounts)
+    
+    def apply_payment_query(self, credit_id: int, user_id: str, amount: Decimal) -> Update:
+        """
+        Descuento condicional del saldo: el propio UPDATE bloquea la fila y
+        valida dueño, estado y saldo, de modo que pagos concurrentes no se pisan
+        """
+        new_balance = func.round(Credit.remaining_balance - amount, 2)
+        return update(Credit).where(
+            and_(
+                Credit.id == credit_id,
+                Credit.user_id == user_id,
+                Credit.status.in_([CreditStatus.ACTIVE, CreditStatus.DELINQUENT]),
+                Credit.remaining_balance >= amount
+            )
+        ).values(
+            remaining_balance=new_balance,
+            status=case((new_balance <= 0, literal(CreditStatus.PAID, Credit.status.type)), else_=Credit.status)
+        ).returning(Credit.id, Credit.remaining_balance, Credit.status)
+    
+    def apply_payment(self, db: Session, credit_id: int, user_id: str, amount: Decimal):
+        """Aplicar un pago al saldo sin commit; None si el crédito no admite el pago"""
+        return db.execute(
+            self.apply_payment_query(credit_id, user_id, amount),
+            execution_options={"synchronize_session": False}
+        ).first()
+    
+    def payment_targets_query(self, credit_ids: Sequence[int]) -> Select:
+        """Estado y saldo de varios créditos bloqueando sus filas (en orden de id) hasta el commit"""
+        return select(Credit.id, Credit.status, Credit.remaining_balance).where(
+            Credit.id.in_(credit_ids)
+        ).order_by(Credit.id).with_for_update()
+    
+    def get_payment_targets(self, db: Session, credit_ids: Sequence[int]) -> Dict[int, tuple]:
+        """Créditos por id con (id, estado, saldo), bloqueados para aplicar pagos en bloque"""
+        return {row.id: row for row in db.execute(self.payment_targets_query(credit_ids)).all()}
+    
+    def get_id_bounds(self, db: Session) -> Tuple[Optional[int], Optional[int]]:
+        return tuple(db.execute(self.id_bounds_query()).one())
+    
+    def sweep_delinquency(self, db: Session, start_id: int, end_id: int, now: datetime) -> Tuple[int, int]:
+        """Recalcular la mora de un rango de ids en una transacción; devuelve (a mora, al día)"""
+        to_delinquent, to_active = self.delinquency_sweep_queries(start_id, end_id, now)
+        try:
+            delinquent = db.execute(to_delinquent, execution_options={"synchronize_session": False}).rowcount
+            active = db.execute(to_active, execution_options={"synchronize_session": False}).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return delinquent, active
 
 
 credit_repository = CreditRepository(Credit)
\ No newline at end of file
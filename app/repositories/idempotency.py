@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy import Select, and_, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models import IdempotencyKey
+from .base import BaseRepository
+
+
+class IdempotencyRepository(BaseRepository[IdempotencyKey, dict, dict]):
+    
+    def find_query(self, user_id: str, scope: str, key: str, not_before: datetime) -> Select:
+        return select(
+            IdempotencyKey.request_hash,
+            IdempotencyKey.status_code,
+            IdempotencyKey.response_body,
+            IdempotencyKey.claimed_at,
+            IdempotencyKey.committed_at
+        ).where(
+            and_(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.created_at >= not_before
+            )
+        )
+    
+    def find(self, db: Session, user_id: str, scope: str, key: str, not_before: datetime):
+        """Registro vigente de la clave (hash, status_code, body, reserva) leído sin caché de sesión"""
+        # Cierra la transacción previa para ver lo confirmado por otros procesos
+        db.rollback()
+        return db.execute(self.find_query(user_id, scope, key, not_before)).first()
+    
+    def claim(self, db: Session, user_id: str, scope: str, key: str, request_hash: str,
+              not_before: datetime) -> bool:
+        """Reservar la clave; False si otra solicitud vigente ya la tiene"""
+        try:
+            db.execute(delete(IdempotencyKey).where(
+                and_(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at < not_before
+                )
+            ))
+            now = datetime.now()
+            db.execute(insert(IdempotencyKey).values(
+                user_id=user_id, scope=scope, key=key, request_hash=request_hash, created_at=now, claimed_at=now
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+    
+    def take_over(self, db: Session, user_id: str, scope: str, key: str, request_hash: str,
+                  lease_cutoff: datetime) -> bool:
+        """
+        Tomar una reserva abandonada (sin respuesta, sin trabajo confirmado y
+        reservada antes de `lease_cutoff`); False si otra solicitud la tomó antes
+        """
+        result = db.execute(update(IdempotencyKey).where(
+            and_(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.request_hash == request_hash,
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.committed_at.is_(None),
+                IdempotencyKey.claimed_at < lease_cutoff
+            )
+        ).values(claimed_at=datetime.now()))
+        db.commit()
+        return result.rowcount == 1
+    
+    def mark_committed(self, db: Session, user_id: str, scope: str, key: str):
+        """Marcar que el trabajo de la reserva se confirmó (sin commit: va en la transacción del trabajo)"""
+        db.execute(update(IdempotencyKey).where(
+            and_(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None)
+            )
+        ).values(committed_at=datetime.now()))
+    
+    def complete(self, db: Session, user_id: str, scope: str, key: str, status_code: int, body: Any):
+        db.execute(update(IdempotencyKey).where(
+            and_(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key
+            )
+        ).values(status_code=status_code, response_body=body))
+        db.commit()
+    
+    def release(self, db: Session, user_id: str, scope: str, key: str):
+        """
+        Liberar una clave cuya solicitud falló para que pueda reintentarse;
+        si el trabajo ya se confirmó la reserva se conserva
+        """
+        db.rollback()
+        db.execute(delete(IdempotencyKey).where(
+            and_(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.committed_at.is_(None)
+            )
+        ))
+        db.commit()
+    
+    def purge_expired(self, db: Session, not_before: datetime, limit: int) -> int:
+        """Borrar hasta `limit` claves anteriores a `not_before` en una transacción"""
+        expired = select(IdempotencyKey.id).where(
+            IdempotencyKey.created_at < not_before
+        ).order_by(IdempotencyKey.created_at).limit(limit)
+        result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired.scalar_subquery())))
+        db.commit()
+        return result.rowcount
+
+
+idempotency_repository = IdempotencyRepository(IdempotencyKey)
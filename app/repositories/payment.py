@@ -1,56 +1,200 @@
-from typing import Optional, List
+import csv
+import io
+from typing import Optional, List, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import Row, Select, Update, and_, case, delete, func, insert, select, update
 from datetime import datetime
-from ..models import Payment, PaymentSchedule, PaymentStatus
+from ..models import Credit, CreditStatus, Payment, PaymentSchedule, PaymentStatus
 from ..schemas import PaymentRequest, PaymentScheduleUpdate
+from ..utils.pagination import Keyset
 from .base import BaseRepository
+from .rollup import credit_rollup_repository
 
 
 class PaymentRepository(BaseRepository[Payment, PaymentRequest, dict]):
     
-    def get_by_credit(self, db: Session, credit_id: int, skip: int = 0, limit: int = 100) -> List[Payment]:
-        return db.query(Payment).filter(Payment.credit_id == credit_id).offset(skip).limit(limit).all()
+    recent_keyset = Keyset(Payment.created_at, Payment.id, descending=True)
     
-    def get_recent_payments(self, db: Session, skip: int = 0, limit: int = 50) -> List[Payment]:
-        return db.query(Payment).order_by(desc(Payment.created_at)).offset(skip).limit(limit).all()
+    def by_credit_query(self, credit_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+        return self.keyset.apply(select(Payment).where(Payment.credit_id == credit_id), skip, limit, cursor)
     
-    def get_payments_by_date_range(self, db: Session, start_date: datetime, end_date: datetime) -> List[Payment]:
-        return db.query(Payment).filter(
+    def by_user_query(self, user_id: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+        query = select(Payment).join(Credit, Payment.credit_id == Credit.id).where(Credit.user_id == user_id)
+        return self.keyset.apply(query, skip, limit, cursor)
+    
+    def totals_query(self, credit_id: Optional[int] = None, user_id: Optional[str] = None) -> Select:
+        """Cantidad y suma de pagos de un crédito o de todos los créditos de un usuario"""
+        query = select(
+            func.count(Payment.id).label("total_payments"),
+            func.coalesce(func.sum(Payment.amount), 0).label("total_amount")
+        )
+        if credit_id is not None:
+            query = query.where(Payment.credit_id == credit_id)
+        if user_id is not None:
+            query = query.join(Credit, Payment.credit_id == Credit.id).where(Credit.user_id == user_id)
+        return query
+    
+    def recent_payments_query(self, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> Select:
+        return self.recent_keyset.apply(select(Payment), skip, limit, cursor)
+    
+    def date_range_query(self, start_date: datetime, end_date: datetime) -> Select:
+        return select(Payment).where(
             and_(
                 Payment.payment_date >= start_date,
                 Payment.payment_date <= end_date
             )
-        ).all()
+        )
     
-    def get_total_payments_by_credit(self, db: Session, credit_id: int) -> float:
-        result = db.query(Payment).filter(
+    def paid_by_credit_query(self, credit_id: int) -> Select:
+        return select(Payment).where(
             and_(
                 Payment.credit_id == credit_id,
                 Payment.status == PaymentStatus.PAID
             )
-        ).all()
-        return sum(payment.amount for payment in result)
+        )
+    
+    def export_query(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                     status: Optional[PaymentStatus] = None) -> Select:
+        """Columnas de los pagos a exportar, por fecha de pago y estado, en orden de id"""
+        query = select(
+            Payment.id,
+            Payment.credit_id,
+            Payment.amount,
+            Payment.payment_date,
+            Payment.payment_method,
+            Payment.description,
+            Payment.status,
+            Payment.created_at
+        )
+        if start_date is not None:
+            query = query.where(Payment.payment_date >= start_date)
+        if end_date is not None:
+            query = query.where(Payment.payment_date <= end_date)
+        if status is not None:
+            query = query.where(Payment.status == status)
+        return query.order_by(Payment.id)
+    
+    def references_query(self, references: Sequence[str]) -> Select:
+        return select(Payment.external_reference).where(Payment.external_reference.in_(references))
+    
+    def paid_total_query(self, credit_id: int) -> Select:
+        return select(func.coalesce(func.sum(Payment.amount), 0)).where(
+            and_(
+                Payment.credit_id == credit_id,
+                Payment.status == PaymentStatus.PAID
+            )
+        )
+    
+    def get_by_credit(self, db: Session, credit_id: int, skip: int = 0, limit: int = 100,
+                      cursor: Optional[str] = None) -> List[Payment]:
+        return db.scalars(self.by_credit_query(credit_id, skip, limit, cursor)).all()
+    
+    def get_by_user(self, db: Session, user_id: str, skip: int = 0, limit: int = 100,
+                    cursor: Optional[str] = None) -> List[Payment]:
+        return db.scalars(self.by_user_query(user_id, skip, limit, cursor)).all()
+    
+    def get_totals(self, db: Session, credit_id: Optional[int] = None, user_id: Optional[str] = None):
+        return db.execute(self.totals_query(credit_id, user_id)).one()
+    
+    def get_recent_payments(self, db: Session, skip: int = 0, limit: int = 50,
+                            cursor: Optional[str] = None) -> List[Payment]:
+        return db.scalars(self.recent_payments_query(skip, limit, cursor)).all()
+    
+    def existing_references(self, db: Session, references: Sequence[str]) -> set:
+        """Referencias externas ya registradas entre `references`"""
+        if not references:
+            return set()
+        return set(db.scalars(self.references_query(references)).all())
+    
+    def get_payments_by_date_range(self, db: Session, start_date: datetime, end_date: datetime) -> List[Payment]:
+        return db.scalars(self.date_range_query(start_date, end_date)).all()
+    
+    def get_total_payments_by_credit(self, db: Session, credit_id: int) -> float:
+        """Total pagado desde el rollup del crédito o, si no existe, sumado en SQL"""
+        total = credit_rollup_repository.get_total_paid(db, credit_id)
+        if total is None:
+            total = db.scalar(self.paid_total_query(credit_id))
+        return total
+    
+    def create(self, db: Session, *, obj_in: PaymentRequest) -> Payment:
+        """Crear un pago actualizando el rollup del crédito en la misma transacción"""
+        db_obj = self.build(obj_in)
+        db.add(db_obj)
+        db.flush()
+        credit_rollup_repository.add_payments(db, [{
+            "credit_id": db_obj.credit_id,
+            "amount": db_obj.amount,
+            "payment_date": db_obj.payment_date,
+            "status": db_obj.status
+        }])
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+    
+    def insert_returning(self, db: Session, payment: dict) -> Payment:
+        """INSERT ... RETURNING del pago con sus valores por defecto, sin commit"""
+        created = db.scalars(insert(Payment).values(**payment).returning(Payment)).one()
+        credit_rollup_repository.add_payments(db, [payment])
+        return created
+    
+    def bulk_create(self, db: Session, payments: List[dict], commit: bool = True) -> int:
+        """Insertar pagos en bloque (executemany / INSERT multi-fila)"""
+        if not payments:
+            return 0
+        db.execute(insert(Payment), payments)
+        credit_rollup_repository.add_payments(db, payments)
+        if commit:
+            db.commit()
+        return len(payments)
+    
+    def copy_create(self, db: Session, payments: List[dict], commit: bool = True) -> int:
+        """Insertar pagos con COPY en PostgreSQL (psycopg2); en otros motores usa `bulk_create`"""
+        connection = db.connection()
+        if not payments or connection.dialect.driver != "psycopg2":
+            return self.bulk_create(db, payments, commit)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for payment in payments:
+            writer.writerow([
+                payment["credit_id"], payment["amount"], payment["payment_date"].isoformat(),
+                payment["payment_method"], payment.get("description") or "", payment["status"].name,
+                payment.get("external_reference") or ""
+            ])
+        buffer.seek(0)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY payments (credit_id, amount, payment_date, payment_method, description, status, "
+                "external_reference) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+        credit_rollup_repository.add_payments(db, payments)
+        if commit:
+            db.commit()
+        return len(payments)
 
 
 class PaymentScheduleRepository(BaseRepository[PaymentSchedule, dict, PaymentScheduleUpdate]):
     
-    def get_by_credit(self, db: Session, credit_id: int) -> List[PaymentSchedule]:
-        return db.query(PaymentSchedule).filter(
+    def by_credit_query(self, credit_id: int) -> Select:
+        return select(PaymentSchedule).where(
             PaymentSchedule.credit_id == credit_id
-        ).order_by(PaymentSchedule.installment_number).all()
+        ).order_by(PaymentSchedule.installment_number)
     
-    def get_pending_installments(self, db: Session, credit_id: int) -> List[PaymentSchedule]:
-        return db.query(PaymentSchedule).filter(
+    def pending_installments_query(self, credit_id: int) -> Select:
+        return select(PaymentSchedule).where(
             and_(
                 PaymentSchedule.credit_id == credit_id,
                 PaymentSchedule.is_paid == False
             )
-        ).order_by(PaymentSchedule.installment_number).all()
+        ).order_by(PaymentSchedule.installment_number)
     
-    def get_overdue_installments(self, db: Session, credit_id: int = None) -> List[PaymentSchedule]:
+    def overdue_installments_query(self, credit_id: int = None) -> Select:
         today = datetime.now()
-        query = db.query(PaymentSchedule).filter(
+        query = select(PaymentSchedule).where(
             and_(
                 PaymentSchedule.is_paid == False,
                 PaymentSchedule.due_date < today
@@ -58,34 +202,207 @@ class PaymentScheduleRepository(BaseRepository[PaymentSchedule, dict, PaymentSch
         )
         
         if credit_id:
-            query = query.filter(PaymentSchedule.credit_id == credit_id)
+            query = query.where(PaymentSchedule.credit_id == credit_id)
         
-        return query.all()
+        return query
+    
+    def export_query(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                     status: Optional[PaymentStatus] = None, now: Optional[datetime] = None) -> Select:
+        """Columnas de las cuotas a exportar, por vencimiento y estado, en orden de id.
+
+        PAID son las pagadas, PENDING todas las impagas y OVERDUE las impagas vencidas.
+        """
+        query = select(
+            PaymentSchedule.id,
+            PaymentSchedule.credit_id,
+            PaymentSchedule.installment_number,
+            PaymentSchedule.due_date,
+            PaymentSchedule.principal_amount,
+            PaymentSchedule.interest_amount,
+            PaymentSchedule.total_amount,
+            PaymentSchedule.is_paid,
+            PaymentSchedule.paid_date
+        )
+        if start_date is not None:
+            query = query.where(PaymentSchedule.due_date >= start_date)
+        if end_date is not None:
+            query = query.where(PaymentSchedule.due_date <= end_date)
+        if status == PaymentStatus.PAID:
+            query = query.where(PaymentSchedule.is_paid == True)
+        elif status == PaymentStatus.PENDING:
+            query = query.where(PaymentSchedule.is_paid == False)
+        elif status == PaymentStatus.OVERDUE:
+            query = query.where(
+                and_(
+                    PaymentSchedule.is_paid == False,
+                    PaymentSchedule.due_date < (now or datetime.now())
+                )
+            )
+        return query.order_by(PaymentSchedule.id)
+    
+    def due_installment_ids_query(self, as_of: datetime, after_id: int = 0, limit: int = 500) -> Select:
+        """Ids de cuotas pendientes con vencimiento hasta `as_of` de créditos vigentes, por keyset"""
+        return select(PaymentSchedule.id).join(Credit, PaymentSchedule.credit_id == Credit.id).where(
+            and_(
+                PaymentSchedule.is_paid == False,
+                PaymentSchedule.due_date <= as_of,
+                PaymentSchedule.id > after_id,
+                Credit.status.in_([CreditStatus.ACTIVE, CreditStatus.DELINQUENT])
+            )
+        ).order_by(PaymentSchedule.id).limit(limit)
+    
+    def mark_paid_query(self, schedule_ids: Sequence[int], paid_date: datetime) -> Update:
+        """Marcar cuotas pagadas en bloque devolviendo las efectivamente actualizadas"""
+        return update(PaymentSchedule).where(
+            and_(
+                PaymentSchedule.id.in_(schedule_ids),
+                PaymentSchedule.is_paid == False
+            )
+        ).values(is_paid=True, paid_date=paid_date).returning(
+            PaymentSchedule.id,
+            PaymentSchedule.credit_id,
+            PaymentSchedule.installment_number,
+            PaymentSchedule.total_amount
+        )
+    
+    def installment_by_number_query(self, credit_id: int, installment_number: int) -> Select:
+        return select(PaymentSchedule).where(
+            and_(
+                PaymentSchedule.credit_id == credit_id,
+                PaymentSchedule.installment_number == installment_number
+            )
+        )
+    
+    def summary_query(self, credit_id: Optional[int] = None, user_id: Optional[str] = None,
+                      now: Optional[datetime] = None) -> Select:
+        """Conteos y sumas de cuotas pagadas/pendientes/vencidas en una sola fila.
+
+        Filtra por crédito o por todos los créditos de un usuario (subconsulta).
+        """
+        now = now or datetime.now()
+        paid = PaymentSchedule.is_paid == True
+        pending = PaymentSchedule.is_paid == False
+        overdue = and_(pending, PaymentSchedule.due_date < now)
+        amount = PaymentSchedule.total_amount
+        query = select(
+            func.count(PaymentSchedule.id).label("total_installments"),
+            func.count(case((paid, 1))).label("paid_installments"),
+            func.count(case((pending, 1))).label("pending_installments"),
+            func.count(case((overdue, 1))).label("overdue_installments"),
+            func.coalesce(func.sum(case((paid, amount), else_=0)), 0).label("total_paid"),
+            func.coalesce(func.sum(case((pending, amount), else_=0)), 0).label("total_pending"),
+            func.coalesce(func.sum(case((overdue, amount), else_=0)), 0).label("total_overdue")
+        )
+        if credit_id is not None:
+            query = query.where(PaymentSchedule.credit_id == credit_id)
+        if user_id is not None:
+            query = query.where(PaymentSchedule.credit_id.in_(
+                select(Credit.id).where(Credit.user_id == user_id)
+            ))
+        return query
+    
+    def version_query(self, credit_id: int) -> Select:
+        """Versión del crédito y su calendario en una sola fila, para ETags.
+
+        Cambia con los datos del crédito, con cada cuota pagada (conteo y última
+        fecha de pago) y al reemplazar el calendario (ids nuevos).
+        """
+        return select(
+            Credit.user_id,
+            Credit.status,
+            Credit.remaining_balance,
+            Credit.monthly_payment,
+            Credit.updated_at,
+            Credit.approved_at,
+            func.count(PaymentSchedule.id).label("installments"),
+            func.count(case((PaymentSchedule.is_paid == True, 1))).label("paid_installments"),
+            func.max(PaymentSchedule.id).label("last_installment_id"),
+            func.max(PaymentSchedule.paid_date).label("last_paid_date")
+        ).select_from(Credit).outerjoin(
+            PaymentSchedule, PaymentSchedule.credit_id == Credit.id
+        ).where(Credit.id == credit_id).group_by(Credit.id)
+    
+    def get_by_credit(self, db: Session, credit_id: int) -> List[PaymentSchedule]:
+        return db.scalars(self.by_credit_query(credit_id)).all()
+    
+    def get_summary(self, db: Session, credit_id: Optional[int] = None, user_id: Optional[str] = None):
+        return db.execute(self.summary_query(credit_id, user_id)).one()
+    
+    def get_version(self, db: Session, credit_id: int) -> Optional[Row]:
+        return db.execute(self.version_query(credit_id)).first()
+    
+    def get_pending_installments(self, db: Session, credit_id: int) -> List[PaymentSchedule]:
+        return db.scalars(self.pending_installments_query(credit_id)).all()
+    
+    def get_overdue_installments(self, db: Session, credit_id: int = None) -> List[PaymentSchedule]:
+        return db.scalars(self.overdue_installments_query(credit_id)).all()
     
     def mark_as_paid(self, db: Session, schedule_id: int, payment_date: Optional[datetime] = None) -> Optional[PaymentSchedule]:
         schedule = self.get(db, schedule_id)
         if schedule:
+            was_paid = schedule.is_paid
             schedule.is_paid = True
             schedule.paid_date = payment_date or datetime.now()
+            if not was_paid:
+                db.flush()
+                credit_rollup_repository.add_paid_installments(db, [(schedule.credit_id, schedule.total_amount)])
             db.commit()
             db.refresh(schedule)
         return schedule
     
+    def delete_by_credit(self, db: Session, credit_id: int, commit: bool = True) -> int:
+        """Eliminar todas las cuotas de un crédito con un único DELETE"""
+        result = db.execute(
+            delete(PaymentSchedule)
+            .where(PaymentSchedule.credit_id == credit_id)
+            .execution_options(synchronize_session=False)
+        )
+        if commit:
+            db.commit()
+        return result.rowcount
+    
+    def bulk_create(self, db: Session, installments: List[dict], commit: bool = True) -> int:
+        """Insertar cuotas en bloque (executemany / INSERT multi-fila) sin refresh por fila"""
+        if not installments:
+            return 0
+        db.execute(insert(PaymentSchedule), installments)
+        if commit:
+            db.commit()
+        return len(installments)
+    
+    def replace_for_credit(self, db: Session, credit_id: int, installments: List[dict]) -> int:
+        """Reemplazar el calendario de un crédito en una sola transacción"""
+        try:
+            self.delete_by_credit(db, credit_id, commit=False)
+            created = self.bulk_create(db, installments, commit=False)
+            credit_rollup_repository.rebuild(db, credit_ids=[credit_id], commit=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return created
+    
     def get_installment_by_number(self, db: Session, credit_id: int, installment_number: int) -> Optional[PaymentSchedule]:
-        return db.query(PaymentSchedule).filter(
-            and_(
-                PaymentSchedule.credit_id == credit_id,
-                PaymentSchedule.installment_number == installment_number
-            )
-        ).first()
+        return db.scalars(self.installment_by_number_query(credit_id, installment_number)).first()
+    
+    def get_due_installment_ids(self, db: Session, as_of: datetime, after_id: int = 0, limit: int = 500) -> List[int]:
+        return db.scalars(self.due_installment_ids_query(as_of, after_id, limit)).all()
+    
+    def mark_many_as_paid(self, db: Session, schedule_ids: Sequence[int], paid_date: datetime) -> list:
+        """Marcar cuotas pagadas sin commit; las ya pagadas se omiten"""
+        if not schedule_ids:
+            return []
+        paid = db.execute(
+            self.mark_paid_query(schedule_ids, paid_date),
+            execution_options={"synchronize_session": False}
+        ).all()
+        credit_rollup_repository.add_paid_installments(
+            db, [(installment.credit_id, installment.total_amount) for installment in paid]
+        )
+        return paid
     
     def get_next_installment(self, db: Session, credit_id: int) -> Optional[PaymentSchedule]:
-        return db.query(PaymentSchedule).filter(
-            and_(
-                PaymentSchedule.credit_id == credit_id,
-                PaymentSchedule.is_paid == False
-            )
-        ).order_by(PaymentSchedule.installment_number).first()
+        return db.scalars(self.pending_installments_query(credit_id)).first()
 
 
 payment_repository = PaymentRepository(Payment)
@@ -0,0 +1,210 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from sqlalchemy import (
+    Select, and_, bindparam, case, delete, func, insert, literal, or_, select, true, update
+)
+from sqlalchemy.orm import Session
+from ..models import Credit, CreditRollup, Payment, PaymentSchedule, PaymentStatus
+from ..utils.pagination import Keyset
+from .base import BaseRepository
+
+_ROLLUP_COLUMNS = [
+    "credit_id", "payments_count", "total_paid", "last_payment_date",
+    "paid_installments", "pending_installments", "paid_amount", "pending_amount", "next_due_date"
+]
+
+
+class CreditRollupRepository(BaseRepository[CreditRollup, dict, dict]):
+    """
+    Totales por crédito (`credit_rollups`).
+
+    Los repositorios de pagos y cuotas aplican los deltas dentro de su propia
+    transacción; `rebuild` recalcula filas desde las tablas de origen.
+    """
+    
+    def __init__(self, model=CreditRollup):
+        self.model = model
+        self.keyset = Keyset(model.credit_id)
+    
+    def get_query(self, id: int) -> Select:
+        return select(CreditRollup).where(CreditRollup.credit_id == id)
+    
+    def summary_query(self, credit_id: Optional[int] = None, user_id: Optional[str] = None,
+                      now: Optional[datetime] = None) -> Select:
+        """
+        Resumen de uno o todos los créditos de un usuario leído de los rollups.
+
+        No devuelve filas si algún crédito carece de rollup o tiene cuotas
+        vencidas; en ese caso se debe usar la agregación sobre las cuotas.
+        """
+        now = now or datetime.now()
+        rollup = CreditRollup
+        query = select(
+            func.coalesce(func.sum(rollup.paid_installments + rollup.pending_installments), 0).label("total_installments"),
+            func.coalesce(func.sum(rollup.paid_installments), 0).label("paid_installments"),
+            func.coalesce(func.sum(rollup.pending_installments), 0).label("pending_installments"),
+            literal(0).label("overdue_installments"),
+            func.coalesce(func.sum(rollup.paid_amount), 0).label("total_paid"),
+            func.coalesce(func.sum(rollup.pending_amount), 0).label("total_pending"),
+            literal(0).label("total_overdue"),
+            func.coalesce(func.sum(rollup.payments_count), 0).label("total_payments"),
+            func.coalesce(func.sum(rollup.total_paid), 0).label("total_amount")
+        ).select_from(Credit).outerjoin(rollup, rollup.credit_id == Credit.id).having(
+            and_(
+                func.count(Credit.id) == func.count(rollup.credit_id),
+                or_(func.min(rollup.next_due_date).is_(None), func.min(rollup.next_due_date) >= now)
+            )
+        )
+        if credit_id is not None:
+            query = query.where(Credit.id == credit_id)
+        if user_id is not None:
+            query = query.where(Credit.user_id == user_id)
+        return query
+    
+    def total_paid_query(self, credit_id: int) -> Select:
+        return select(CreditRollup.total_paid).where(CreditRollup.credit_id == credit_id)
+    
+    def rebuild_query(self, credit_ids: Optional[Sequence[int]] = None,
+                      id_range: Optional[Tuple[int, int]] = None) -> Select:
+        """Filas de rollup recalculadas desde pagos y cuotas para un conjunto de créditos"""
+        def scope(column):
+            if credit_ids is not None:
+                return column.in_(credit_ids)
+            if id_range is not None:
+                return and_(column >= id_range[0], column < id_range[1])
+            return true()
+        
+        payments = select(
+            Payment.credit_id,
+            func.count(Payment.id).label("payments_count"),
+            func.sum(Payment.amount).label("total_paid"),
+            func.max(Payment.payment_date).label("last_payment_date")
+        ).where(
+            and_(scope(Payment.credit_id), Payment.status == PaymentStatus.PAID)
+        ).group_by(Payment.credit_id).subquery()
+        
+        paid = PaymentSchedule.is_paid == True
+        pending = PaymentSchedule.is_paid == False
+        amount = PaymentSchedule.total_amount
+        schedule = select(
+            PaymentSchedule.credit_id,
+            func.count(case((paid, 1))).label("paid_installments"),
+            func.count(case((pending, 1))).label("pending_installments"),
+            func.sum(case((paid, amount), else_=0)).label("paid_amount"),
+            func.sum(case((pending, amount), else_=0)).label("pending_amount"),
+            func.min(case((pending, PaymentSchedule.due_date))).label("next_due_date")
+        ).where(scope(PaymentSchedule.credit_id)).group_by(PaymentSchedule.credit_id).subquery()
+        
+        return select(
+            Credit.id,
+            func.coalesce(payments.c.payments_count, 0),
+            func.coalesce(payments.c.total_paid, 0),
+            payments.c.last_payment_date,
+            func.coalesce(schedule.c.paid_installments, 0),
+            func.coalesce(schedule.c.pending_installments, 0),
+            func.coalesce(schedule.c.paid_amount, 0),
+            func.coalesce(schedule.c.pending_amount, 0),
+            schedule.c.next_due_date
+        ).outerjoin(payments, payments.c.credit_id == Credit.id).outerjoin(
+            schedule, schedule.c.credit_id == Credit.id
+        ).where(scope(Credit.id))
+    
+    def apply_payments_query(self):
+        rollups = CreditRollup.__table__
+        payment_date = bindparam("b_date", type_=rollups.c.last_payment_date.type)
+        return update(rollups).where(rollups.c.credit_id == bindparam("b_credit_id")).values(
+            payments_count=rollups.c.payments_count + bindparam("b_count"),
+            total_paid=rollups.c.total_paid + bindparam("b_amount"),
+            last_payment_date=case(
+                (or_(rollups.c.last_payment_date.is_(None), rollups.c.last_payment_date < payment_date), payment_date),
+                else_=rollups.c.last_payment_date
+            )
+        )
+    
+    def apply_installments_paid_query(self):
+        rollups = CreditRollup.__table__
+        next_due_date = select(func.min(PaymentSchedule.due_date)).where(
+            and_(
+                PaymentSchedule.credit_id == rollups.c.credit_id,
+                PaymentSchedule.is_paid == False
+            )
+        ).scalar_subquery()
+        return update(rollups).where(rollups.c.credit_id == bindparam("b_credit_id")).values(
+            paid_installments=rollups.c.paid_installments + bindparam("b_count"),
+            pending_installments=rollups.c.pending_installments - bindparam("b_count"),
+            paid_amount=rollups.c.paid_amount + bindparam("b_amount"),
+            pending_amount=rollups.c.pending_amount - bindparam("b_amount"),
+            next_due_date=next_due_date
+        )
+    
+    def get_summary(self, db: Session, credit_id: Optional[int] = None, user_id: Optional[str] = None):
+        """Resumen desde los rollups o None si hay que agregar las cuotas"""
+        return db.execute(self.summary_query(credit_id, user_id)).first()
+    
+    def get_total_paid(self, db: Session, credit_id: int) -> Optional[Decimal]:
+        return db.scalar(self.total_paid_query(credit_id))
+    
+    def add_payments(self, db: Session, payments: Iterable[Mapping]) -> int:
+        """Sumar pagos (dicts con credit_id, amount, payment_date, status) sin commit"""
+        deltas: Dict[int, list] = defaultdict(lambda: [0, Decimal("0"), None])
+        for payment in payments:
+            if payment.get("status", PaymentStatus.PAID) != PaymentStatus.PAID:
+                continue
+            delta = deltas[payment["credit_id"]]
+            delta[0] += 1
+            delta[1] += Decimal(payment["amount"])
+            if delta[2] is None or payment["payment_date"] > delta[2]:
+                delta[2] = payment["payment_date"]
+        if not deltas:
+            return 0
+        db.execute(self.apply_payments_query(), [
+            {"b_credit_id": credit_id, "b_count": count, "b_amount": amount, "b_date": payment_date}
+            for credit_id, (count, amount, payment_date) in deltas.items()
+        ])
+        return len(deltas)
+    
+    def add_paid_installments(self, db: Session, installments: Iterable[Tuple[int, Decimal]]) -> int:
+        """Mover cuotas (credit_id, monto) de pendientes a pagadas sin commit.
+
+        Debe ejecutarse después de marcar las cuotas para recalcular el próximo vencimiento.
+        """
+        deltas: Dict[int, list] = defaultdict(lambda: [0, Decimal("0")])
+        for credit_id, amount in installments:
+            deltas[credit_id][0] += 1
+            deltas[credit_id][1] += amount
+        if not deltas:
+            return 0
+        db.execute(self.apply_installments_paid_query(), [
+            {"b_credit_id": credit_id, "b_count": count, "b_amount": amount}
+            for credit_id, (count, amount) in deltas.items()
+        ])
+        return len(deltas)
+    
+    def rebuild(self, db: Session, credit_ids: Optional[Sequence[int]] = None,
+                id_range: Optional[Tuple[int, int]] = None, commit: bool = True) -> int:
+        """Recalcular los rollups de los créditos indicados (o de todos)"""
+        try:
+            condition = true()
+            if credit_ids is not None:
+                condition = CreditRollup.credit_id.in_(credit_ids)
+            elif id_range is not None:
+                condition = and_(CreditRollup.credit_id >= id_range[0], CreditRollup.credit_id < id_range[1])
+            db.execute(delete(CreditRollup).where(condition))
+            result = db.execute(
+                insert(CreditRollup).from_select(_ROLLUP_COLUMNS, self.rebuild_query(credit_ids, id_range))
+            )
+            if commit:
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result.rowcount
+    
+    def get_rebuilt(self, db: Session, credit_ids: Sequence[int]) -> List[tuple]:
+        """Rollups recalculados sin escribirlos (para detectar desvíos)"""
+        return [tuple(row) for row in db.execute(self.rebuild_query(credit_ids)).all()]
+
+
+credit_rollup_repository = CreditRollupRepository()
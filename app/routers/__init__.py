@@ -1,3 +1,4 @@
 from .credits import router as credits_router
 from .payments import router as payments_router
+from .exports import router as exports_router
 from .deps import get_current_user
\ No newline at end of file
@@ -1,63 +1,62 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.config import settings
-from ..schemas import CreditRequest, CreditResponse, CreditStatusUpdate, MessageResponse
-from ..utils.database import get_db
+from ..schemas import (
+    CreditRequest, CreditResponse, CreditStatusUpdate, MessageResponse,
+    CreditQuoteRequest, CreditQuoteResponse
+)
+from ..utils.database import AnySession, get_read_db, get_session, run_db
 from ..utils.security import verify_token
+from ..utils.pagination import NEXT_CURSOR_HEADER
+from ..utils.metrics import MetricsRoute
+from ..utils.query_stats import query_budget
 from ..services.credit import credit_service
+from ..repositories import credit_repository
 from ..services.user import user_service
-from jose import jwt
+from ..services.idempotency import IDEMPOTENCY_HEADER, idempotency_service
+from .deps import verify_admin
 
-router = APIRouter()
-JWT_SECRET = settings.SECRET_KEY
-JWT_ALGORITHM = settings.ALGORITHM
+router = APIRouter(route_class=MetricsRoute)
 security = HTTPBearer()
 
 
-def verify_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        role = payload.get("role").upper()
-
-        if role != "ADMIN":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Acceso denegado, rol insuficiente"
-            )
-    except jwt.JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido o expirado"
-        )
-    return True
-
 @router.post("/credits/", response_model=CreditResponse, status_code=status.HTTP_201_CREATED)
 async def create_credit_request(
     credit_data: CreditRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
-    Crear nueva solicitud de crédito
+    Crear nueva solicitud de crédito.
+
+    Con `Idempotency-Key` los reintentos devuelven la respuesta original sin repetir el trabajo.
     """
     try:
         user_id = verify_token(credentials.credentials)
-        user_exists = await user_service.validate_user_exists(user_id)
-        if not user_exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Usuario no encontrado"
-            )
-        
-        credit = credit_service.create_credit_request(db, user_id, credit_data)
         
-        return credit
+        async def create():
+            user_exists = await user_service.validate_user_exists(user_id)
+            if not user_exists:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Usuario no encontrado"
+                )
+            
+            return await run_db(db, credit_service.create_credit_request, user_id, credit_data)
         
+        if idempotency_key is not None:
+            return await idempotency_service.execute(
+                db, user_id, "credits.create", idempotency_key, credit_data,
+                create, CreditResponse, status.HTTP_201_CREATED
+            )
+        return await create()
+    
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -67,12 +66,39 @@ async def create_credit_request(
         )
 
 
-@router.get("/credits/", response_model=List[CreditResponse])
+@router.post("/credits/quotes", response_model=CreditQuoteResponse)
+async def quote_credits(
+    quote_data: CreditQuoteRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Cotizar un lote de créditos (monto, tasa, plazo) sin acceder a la base de datos
+    """
+    try:
+        verify_token(credentials.credentials)
+        
+        quotes = credit_service.quote_credits(quote_data.quotes, quote_data.include_schedule)
+        return {"quotes": quotes}
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al cotizar créditos: {str(e)}"
+        )
+
+
+@router.get("/credits/", response_model=List[CreditResponse], dependencies=[Depends(query_budget(1))])
 async def get_user_credits(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (reemplaza a skip)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener créditos del usuario autenticado
@@ -80,9 +106,14 @@ async def get_user_credits(
     try:
         user_id = verify_token(credentials.credentials)
         
-        credits = credit_service.get_user_credits(db, user_id, skip, limit)
+        credits = await run_db(db, credit_service.get_user_credits, user_id, skip, limit, cursor)
+        next_cursor = credit_repository.keyset.next_cursor(credits, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return credits
-        
+    
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -90,11 +121,11 @@ async def get_user_credits(
         )
 
 
-@router.get("/credits/{credit_id}", response_model=CreditResponse)
+@router.get("/credits/{credit_id}", response_model=CreditResponse, dependencies=[Depends(query_budget(1))])
 async def get_credit_by_id(
     credit_id: int,
     credentials: HTTPAuthorizationCredentials =Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener crédito específico por ID
@@ -102,8 +133,7 @@ async def get_credit_by_id(
     try:
         user_id = verify_token(credentials.credentials)
         
-        response = credit_service.get_credit_with_schedule(db, credit_id)
-        credit = response[0]
+        credit = await run_db(db, credit_repository.get, credit_id)
         if not credit:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -119,7 +149,7 @@ async def get_credit_by_id(
             )
         
         return credit
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -134,7 +164,7 @@ async def update_credit_status(
     credit_id: int,
     status_data: CreditStatusUpdate,
     credentials: HTTPAuthorizationCredentials =Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
     """
     Actualizar estado del crédito (solo para administradores)
@@ -150,9 +180,9 @@ async def update_credit_status(
                 detail="Se requieren permisos de administrador"
             )
         
-        credit = credit_service.update_credit_status(db, credit_id, status_data)
+        credit = await run_db(db, credit_service.update_credit_status, credit_id, status_data)
         return credit
-        
+    
     except HTTPException:
         raise
     except ValueError as e:
@@ -168,7 +198,7 @@ async def update_credit_status(
 async def approve_credit(
     credit_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
     """
     Aprobar crédito pendiente (solo para administradores)
@@ -184,9 +214,9 @@ async def approve_credit(
                 detail="Se requieren permisos de administrador"
             )
         
-        credit = credit_service.approve_credit(db, credit_id)
+        credit = await run_db(db, credit_service.approve_credit, credit_id)
         return credit
-        
+    
     except HTTPException:
         raise
     except ValueError as e:
@@ -198,21 +228,19 @@ async def approve_credit(
         )
 
 
-@router.get("/credits/{credit_id}/summary", response_model=dict)
+@router.get("/credits/{credit_id}/summary", response_model=dict, dependencies=[Depends(query_budget(3))])
 async def get_credit_summary(
     credit_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener resumen detallado del crédito
     """
     try:
-        # Verificar token y obtener user_id
-        token_data = verify_token(credentials.credentials)
-        user_id = int(token_data.get("sub") if isinstance(token_data, dict) else token_data)
+        user_id = verify_token(credentials.credentials)
         
-        credit = credit_service.credit_repository.get(db, credit_id)
+        credit = await run_db(db, credit_repository.get, credit_id)
         if not credit:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -220,16 +248,17 @@ async def get_credit_summary(
             )
         
         # Verificar permisos
-        user_info = await user_service.get_user_info(user_id)
+        data = await user_service.get_user_info(user_id)
+        user_info = data.get("data")
         if not user_service.validate_credit_permissions(user_info, credit.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permisos para acceder a este crédito"
             )
         
-        summary = credit_service.calculate_credit_summary(db, credit_id)
+        summary = await run_db(db, credit_service.calculate_credit_summary, credit_id)
         return summary
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -239,11 +268,11 @@ async def get_credit_summary(
         )
 
 
-@router.get("/credits/{credit_id}/check-status", response_model=dict)
+@router.get("/credits/{credit_id}/check-status", response_model=dict, dependencies=[Depends(query_budget(3))])
 async def check_credit_status(
     credit_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
     """
     Verificar y actualizar estado del crédito basado en pagos
@@ -251,7 +280,7 @@ async def check_credit_status(
     try:
         user_id = verify_token(credentials.credentials)
         
-        credit = credit_service.get_credit_with_schedule(db, credit_id)[0]
+        credit = await run_db(db, credit_repository.get, credit_id)
         if not credit:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -266,9 +295,9 @@ async def check_credit_status(
                 detail="No tienes permisos para acceder a este crédito"
             )
         
-        status = credit_service.check_credit_status(db, credit_id)
-        return {"credit_id": credit_id, "current_status": status}
-        
+        current_status = await run_db(db, credit_service.check_credit_status, credit_id)
+        return {"credit_id": credit_id, "current_status": current_status}
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -1,16 +1,13 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from ..utils.database import get_db
-from ..utils.security import verify_token
+from ..utils.security import decode_token, verify_token
 
 
 security = HTTPBearer()
 
 
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
     Dependency para obtener el usuario actual desde el token JWT
@@ -24,4 +21,19 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return int(user_id)
\ No newline at end of file
+    return int(user_id)
+
+
+def verify_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Dependency que exige rol ADMIN en el token JWT
+    """
+    payload = decode_token(credentials.credentials)
+    role = (payload.get("role") or "").upper()
+    
+    if role != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acceso denegado, rol insuficiente"
+        )
+    return True
\ No newline at end of file
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from ..models import PaymentStatus
+from ..services.export import export_service
+from ..utils.export import EXPORT_MEDIA_TYPES
+from ..utils.metrics import MetricsRoute
+from .deps import verify_admin
+
+router = APIRouter(route_class=MetricsRoute, dependencies=[Depends(verify_admin)])
+
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+
+def _streaming_response(chunks, fmt: str, name: str) -> StreamingResponse:
+    filename = f"{name}-{datetime.now():%Y%m%d%H%M%S}.{fmt}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/exports/payments")
+async def export_payments(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN),
+    start_date: Optional[datetime] = Query(None, description="Fecha de pago desde (inclusive)"),
+    end_date: Optional[datetime] = Query(None, description="Fecha de pago hasta (inclusive)"),
+    status_filter: Optional[PaymentStatus] = Query(None, alias="status")
+):
+    """
+    Exportar pagos en NDJSON o CSV (solo para administradores).
+
+    La respuesta se transmite por lotes desde un cursor del servidor.
+    """
+    try:
+        chunks = export_service.export_payments(format, start_date, end_date, status_filter)
+        return _streaming_response(chunks, format, "payments")
+    
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/exports/schedules")
+async def export_schedules(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN),
+    start_date: Optional[datetime] = Query(None, description="Vencimiento desde (inclusive)"),
+    end_date: Optional[datetime] = Query(None, description="Vencimiento hasta (inclusive)"),
+    status_filter: Optional[PaymentStatus] = Query(
+        None, alias="status", description="pagado, pendiente (toda cuota impaga) o vencido"
+    )
+):
+    """
+    Exportar cuotas en NDJSON o CSV (solo para administradores).
+
+    La respuesta se transmite por lotes desde un cursor del servidor.
+    """
+    try:
+        chunks = export_service.export_schedules(format, start_date, end_date, status_filter)
+        return _streaming_response(chunks, format, "schedules")
+    
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
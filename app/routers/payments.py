@@ -1,45 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile, status, Query
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from ..schemas import (
     PaymentRequest, PaymentResponse, PaymentScheduleResponse, 
-    PaymentScheduleUpdate, MessageResponse, CreditWithSchedule
+    PaymentScheduleUpdate, MessageResponse, CreditWithSchedule, PaymentBatchReport
 )
-from ..utils.database import get_db
+from ..utils.database import AnySession, get_read_db, get_session, run_db
 from ..utils.security import verify_token
+from ..utils.pagination import NEXT_CURSOR_HEADER
+from ..utils.http_cache import cache_headers, etag_matches, make_etag
+from ..utils.responses import ListEncoder
+from ..utils.metrics import MetricsRoute
+from ..utils.query_stats import query_budget
+from ..config.settings import settings
 from ..services.payment import payment_service
 from ..services.credit import credit_service
 from ..services.user import user_service
+from ..services.idempotency import IDEMPOTENCY_HEADER, idempotency_service
+from ..services.payment_ingestion import INGESTION_FORMATS, payment_ingestion_service
+from ..repositories import payment_repository, payment_schedule_repository
+from .deps import verify_admin
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 security = HTTPBearer()
 
+# Listados grandes con FAST_JSON_RESPONSES: se codifican sin revalidar cada fila
+payment_list = ListEncoder(PaymentResponse)
+schedule_list = ListEncoder(PaymentScheduleResponse)
+
 
 @router.post("/payments/", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
 async def create_payment(
     payment_data: PaymentRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
-    Registrar un nuevo pago
+    Registrar un nuevo pago.
+
+    Con `Idempotency-Key` los reintentos devuelven la respuesta original sin repetir el pago.
     """
     try:
         user_id = verify_token(credentials.credentials)
         
-        user_exists = await user_service.validate_user_exists(user_id)
-        if not user_exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Usuario no encontrado"
-            )
+        async def create():
+            user_exists = await user_service.validate_user_exists(user_id)
+            if not user_exists:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Usuario no encontrado"
+                )
+            
+            return await run_db(db, payment_service.create_payment, user_id, payment_data)
         
-        payment = payment_service.create_payment(db, user_id, payment_data)
-        return payment
+        if idempotency_key is not None:
+            return await idempotency_service.execute(
+                db, user_id, "payments.create", idempotency_key, payment_data,
+                create, PaymentResponse, status.HTTP_201_CREATED
+            )
+        return await create()
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -49,13 +74,47 @@ async def create_payment(
         )
 
 
-@router.get("/credits/{credit_id}/payments", response_model=List[PaymentResponse])
+@router.post("/payments/batch", response_model=PaymentBatchReport, dependencies=[Depends(verify_admin)])
+async def ingest_payments(
+    file: UploadFile = File(..., description="Archivo de conciliación en CSV o NDJSON"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Por defecto, la extensión del archivo"),
+    db: AnySession = Depends(get_session)
+):
+    """
+    Registrar pagos en bloque desde un archivo de conciliación (solo para administradores).
+
+    Columnas: credit_id, amount, payment_method y opcionales description, payment_date y
+    reference (referencia externa única; por defecto, hash del archivo y número de fila).
+    Devuelve el resultado de cada fila; las rechazadas no impiden registrar el resto y las
+    ya registradas en una carga anterior se rechazan sin duplicarse.
+    """
+    try:
+        fmt = format or (file.filename or "").rsplit(".", 1)[-1].lower()
+        if fmt not in INGESTION_FORMATS:
+            raise ValueError("Indique el formato (csv o ndjson) o use un archivo .csv / .ndjson")
+        
+        content = await file.read()
+        return await run_db(db, payment_ingestion_service.ingest, content, fmt)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al registrar pagos: {str(e)}"
+        )
+
+
+@router.get("/credits/{credit_id}/payments", response_model=List[PaymentResponse],
+            dependencies=[Depends(query_budget(2))])
 async def get_credit_payments(
     credit_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (reemplaza a skip)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener pagos de un crédito específico
@@ -63,7 +122,10 @@ async def get_credit_payments(
     try:
         user_id = verify_token(credentials.credentials)
         
-        payments = payment_service.get_credit_payments(db, user_id, credit_id, skip, limit)
+        payments = await run_db(db, payment_service.get_credit_payments, user_id, credit_id, skip, limit, cursor)
+        next_cursor = payment_repository.keyset.next_cursor(payments, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return payments
         
     except ValueError as e:
@@ -75,12 +137,14 @@ async def get_credit_payments(
         )
 
 
-@router.get("/payments/", response_model=List[PaymentResponse])
+@router.get("/payments/", response_model=List[PaymentResponse], dependencies=[Depends(query_budget(1))])
 async def get_user_payments(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (reemplaza a skip)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener todos los pagos del usuario
@@ -88,9 +152,16 @@ async def get_user_payments(
     try:
         user_id = verify_token(credentials.credentials)
         
-        payments = payment_service.get_user_payments(db, user_id, skip, limit)
+        payments = await run_db(db, payment_service.get_user_payments, user_id, skip, limit, cursor)
+        next_cursor = payment_repository.keyset.next_cursor(payments, limit)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        if settings.FAST_JSON_RESPONSES:
+            return payment_list.response(payments, headers=headers)
+        response.headers.update(headers)
         return payments
         
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -98,11 +169,11 @@ async def get_user_payments(
         )
 
 
-@router.get("/payments/summary", response_model=dict)
+@router.get("/payments/summary", response_model=dict, dependencies=[Depends(query_budget(4))])
 async def get_payment_summary(
     credit_id: int = Query(None, description="ID específico de crédito (opcional)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener resumen de pagos del usuario
@@ -111,7 +182,7 @@ async def get_payment_summary(
         # Verificar token y obtener user_id
         user_id = verify_token(credentials.credentials)
         
-        summary = payment_service.calculate_payment_summary(db, user_id, credit_id)
+        summary = await run_db(db, payment_service.calculate_payment_summary, user_id, credit_id)
         return summary
         
     except Exception as e:
@@ -121,20 +192,25 @@ async def get_payment_summary(
         )
 
 
-@router.get("/credits/{credit_id}/schedule", response_model=List[PaymentScheduleResponse])
+@router.get("/credits/{credit_id}/schedule", response_model=List[PaymentScheduleResponse],
+            dependencies=[Depends(query_budget(2))])
 async def get_payment_schedule(
     credit_id: int,
+    response: Response,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ):
     """
     Obtener calendario de pagos de un crédito
+
+    Responde con `ETag`; si `If-None-Match` coincide devuelve 304 sin cargar el calendario.
     """
     try:
         user_id = verify_token(credentials.credentials)
         
-        credit = credit_service.get_credit_with_schedule(db, credit_id)[0]
-        if not credit:
+        version = await run_db(db, payment_schedule_repository.get_version, credit_id)
+        if not version:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Crédito no encontrado"
@@ -142,14 +218,20 @@ async def get_payment_schedule(
         
         data = await user_service.get_user_info(user_id)
         user_info = data.get('data')
-        print("validateeeeee", user_info)
-        if not user_service.validate_credit_permissions(user_info, credit.user_id):
+        if not user_service.validate_credit_permissions(user_info, version.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permisos para acceder a este crédito"
             )
         
-        schedule = credit_service.get_credit_with_schedule(db, credit_id)[1]
+        headers = cache_headers(make_etag("schedule", *version))
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        schedule = await run_db(db, payment_schedule_repository.get_by_credit, credit_id)
+        if settings.FAST_JSON_RESPONSES:
+            return schedule_list.response(schedule, headers=headers)
+        response.headers.update(headers)
         return schedule
         
     except HTTPException:
@@ -166,7 +248,7 @@ async def update_installment_payment(
     schedule_id: int,
     update_data: PaymentScheduleUpdate,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
     """
     Marcar una cuota específica como pagada
@@ -175,8 +257,8 @@ async def update_installment_payment(
         # Verificar token y obtener user_id
         user_id = verify_token(credentials.credentials)
         
-        schedule = payment_service.mark_installment_as_paid(
-            db, user_id, schedule_id, update_data.paid_date
+        schedule = await run_db(
+            db, payment_service.mark_installment_as_paid, user_id, schedule_id, update_data.paid_date
         )
         return schedule
         
@@ -189,27 +271,41 @@ async def update_installment_payment(
         )
 
 
-@router.get("/credits/{credit_id}/with-schedule", response_model=CreditWithSchedule)
+@router.get("/credits/{credit_id}/with-schedule", response_model=CreditWithSchedule,
+            dependencies=[Depends(query_budget(3))])
 async def get_credit_with_schedule(
     credit_id: int,
+    response: Response,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ):
     """
     Obtener crédito completo con su calendario de pagos
+
+    Responde con `ETag`; si `If-None-Match` coincide devuelve 304 sin cargar el crédito.
     """
     try:
         user_id = verify_token(credentials.credentials)
         
-        credit, schedule = credit_service.get_credit_with_schedule(db, credit_id)
+        version = await run_db(db, payment_schedule_repository.get_version, credit_id)
+        if not version:
+            raise ValueError("Crédito no encontrado")
         
-        user_info = await user_service.get_user_info(user_id)
-        if not user_service.validate_credit_permissions(user_info, credit.user_id):
+        data = await user_service.get_user_info(user_id)
+        user_info = data.get('data')
+        if not user_service.validate_credit_permissions(user_info, version.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permisos para acceder a este crédito"
             )
         
+        headers = cache_headers(make_etag("with-schedule", *version))
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        credit, schedule = await run_db(db, credit_service.get_credit_with_schedule, credit_id)
+        response.headers.update(headers)
         return {
             "credit": credit,
             "payment_schedule": schedule
@@ -230,7 +326,7 @@ async def get_credit_with_schedule(
 async def process_automatic_payment(
     schedule_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
     """
     Procesar pago automático de una cuota vencida (solo administradores)
@@ -247,7 +343,7 @@ async def process_automatic_payment(
                 detail="Se requieren permisos de administrador"
             )
         
-        success = payment_service.process_automatic_payment(db, schedule_id)
+        success = await run_db(db, payment_service.process_automatic_payment, schedule_id)
         if success:
             return MessageResponse(message="Pago automático procesado exitosamente")
         else:
@@ -265,11 +361,12 @@ async def process_automatic_payment(
         )
 
 
-@router.get("/schedule/overdue", response_model=List[PaymentScheduleResponse])
+@router.get("/schedule/overdue", response_model=List[PaymentScheduleResponse],
+            dependencies=[Depends(query_budget(1))])
 async def get_overdue_installments(
     credit_id: int = Query(None, description="ID específico de crédito (opcional)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Obtener cuotas vencidas (solo para administradores)
@@ -284,9 +381,11 @@ async def get_overdue_installments(
                 detail="Se requieren permisos de administrador"
             )
         
-        overdue_installments = payment_service.payment_schedule_repository.get_overdue_installments(
-            db, credit_id
+        overdue_installments = await run_db(
+            db, payment_schedule_repository.get_overdue_installments, credit_id
         )
+        if settings.FAST_JSON_RESPONSES:
+            return schedule_list.response(overdue_installments)
         return overdue_installments
         
     except HTTPException:
@@ -6,16 +6,23 @@ from .credit import (
     CreditCreate,
     CreditStatusUpdate,
     CreditSummary,
-    CreditWithSchedule,
+    CreditQuoteItem,
+    CreditQuoteRequest,
+    CreditQuote,
+    CreditQuoteResponse,
 )
 
 from .payment import (
     PaymentRequest,
+    PaymentBatchRow,
+    PaymentBatchRowResult,
+    PaymentBatchReport,
     PaymentScheduleBase,
     PaymentScheduleCreate,
     PaymentResponse,
     PaymentScheduleResponse,
     PaymentScheduleUpdate,
+    CreditWithSchedule,
 )
 
 from .common import (
@@ -28,13 +35,20 @@ __all__ = [
     "CreditResponse",
     "CreditUpdate",
     "CreditCreate",
-    "CreditWithSchedule"
+    "CreditWithSchedule",
     "CreditStatusUpdate",
     "CreditSummary",
+    "CreditQuoteItem",
+    "CreditQuoteRequest",
+    "CreditQuote",
+    "CreditQuoteResponse",
     "PaymentRequest",
+    "PaymentBatchRow",
+    "PaymentBatchRowResult",
+    "PaymentBatchReport",
     "PaymentResponse",
     "PaymentScheduleBase",
-    "PaymentScheduleUpdate"
+    "PaymentScheduleUpdate",
     "PaymentScheduleCreate",
     "PaymentScheduleResponse",
     "MessageResponse",
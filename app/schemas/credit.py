@@ -15,6 +15,35 @@ class CreditRequest(CreditBase):
     pass
 
 
+class CreditQuoteItem(CreditBase):
+    amount: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2, description="Monto del crédito")
+    interest_rate: Decimal = Field(..., gt=0, le=100, decimal_places=2, description="Tasa de interés anual (%)")
+
+
+class CreditQuoteRequest(BaseModel):
+    quotes: List[CreditQuoteItem] = Field(..., min_length=1, max_length=1000, description="Créditos a cotizar")
+    include_schedule: bool = Field(False, description="Incluir el calendario completo de cada cotización")
+
+
+class QuoteInstallment(BaseModel):
+    installment_number: int
+    principal_amount: Decimal
+    interest_amount: Decimal
+    total_amount: Decimal
+    remaining_balance: Decimal
+
+
+class CreditQuote(CreditBase):
+    monthly_payment: Decimal
+    total_interest: Decimal
+    total_payment: Decimal
+    schedule: Optional[List[QuoteInstallment]] = None
+
+
+class CreditQuoteResponse(BaseModel):
+    quotes: List[CreditQuote]
+
+
 class CreditResponse(CreditBase):
     id: int
     user_id: UUID
@@ -49,16 +78,5 @@ class CreditSummary(BaseModel):
     remaining_balance: Optional[Decimal]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
-
-class CreditWithSchedule(BaseModel):
-    id: int
-    amount: Decimal
-    status: str
-    monthly_payment: Optional[Decimal]
-    remaining_balance: Optional[Decimal]
-    created_at: datetime
-    
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,10 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List, TYPE_CHECKING
+from typing import Optional, List
 from decimal import Decimal
-
-if TYPE_CHECKING:
-    from .credit import CreditResponse
+from .credit import CreditResponse
 
 
 class PaymentBase(BaseModel):
@@ -17,6 +15,32 @@ class PaymentRequest(PaymentBase):
     credit_id: int
 
 
+class PaymentBatchRow(PaymentRequest):
+    payment_date: Optional[datetime] = Field(None, description="Fecha del pago; por defecto la de la carga")
+    reference: Optional[str] = Field(
+        None, min_length=1, max_length=255,
+        description="Referencia externa única del pago; por defecto, hash del archivo y número de fila"
+    )
+
+
+class PaymentBatchRowResult(BaseModel):
+    row: int
+    credit_id: Optional[int] = None
+    amount: Optional[Decimal] = None
+    accepted: bool
+    error: Optional[str] = None
+
+
+class PaymentBatchReport(BaseModel):
+    total_rows: int
+    accepted: int
+    rejected: int
+    total_amount: Decimal
+    credits_updated: int
+    credits_paid: int
+    results: List[PaymentBatchRowResult]
+
+
 class PaymentResponse(PaymentBase):
     id: int
     credit_id: int
@@ -57,7 +81,7 @@ class PaymentScheduleCreate(BaseModel):
 
 
 class CreditWithSchedule(BaseModel):
-    credit: 'CreditResponse'
+    credit: CreditResponse
     payment_schedule: List[PaymentScheduleResponse]
     
     class Config:
@@ -1,3 +1,6 @@
 from .user import *
 from .credit import *
-from .payment import *
\ No newline at end of file
+from .payment import *
+from .idempotency import *
+from .export import *
+from .payment_ingestion import *
\ No newline at end of file
@@ -1,24 +1,52 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
+from typing import Callable, Optional, List, Tuple
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from ..models import Credit, CreditStatus, PaymentSchedule
-from ..schemas import CreditRequest, CreditStatusUpdate
-from ..repositories import credit_repository, payment_schedule_repository
+from ..schemas import CreditRequest, CreditStatusUpdate, CreditQuoteItem
+from ..repositories import credit_repository, credit_rollup_repository, payment_schedule_repository
+from ..utils import amortization
 
 
 class CreditService:
     
     def calculate_monthly_payment(self, principal: Decimal, annual_rate: Decimal, months: int) -> Decimal:
+        return amortization.monthly_payment(principal, annual_rate, months)
+    
+    def quote_credits(self, quotes: List[CreditQuoteItem], include_schedule: bool = False) -> List[dict]:
+        """Cotizar un lote de créditos con el motor vectorizado, sin acceso a base de datos"""
+        batch = amortization.amortize_batch(
+            [(quote.amount, quote.interest_rate, quote.term_months) for quote in quotes]
+        )
+        total_interest = batch.total_interest_cents.tolist()
+        total_payment = batch.total_payment_cents.tolist()
+        monthly_payments = batch.monthly_payment_cents.tolist()
         
-        if annual_rate == 0:
-            return principal / months
-        
-        monthly_rate = annual_rate / 100 / 12
-        power = (1 + monthly_rate) ** months
-        monthly_payment = principal * (monthly_rate * power) / (power - 1)
+        result = []
+        for index, quote in enumerate(quotes):
+            item = {
+                "amount": quote.amount,
+                "interest_rate": quote.interest_rate,
+                "term_months": quote.term_months,
+                "monthly_payment": amortization.from_cents(monthly_payments[index]),
+                "total_interest": amortization.from_cents(total_interest[index]),
+                "total_payment": amortization.from_cents(total_payment[index]),
+            }
+            if include_schedule:
+                item["schedule"] = [
+                    {
+                        "installment_number": number,
+                        "principal_amount": principal,
+                        "interest_amount": interest,
+                        "total_amount": total,
+                        "remaining_balance": balance
+                    }
+                    for number, (principal, interest, total, balance) in enumerate(batch.schedule(index), start=1)
+                ]
+            result.append(item)
         
-        return round(monthly_payment, 2)
+        return result
     
     def create_credit_request(self, db: Session, user_id: str, credit_data: CreditRequest) -> Credit:
         monthly_payment = self.calculate_monthly_payment(
@@ -87,9 +115,9 @@ class CreditService:
         
         return credit
     
-    def get_user_credits(self, db: Session, user_id: str, skip: int = 0, limit: int = 100) -> List[Credit]:
-        print(f"Fetching credits for user_id: {user_id}")
-        return credit_repository.get_by_user(db, user_id, skip, limit)
+    def get_user_credits(self, db: Session, user_id: str, skip: int = 0, limit: int = 100,
+                         cursor: Optional[str] = None) -> List[Credit]:
+        return credit_repository.get_by_user(db, user_id, skip, limit, cursor)
     
     def get_credit_with_schedule(self, db: Session, credit_id: int) -> Tuple[Credit, List[PaymentSchedule]]:
         credit = credit_repository.get(db, credit_id)
@@ -102,40 +130,24 @@ class CreditService:
     
     def generate_payment_schedule(self, db: Session, credit_id: int, principal: Decimal, 
                                 annual_rate: Decimal, months: int, total_credit: Decimal,
-                                monthly_payment: Decimal) -> List[PaymentSchedule]:
+                                monthly_payment: Decimal) -> List[dict]:
         
-        existing_schedule = payment_schedule_repository.get_by_credit(db, credit_id)
-        for installment in existing_schedule:
-            db.delete(installment)
-            db.commit()
-        
-        monthly_rate = annual_rate / 100 / 12
-        remaining_balance = total_credit
-        schedule = []
-        
-        for month in range(1, months + 1):
-            interest_payment = round(remaining_balance * monthly_rate, 2)
-            
-            principal_payment = round(monthly_payment - interest_payment, 2)
-            
-            if month == months:
-                principal_payment = remaining_balance
-            
-            remaining_balance = round(remaining_balance - principal_payment, 2)
-            
-            due_date = datetime.now() + timedelta(days=30 * month)
-            
-            installment_data = {
+        start_date = datetime.now()
+        installments = amortization.installments(total_credit, annual_rate, months, monthly_payment)
+        schedule = [
+            {
                 "credit_id": credit_id,
                 "installment_number": month,
-                "due_date": due_date,
+                "due_date": start_date + timedelta(days=30 * month),
                 "principal_amount": principal_payment,
                 "interest_amount": interest_payment,
-                "total_amount": round(principal_payment + interest_payment, 2)
+                "total_amount": total_payment
             }
-            
-            installment = payment_schedule_repository.create(db, obj_in=installment_data)
-            schedule.append(installment)
+            for month, (principal_payment, interest_payment, total_payment) in enumerate(installments, start=1)
+        ]
+        
+        # Borrado e inserción en bloque dentro de una única transacción
+        payment_schedule_repository.replace_for_credit(db, credit_id, schedule)
         
         return schedule
     
@@ -149,40 +161,114 @@ class CreditService:
         
         overdue_installments = payment_schedule_repository.get_overdue_installments(db, credit_id)
         
-        if overdue_installments:
-            credit.status = CreditStatus.DELINQUENT
-        else:
-            credit.status = CreditStatus.ACTIVE
+        new_status = CreditStatus.DELINQUENT if overdue_installments else CreditStatus.ACTIVE
+        credit.status = new_status
         
         db.commit()
-        return credit.status.value
+        # El commit expira la instancia; leer credit.status volvería a consultar
+        return new_status.value
+    
+    def sweep_delinquency(self, db: Session, chunk_size: int = 10000, now: Optional[datetime] = None,
+                          on_chunk: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Recalcular la mora de toda la cartera por rangos de id.
+
+        Cada rango se resuelve con dos UPDATE en bloque y su propio commit, de
+        modo que una ejecución interrumpida conserva los rangos ya procesados.
+        `on_chunk` recibe las métricas acumuladas después de cada rango.
+        """
+        now = now or datetime.now()
+        min_id, max_id = credit_repository.get_id_bounds(db)
+        metrics = {
+            "chunks": 0,
+            "total_chunks": 0,
+            "ids_processed": 0,
+            "to_delinquent": 0,
+            "to_active": 0,
+            "elapsed_seconds": 0.0
+        }
+        if min_id is None:
+            return metrics
+        
+        metrics["total_chunks"] = (max_id - min_id) // chunk_size + 1
+        started = time.perf_counter()
+        for start_id in range(min_id, max_id + 1, chunk_size):
+            end_id = min(start_id + chunk_size, max_id + 1)
+            delinquent, active = credit_repository.sweep_delinquency(db, start_id, end_id, now)
+            
+            metrics["chunks"] += 1
+            metrics["ids_processed"] = end_id - min_id
+            metrics["to_delinquent"] += delinquent
+            metrics["to_active"] += active
+            metrics["elapsed_seconds"] = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(dict(metrics, start_id=start_id, end_id=end_id))
+        
+        return metrics
+    
+    def rebuild_rollups(self, db: Session, chunk_size: int = 10000, credit_ids: Optional[List[int]] = None,
+                        on_chunk: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Recalcular los rollups desde pagos y cuotas para reparar desvíos.
+
+        Sin `credit_ids` recorre toda la cartera por rangos de id, con un
+        commit por rango.
+        """
+        metrics = {
+            "chunks": 0,
+            "total_chunks": 0,
+            "ids_processed": 0,
+            "rebuilt": 0,
+            "elapsed_seconds": 0.0
+        }
+        started = time.perf_counter()
+        if credit_ids is not None:
+            metrics["chunks"] = metrics["total_chunks"] = 1
+            metrics["ids_processed"] = len(credit_ids)
+            metrics["rebuilt"] = credit_rollup_repository.rebuild(db, credit_ids=credit_ids)
+            metrics["elapsed_seconds"] = time.perf_counter() - started
+            return metrics
+        
+        min_id, max_id = credit_repository.get_id_bounds(db)
+        if min_id is None:
+            return metrics
+        
+        metrics["total_chunks"] = (max_id - min_id) // chunk_size + 1
+        for start_id in range(min_id, max_id + 1, chunk_size):
+            end_id = min(start_id + chunk_size, max_id + 1)
+            rebuilt = credit_rollup_repository.rebuild(db, id_range=(start_id, end_id))
+            
+            metrics["chunks"] += 1
+            metrics["ids_processed"] = end_id - min_id
+            metrics["rebuilt"] += rebuilt
+            metrics["elapsed_seconds"] = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(dict(metrics, start_id=start_id, end_id=end_id))
+        
+        return metrics
     
     def calculate_credit_summary(self, db: Session, credit_id: int) -> dict:
         credit = credit_repository.get(db, credit_id)
         if not credit:
             raise ValueError("Crédito no encontrado")
         
-        schedule = payment_schedule_repository.get_by_credit(db, credit_id)
-        paid_installments = [i for i in schedule if i.is_paid]
-        pending_installments = [i for i in schedule if not i.is_paid]
-        overdue_installments = [i for i in pending_installments if i.due_date < datetime.now()]
-        
-        total_paid = sum(i.total_amount for i in paid_installments)
-        total_pending = sum(i.total_amount for i in pending_installments)
-        total_overdue = sum(i.total_amount for i in overdue_installments)
+        # Lectura por clave primaria del rollup; agregación de cuotas si hay vencidas o falta el rollup
+        totals = (
+            credit_rollup_repository.get_summary(db, credit_id)
+            or payment_schedule_repository.get_summary(db, credit_id)
+        )
         
         return {
             "credit_id": credit_id,
             "total_credit": float(credit.amount),
             "remaining_balance": float(credit.remaining_balance or 0),
-            "total_paid": float(total_paid),
-            "total_pending": float(total_pending),
-            "total_overdue": float(total_overdue),
-            "paid_installments": len(paid_installments),
-            "pending_installments": len(pending_installments),
-            "overdue_installments": len(overdue_installments),
-            "total_installments": len(schedule)
+            "total_paid": float(totals.total_paid),
+            "total_pending": float(totals.total_pending),
+            "total_overdue": float(totals.total_overdue),
+            "paid_installments": totals.paid_installments,
+            "pending_installments": totals.pending_installments,
+            "overdue_installments": totals.overdue_installments,
+            "total_installments": totals.total_installments
         }
 
-
 credit_service = CreditService()
\ No newline at end of file
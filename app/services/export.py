@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models import PaymentStatus
+from ..repositories import payment_repository, payment_schedule_repository
+from ..utils.database import replica_router
+from ..utils.export import csv_chunks, ndjson_chunks
+
+_WRITERS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+}
+
+
+class ExportService:
+    """
+    Exportaciones masivas de pagos y cuotas.
+
+    Cada exportación abre su propia sesión síncrona de lectura (réplica si hay),
+    ya que el cuerpo se genera después de que el endpoint retorna, y la recorre
+    con un cursor del servidor por lotes de `EXPORT_BATCH_SIZE`.
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session] = replica_router.session):
+        self.session_factory = session_factory
+    
+    def _validate(self, fmt: str, start_date: Optional[datetime], end_date: Optional[datetime]):
+        if fmt not in _WRITERS:
+            raise ValueError(f"Formato inválido. Formatos válidos: {', '.join(_WRITERS)}")
+        if start_date and end_date and start_date > end_date:
+            raise ValueError("La fecha inicial no puede ser posterior a la final")
+    
+    def _stream(self, query: Select, fmt: str, batch_size: int) -> Iterator[bytes]:
+        columns = [column.key for column in query.selected_columns]
+        db = self.session_factory()
+        try:
+            yield from _WRITERS[fmt](columns, payment_repository.stream(db, query, batch_size))
+        finally:
+            db.close()
+    
+    def export_payments(self, fmt: str = "ndjson", start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None, status: Optional[PaymentStatus] = None,
+                        batch_size: int = settings.EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+        """Generador de bytes con los pagos filtrados por fecha de pago y estado"""
+        self._validate(fmt, start_date, end_date)
+        return self._stream(payment_repository.export_query(start_date, end_date, status), fmt, batch_size)
+    
+    def export_schedules(self, fmt: str = "ndjson", start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None, status: Optional[PaymentStatus] = None,
+                         batch_size: int = settings.EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+        """Generador de bytes con las cuotas filtradas por vencimiento y estado"""
+        self._validate(fmt, start_date, end_date)
+        return self._stream(payment_schedule_repository.export_query(start_date, end_date, status), fmt, batch_size)
+
+
+export_service = ExportService()
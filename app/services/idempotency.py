@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..repositories import idempotency_repository
+from ..utils.cache import MISSING, SingleFlight, TTLCache
+from ..utils.database import AnySession, run_db
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+_POLL_INTERVAL_SECONDS = 0.05
+# Reserva en curso de la sesión: (usuario, scope, clave), la consume `_mark_claim_committed`
+_CLAIM_KEY = "idempotency_claim"
+
+# (hash de la solicitud, status_code, cuerpo JSON)
+StoredResponse = Tuple[str, int, Any]
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_claim_committed(session: Session):
+    # El primer commit del trabajo marca la reserva en la misma transacción
+    claim = session.info.pop(_CLAIM_KEY, None)
+    if claim is not None:
+        idempotency_repository.mark_committed(session, *claim)
+
+
+class IdempotencyService:
+    """
+    Respuestas de POST reutilizables por `Idempotency-Key`.
+
+    La tabla `idempotency_keys` es la fuente de verdad compartida entre
+    instancias; una caché local evita la consulta en reintentos inmediatos y
+    las solicitudes concurrentes con la misma clave esperan a la primera.
+    Una reserva sin respuesta vence a los IDEMPOTENCY_LEASE_SECONDS y otra
+    solicitud puede tomarla, salvo que el trabajo ya se haya confirmado.
+    """
+    
+    def __init__(self):
+        self.cache = TTLCache(maxsize=settings.IDEMPOTENCY_CACHE_MAXSIZE, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+        self._inflight = SingleFlight()
+    
+    @staticmethod
+    def request_hash(payload: BaseModel) -> str:
+        body = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(body.encode()).hexdigest()
+    
+    async def execute(self, db: AnySession, user_id: str, scope: str, key: str, payload: BaseModel,
+                      handler: Callable[[], Awaitable[Any]], response_model: Type[BaseModel],
+                      status_code: int = status.HTTP_200_OK) -> JSONResponse:
+        """Ejecutar `handler` una sola vez por (usuario, scope, clave) y repetir su respuesta"""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"
+            )
+        
+        request_hash = self.request_hash(payload)
+        cache_key = (user_id, scope, key)
+        stored = self.cache.get(cache_key)
+        replayed = True
+        if stored is MISSING:
+            executed_here = False
+            
+            async def loader():
+                nonlocal executed_here
+                executed_here = True
+                return await self._load_or_execute(
+                    db, user_id, scope, key, request_hash, handler, response_model, status_code
+                )
+            
+            stored, executed = await self._inflight.run(cache_key, loader)
+            replayed = not (executed_here and executed)
+        
+        stored_hash, stored_status, body = stored
+        self._check_hash(stored_hash, request_hash)
+        headers = {REPLAYED_HEADER: "true"} if replayed else None
+        return JSONResponse(status_code=stored_status, content=body, headers=headers)
+    
+    async def _load_or_execute(self, db: AnySession, user_id: str, scope: str, key: str, request_hash: str,
+                               handler: Callable[[], Awaitable[Any]], response_model: Type[BaseModel],
+                               status_code: int) -> Tuple[StoredResponse, bool]:
+        cache_key = (user_id, scope, key)
+        not_before = datetime.now() - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS
+        
+        while True:
+            row = await run_db(db, idempotency_repository.find, user_id, scope, key, not_before)
+            if row is not None:
+                self._check_hash(row.request_hash, request_hash)
+                if row.status_code is not None:
+                    stored = (row.request_hash, row.status_code, row.response_body)
+                    self.cache.set(cache_key, stored)
+                    return stored, False
+                lease_cutoff = datetime.now() - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+                if row.claimed_at < lease_cutoff:
+                    if row.committed_at is not None:
+                        # El trabajo se confirmó pero la respuesta no llegó a guardarse
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail="La solicitud con esta Idempotency-Key se aplicó pero su respuesta no "
+                                   "se guardó; consulte el recurso antes de reintentar con otra clave"
+                        )
+                    # La reserva venció sin trabajo confirmado: el proceso que la tenía se perdió
+                    if await run_db(db, idempotency_repository.take_over, user_id, scope, key, request_hash,
+                                    lease_cutoff):
+                        break
+                    continue
+                # Otra instancia procesa la misma clave: esperar su respuesta
+                if time.monotonic() >= deadline:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="Una solicitud con la misma Idempotency-Key sigue en proceso"
+                    )
+                await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+                continue
+            if await run_db(db, idempotency_repository.claim, user_id, scope, key, request_hash, not_before):
+                break
+        
+        db.info[_CLAIM_KEY] = cache_key
+        try:
+            result = await handler()
+            body = response_model.model_validate(result).model_dump(mode="json")
+        except BaseException:
+            # Los errores no se guardan: el cliente puede reintentar con la misma clave
+            db.info.pop(_CLAIM_KEY, None)
+            await run_db(db, idempotency_repository.release, user_id, scope, key)
+            raise
+        
+        db.info.pop(_CLAIM_KEY, None)
+        await run_db(db, idempotency_repository.complete, user_id, scope, key, status_code, body)
+        stored = (request_hash, status_code, body)
+        self.cache.set(cache_key, stored)
+        return stored, True
+    
+    @staticmethod
+    def _check_hash(stored_hash: str, request_hash: str):
+        if stored_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="La Idempotency-Key ya se usó con una solicitud distinta"
+            )
+    
+    def purge_expired(self, db: Session, chunk_size: int = settings.IDEMPOTENCY_PURGE_CHUNK_SIZE,
+                      as_of: Optional[datetime] = None,
+                      on_chunk: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Borrar las claves vencidas (más antiguas que IDEMPOTENCY_TTL_SECONDS)
+        en lotes de `chunk_size`, una transacción por lote. `claim` ya las
+        ignora; esto solo evita que la tabla crezca sin límite.
+        """
+        not_before = (as_of or datetime.now()) - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        metrics = {"chunks": 0, "deleted": 0, "elapsed_seconds": 0.0}
+        start = time.perf_counter()
+        while True:
+            deleted = idempotency_repository.purge_expired(db, not_before, chunk_size)
+            metrics["chunks"] += 1
+            metrics["deleted"] += deleted
+            metrics["elapsed_seconds"] = time.perf_counter() - start
+            if on_chunk is not None:
+                on_chunk(metrics)
+            if deleted < chunk_size:
+                return metrics
+    
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+
+idempotency_service = IdempotencyService()
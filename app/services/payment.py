@@ -1,16 +1,44 @@
+from collections import defaultdict
 from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence, Tuple
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from ..models import Payment, PaymentSchedule, PaymentStatus, CreditStatus
 from ..schemas import PaymentRequest
-from ..repositories import payment_repository, payment_schedule_repository, credit_repository
+from ..repositories import payment_repository, payment_schedule_repository, credit_repository, credit_rollup_repository
 from .credit import credit_service
 
 
 class PaymentService:
     
     def create_payment(self, db: Session, user_id: int, payment_data: PaymentRequest) -> Payment:
+        """
+        Registrar un pago en una sola transacción: UPDATE condicional del crédito
+        (bloquea la fila, descuenta el saldo y salda el crédito en cero) e INSERT
+        del pago. Solo si el UPDATE no aplica se consulta el crédito para informar
+        el motivo.
+        """
+        try:
+            applied = credit_repository.apply_payment(db, payment_data.credit_id, user_id, payment_data.amount)
+            if applied is None:
+                self._raise_payment_rejected(db, user_id, payment_data)
+            
+            payment_data_dict = payment_data.dict()
+            payment_data_dict.update({
+                "payment_date": datetime.now(),
+                "status": PaymentStatus.PAID
+            })
+            payment = payment_repository.insert_returning(db, payment_data_dict)
+            # Desvinculado de la sesión para que el commit no lo expire (sin SELECT extra)
+            db.expunge(payment)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        return payment
+    
+    def _raise_payment_rejected(self, db: Session, user_id: int, payment_data: PaymentRequest):
         credit = credit_repository.get(db, payment_data.credit_id)
         if not credit:
             raise ValueError("Crédito no encontrado")
@@ -21,22 +49,7 @@ class PaymentService:
         if credit.status not in [CreditStatus.ACTIVE, CreditStatus.DELINQUENT]:
             raise ValueError(f"No se pueden realizar pagos para créditos en estado: {credit.status.value}")
         
-        if payment_data.amount > (credit.remaining_balance or 0):
-            raise ValueError("El monto del pago excede el saldo pendiente")
-        
-        payment_data_dict = payment_data.dict()
-        payment_data_dict.update({
-            "payment_date": datetime.now(),
-            "status": PaymentStatus.PAID
-        })
-        
-        payment = payment_repository.create(db, obj_in=payment_data_dict)
-        
-        self.update_credit_balance(db, payment.credit_id, payment.amount)
-        
-        self.check_and_update_credit_status(db, payment.credit_id)
-        
-        return payment
+        raise ValueError("El monto del pago excede el saldo pendiente")
     
     def update_credit_balance(self, db: Session, credit_id: int, payment_amount: Decimal):
         credit = credit_repository.get(db, credit_id)
@@ -60,24 +73,17 @@ class PaymentService:
             db.refresh(credit)
     
     def get_credit_payments(self, db: Session, user_id: int, credit_id: int, 
-                           skip: int = 0, limit: int = 100) -> List[Payment]:
+                           skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Payment]:
         
         credit = credit_repository.get(db, credit_id)
-        print(type(credit.user_id), type(user_id))
         if not credit or str(credit.user_id) != user_id:
             raise ValueError("Crédito no encontrado o sin permisos")
-        return payment_repository.get_by_credit(db, credit_id, skip, limit)
+        return payment_repository.get_by_credit(db, credit_id, skip, limit, cursor)
         
     
-    def get_user_payments(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Payment]:
-        user_credits = credit_repository.get_by_user(db, user_id, 0, 1000)
-        credit_ids = [credit.id for credit in user_credits]
-        
-        if not credit_ids:
-            return []
-        
-        payments = db.query(Payment).filter(Payment.credit_id.in_(credit_ids)).offset(skip).limit(limit).all()
-        return payments
+    def get_user_payments(self, db: Session, user_id: int, skip: int = 0, limit: int = 100,
+                          cursor: Optional[str] = None) -> List[Payment]:
+        return payment_repository.get_by_user(db, user_id, skip, limit, cursor)
     
     def mark_installment_as_paid(self, db: Session, user_id: int, schedule_id: int, 
                                 payment_date: Optional[datetime] = None) -> PaymentSchedule:
@@ -102,36 +108,30 @@ class PaymentService:
             credit = credit_repository.get(db, credit_id)
             if not credit or credit.user_id != user_id:
                 raise ValueError("Crédito no encontrado o sin permisos")
-            
-            payments = payment_repository.get_by_credit(db, credit_id)
-            schedule = payment_schedule_repository.get_by_credit(db, credit_id)
+        
+        # Totales del rollup; si hay cuotas vencidas o créditos sin rollup se agregan las tablas
+        if credit_id:
+            rollup = credit_rollup_repository.get_summary(db, credit_id=credit_id)
         else:
-            user_credits = credit_repository.get_by_user(db, user_id, 0, 1000)
-            credit_ids = [credit.id for credit in user_credits]
-            
-            if not credit_ids:
-                return {"total_payments": 0, "total_amount": 0, "total_installments": 0}
-            
-            payments = db.query(Payment).filter(Payment.credit_id.in_(credit_ids)).all()
-            all_schedule = []
-            for cid in credit_ids:
-                credit_schedule = payment_schedule_repository.get_by_credit(db, cid)
-                all_schedule.extend(credit_schedule)
-            schedule = all_schedule
-        
-        total_amount = sum(float(payment.amount) for payment in payments)
-        paid_installments = [i for i in schedule if i.is_paid]
-        pending_installments = [i for i in schedule if not i.is_paid]
-        overdue_installments = [i for i in pending_installments if i.due_date < datetime.now()]
+            rollup = credit_rollup_repository.get_summary(db, user_id=user_id)
+        
+        if rollup:
+            payments = schedule = rollup
+        elif credit_id:
+            payments = payment_repository.get_totals(db, credit_id=credit_id)
+            schedule = payment_schedule_repository.get_summary(db, credit_id=credit_id)
+        else:
+            payments = payment_repository.get_totals(db, user_id=user_id)
+            schedule = payment_schedule_repository.get_summary(db, user_id=user_id)
         
         return {
-            "total_payments": len(payments),
-            "total_amount": total_amount,
-            "total_installments": len(schedule),
-            "paid_installments": len(paid_installments),
-            "pending_installments": len(pending_installments),
-            "overdue_installments": len(overdue_installments),
-            "overdue_amount": sum(float(i.total_amount) for i in overdue_installments)
+            "total_payments": payments.total_payments,
+            "total_amount": float(payments.total_amount),
+            "total_installments": schedule.total_installments,
+            "paid_installments": schedule.paid_installments,
+            "pending_installments": schedule.pending_installments,
+            "overdue_installments": schedule.overdue_installments,
+            "overdue_amount": float(schedule.total_overdue)
         }
     
     def process_automatic_payment(self, db: Session, schedule_id: int) -> bool:
@@ -155,6 +155,43 @@ class PaymentService:
         self.update_credit_balance(db, schedule.credit_id, schedule.total_amount)
         
         return True
+    
+    def process_automatic_payments(self, db: Session, schedule_ids: Sequence[int],
+                                   payment_date: Optional[datetime] = None) -> dict:
+        """
+        Débito automático en bloque de un lote de cuotas en una sola transacción:
+        marca las cuotas pagadas (RETURNING), inserta los pagos y descuenta los
+        saldos agregados por crédito. Las cuotas ya pagadas se omiten.
+        """
+        payment_date = payment_date or datetime.now()
+        try:
+            paid = payment_schedule_repository.mark_many_as_paid(db, schedule_ids, payment_date)
+            
+            amounts = defaultdict(Decimal)
+            payments = []
+            for installment in paid:
+                amounts[installment.credit_id] += installment.total_amount
+                payments.append({
+                    "credit_id": installment.credit_id,
+                    "amount": installment.total_amount,
+                    "payment_method": "auto_debit",
+                    "description": f"Pago automático cuota #{installment.installment_number}",
+                    "payment_date": payment_date,
+                    "status": PaymentStatus.PAID
+                })
+            
+            payment_repository.bulk_create(db, payments, commit=False)
+            credit_repository.decrement_balances(db, amounts)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        return {
+            "installments_paid": len(payments),
+            "credits_updated": len(amounts),
+            "amount": sum(amounts.values(), Decimal("0"))
+        }
 
 
 payment_service = PaymentService()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import csv
+import hashlib
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models import CreditStatus, PaymentStatus
+from ..schemas import PaymentBatchRow
+from ..repositories import credit_repository, payment_repository
+
+INGESTION_FORMATS = ("csv", "ndjson")
+
+# (número de fila, fila validada o None, error)
+ParsedRow = Tuple[int, Optional[PaymentBatchRow], Optional[str]]
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+class PaymentIngestionService:
+    """
+    Carga masiva de pagos desde archivos de conciliación (CSV o NDJSON).
+
+    Cada lote se procesa en una transacción: bloquea los créditos del lote con
+    una consulta por conjunto, valida las filas en orden contra el saldo
+    restante, inserta los pagos aceptados en bloque (COPY en PostgreSQL) y
+    descuenta los saldos agregados por crédito. No llama al servicio de
+    usuarios: la carga es una operación administrativa.
+
+    Cada pago guarda una referencia externa única (la columna `reference` o,
+    sin ella, el hash del archivo y el número de fila): volver a cargar el
+    mismo archivo, o reintentarlo tras un lote fallido, rechaza las filas ya
+    registradas en lugar de duplicarlas.
+    """
+    
+    def parse(self, content: bytes, fmt: str) -> Iterator[ParsedRow]:
+        """Filas numeradas desde 1 (sin contar el encabezado CSV ni las líneas vacías)"""
+        if fmt not in INGESTION_FORMATS:
+            raise ValueError(f"Formato inválido. Formatos válidos: {', '.join(INGESTION_FORMATS)}")
+        try:
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("El archivo debe estar codificado en UTF-8")
+        
+        if fmt == "csv":
+            records = (
+                {key: value for key, value in record.items() if value not in (None, "")}
+                for record in csv.DictReader(io.StringIO(text))
+            )
+        else:
+            records = (line for line in text.splitlines() if line.strip())
+        
+        for number, record in enumerate(records, start=1):
+            try:
+                if fmt == "ndjson":
+                    record = json.loads(record)
+                    if not isinstance(record, dict):
+                        raise ValueError("Se esperaba un objeto JSON")
+                yield number, PaymentBatchRow(**record), None
+            except ValidationError as e:
+                yield number, None, _validation_message(e)
+            except ValueError as e:
+                yield number, None, f"Fila inválida: {e}"
+    
+    def _reject(self, number: int, row: Optional[PaymentBatchRow], error: str) -> dict:
+        return {
+            "row": number,
+            "credit_id": row.credit_id if row else None,
+            "amount": row.amount if row else None,
+            "accepted": False,
+            "error": error
+        }
+    
+    def _apply_chunk(self, db: Session, rows: List[ParsedRow], loaded_at: datetime,
+                     file_hash: str) -> Tuple[List[dict], Dict[int, Decimal], int]:
+        results = []
+        payments = []
+        amounts: Dict[int, Decimal] = defaultdict(Decimal)
+        credit_ids = sorted({row.credit_id for _, row, _ in rows if row is not None})
+        references = {
+            number: row.reference or f"{file_hash}:{number}" for number, row, _ in rows if row is not None
+        }
+        try:
+            credits = credit_repository.get_payment_targets(db, credit_ids) if credit_ids else {}
+            registered = payment_repository.existing_references(db, list(references.values()))
+            balances = {credit_id: credit.remaining_balance or Decimal("0") for credit_id, credit in credits.items()}
+            
+            for number, row, error in rows:
+                if row is None:
+                    results.append(self._reject(number, None, error))
+                    continue
+                credit = credits.get(row.credit_id)
+                if references[number] in registered:
+                    results.append(self._reject(
+                        number, row, f"Pago ya registrado con la referencia {references[number]}"
+                    ))
+                elif credit is None:
+                    results.append(self._reject(number, row, "Crédito no encontrado"))
+                elif credit.status not in [CreditStatus.ACTIVE, CreditStatus.DELINQUENT]:
+                    results.append(self._reject(
+                        number, row, f"No se pueden realizar pagos para créditos en estado: {credit.status.value}"
+                    ))
+                elif row.amount.as_tuple().exponent < -2:
+                    results.append(self._reject(number, row, "El monto admite como máximo dos decimales"))
+                elif row.amount > balances[row.credit_id]:
+                    results.append(self._reject(number, row, "El monto del pago excede el saldo pendiente"))
+                else:
+                    registered.add(references[number])
+                    balances[row.credit_id] -= row.amount
+                    amounts[row.credit_id] += row.amount
+                    payments.append({
+                        "credit_id": row.credit_id,
+                        "amount": row.amount,
+                        "payment_method": row.payment_method,
+                        "description": row.description,
+                        "payment_date": row.payment_date or loaded_at,
+                        "status": PaymentStatus.PAID,
+                        "external_reference": references[number]
+                    })
+                    results.append({
+                        "row": number, "credit_id": row.credit_id, "amount": row.amount,
+                        "accepted": True, "error": None
+                    })
+            
+            payment_repository.copy_create(db, payments, commit=False)
+            credit_repository.decrement_balances(db, amounts)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        paid = sum(1 for credit_id in amounts if balances[credit_id] <= 0)
+        return results, amounts, paid
+    
+    def ingest(self, db: Session, content: bytes, fmt: str,
+               chunk_size: int = settings.PAYMENT_INGESTION_CHUNK_SIZE) -> dict:
+        """Procesar un archivo por lotes de `chunk_size` filas y devolver el resultado por fila"""
+        loaded_at = datetime.now()
+        file_hash = hashlib.sha256(content).hexdigest()
+        results = []
+        credits_updated = set()
+        credits_paid = 0
+        total_amount = Decimal("0")
+        
+        parsed = self.parse(content, fmt)
+        while True:
+            chunk = list(islice(parsed, chunk_size))
+            if not chunk:
+                break
+            chunk_results, amounts, paid = self._apply_chunk(db, chunk, loaded_at, file_hash)
+            results.extend(chunk_results)
+            credits_updated.update(amounts)
+            credits_paid += paid
+            total_amount += sum(amounts.values(), Decimal("0"))
+        
+        accepted = sum(1 for result in results if result["accepted"])
+        return {
+            "total_rows": len(results),
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "total_amount": total_amount,
+            "credits_updated": len(credits_updated),
+            "credits_paid": credits_paid,
+            "results": results
+        }
+
+
+payment_ingestion_service = PaymentIngestionService()
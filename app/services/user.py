@@ -1,28 +1,91 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import importlib.util
+import logging
+import time
 import httpx    
 from ..config.settings import settings
+from ..utils.cache import MISSING, SingleFlight, TTLCache
+from ..utils.metrics import USER_SERVICE_LATENCY
+
+logger = logging.getLogger(__name__)
 
 
 class UserService:
     
     def __init__(self):
         self.user_service_url = getattr(settings, 'USER_SERVICE_URL', "http://localhost:8000")
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = TTLCache(maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+        self._inflight = SingleFlight()
+    
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.USER_SERVICE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.USER_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.USER_SERVICE_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(
+            settings.USER_SERVICE_READ_TIMEOUT,
+            connect=settings.USER_SERVICE_CONNECT_TIMEOUT,
+            pool=settings.USER_SERVICE_POOL_TIMEOUT
+        )
+        # HTTP/2 solo si el paquete h2 está instalado
+        http2 = settings.USER_SERVICE_HTTP2 and importlib.util.find_spec("h2") is not None
+        return httpx.AsyncClient(
+            base_url=self.user_service_url,
+            limits=limits,
+            timeout=timeout,
+            http2=http2,
+            headers={"Authorization": f"Bearer {getattr(settings, 'SERVICE_TOKEN', 'internal-token')}"}
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido; se crea bajo demanda si no se inició en el lifespan"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+    
+    async def startup(self):
+        self._client = self._build_client()
+    
+    async def shutdown(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request_user(self, user_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Consultar el servicio de usuarios; devuelve (datos, cacheable)"""
+        url = f"/api/v1/users/{user_id}"
+        logger.debug("Verificando usuario en %s%s", self.user_service_url, url)
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(url)
+            USER_SERVICE_LATENCY.observe(time.perf_counter() - start, str(response.status_code))
+            logger.debug("Respuesta del servicio de usuarios: %s", response.status_code)
+            if response.status_code == 200:
+                return response.json(), True
+            # Los 404 se cachean como negativos; otros errores no se cachean
+            return None, response.status_code == 404
+        except httpx.RequestError:
+            USER_SERVICE_LATENCY.observe(time.perf_counter() - start, "error")
+            return None, False
+    
+    async def _load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        user_data, cacheable = await self._request_user(user_id)
+        if cacheable:
+            ttl = None if user_data is not None else settings.USER_CACHE_NEGATIVE_TTL_SECONDS
+            self.cache.set(user_id, user_data, ttl=ttl)
+        return user_data
     
     async def verify_user_with_service(self, user_id: str) -> Optional[Dict[str, Any]]:
-        async with httpx.AsyncClient() as client:
-            url = f"{self.user_service_url}/api/v1/users/{user_id}"
-            print("Verifying user with URL:", url)
-            try:
-                response = await client.get(
-                    url,
-                    headers={"Authorization": f"Bearer {getattr(settings, 'SERVICE_TOKEN', 'internal-token')}"}
-                )
-                print(response.status_code, response.text)
-                if response.status_code == 200:
-                    return response.json()
-                return None
-            except httpx.RequestError:
-                return None
+        cached = self.cache.get(user_id)
+        if cached is not MISSING:
+            return cached
+        return await self._inflight.run(user_id, lambda: self._load_user(user_id))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "coalesced": self._inflight.coalesced}
     
     async def validate_user_exists(self, user_id: str) -> bool:
         user_data = await self.verify_user_with_service(user_id)
@@ -33,9 +96,9 @@ class UserService:
     
     
     def verify_service_token(self, token: str) -> Optional[int]:
-        from ..utils.security import verify_token
+        from ..utils.security import decode_token
         try:
-            payload = verify_token(token)
+            payload = decode_token(token)
             if isinstance(payload, dict) and payload.get("type") == "service":
                 return int(payload["sub"])
             return None
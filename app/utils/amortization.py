@@ -0,0 +1,179 @@
+"""
+Motor de amortización del microservicio de créditos.
+
+Contiene la implementación escalar de referencia (Decimal, mes a mes) y un
+motor vectorizado que calcula calendarios completos para muchas tuplas
+(monto, tasa, plazo) a la vez usando arreglos NumPy de centavos enteros.
+El motor vectorizado reproduce exactamente los resultados Decimal: los
+casos ambiguos de redondeo se resuelven con la implementación escalar.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# La tasa mensual es r / 120000 cuando r es la tasa anual en centésimas de punto
+_RATE_DENOMINATOR = 120000
+# Tolerancia (en centavos) para detectar cuotas cercanas a un empate de redondeo
+_TIE_TOLERANCE_CENTS = 1e-6
+_TIE_RELATIVE_TOLERANCE = 1e-11
+
+
+def monthly_payment(principal: Decimal, annual_rate: Decimal, months: int) -> Decimal:
+    """Cuota mensual fija (sistema francés)"""
+    if annual_rate == 0:
+        return principal / months
+    
+    monthly_rate = annual_rate / 100 / 12
+    power = (1 + monthly_rate) ** months
+    payment = principal * (monthly_rate * power) / (power - 1)
+    
+    return round(payment, 2)
+
+
+def installments(principal: Decimal, annual_rate: Decimal, months: int,
+                 payment: Decimal) -> List[Tuple[Decimal, Decimal, Decimal]]:
+    """Cuotas (capital, interés, total) calculadas mes a mes con Decimal"""
+    monthly_rate = annual_rate / 100 / 12
+    remaining_balance = principal
+    result = []
+    
+    for month in range(1, months + 1):
+        interest_payment = round(remaining_balance * monthly_rate, 2)
+        
+        principal_payment = round(payment - interest_payment, 2)
+        
+        if month == months:
+            principal_payment = remaining_balance
+        
+        remaining_balance = round(remaining_balance - principal_payment, 2)
+        
+        result.append((principal_payment, interest_payment, round(principal_payment + interest_payment, 2)))
+    
+    return result
+
+
+def _to_cents(value: Decimal) -> int:
+    return int(Decimal(value).scaleb(2).to_integral_exact())
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convertir centavos enteros a Decimal con dos decimales"""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+@dataclass
+class AmortizationBatch:
+    """Calendarios de un lote de créditos en centavos enteros.
+
+    Las matrices tienen forma (n_créditos, plazo_máximo); las posiciones
+    posteriores al plazo de cada crédito quedan en cero.
+    """
+    terms: np.ndarray
+    monthly_payment_cents: np.ndarray
+    principal_cents: np.ndarray
+    interest_cents: np.ndarray
+    balance_cents: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.terms)
+    
+    @property
+    def total_interest_cents(self) -> np.ndarray:
+        return self.interest_cents.sum(axis=1)
+    
+    @property
+    def total_payment_cents(self) -> np.ndarray:
+        return self.principal_cents.sum(axis=1) + self.total_interest_cents
+    
+    def schedule(self, index: int) -> List[Tuple[Decimal, Decimal, Decimal, Decimal]]:
+        """Cuotas (capital, interés, total, saldo) de un crédito como Decimal"""
+        term = int(self.terms[index])
+        principal = self.principal_cents[index, :term].tolist()
+        interest = self.interest_cents[index, :term].tolist()
+        balance = self.balance_cents[index, :term].tolist()
+        return [
+            (from_cents(p), from_cents(i), from_cents(p + i), from_cents(b))
+            for p, i, b in zip(principal, interest, balance)
+        ]
+
+
+def _vector_monthly_payment(amount_cents: np.ndarray, rates: np.ndarray, terms: np.ndarray,
+                            amounts: Sequence[Decimal], annual_rates: Sequence[Decimal]) -> np.ndarray:
+    monthly_rate = rates / _RATE_DENOMINATOR
+    power = np.power(1.0 + monthly_rate, terms)
+    exact = amount_cents * (monthly_rate * power) / (power - 1.0)
+    
+    rounded = np.rint(exact)
+    distance_to_tie = np.abs(np.abs(exact - np.floor(exact)) - 0.5)
+    ambiguous = distance_to_tie <= _TIE_TOLERANCE_CENTS + np.abs(exact) * _TIE_RELATIVE_TOLERANCE
+    
+    result = rounded.astype(np.int64)
+    for index in np.flatnonzero(ambiguous):
+        result[index] = _to_cents(monthly_payment(amounts[index], annual_rates[index], int(terms[index])))
+    return result
+
+
+def amortize_batch(quotes: Sequence[Tuple[Decimal, Decimal, int]]) -> AmortizationBatch:
+    """Calcular los calendarios completos de un lote de (monto, tasa anual %, plazo).
+
+    Montos y tasas deben tener como máximo dos decimales y la tasa debe ser
+    positiva. El resultado coincide exactamente con `monthly_payment` e
+    `installments`.
+    """
+    amounts = [Decimal(amount) for amount, _, _ in quotes]
+    annual_rates = [Decimal(rate) for _, rate, _ in quotes]
+    
+    for amount, rate in zip(amounts, annual_rates):
+        if rate <= 0:
+            raise ValueError("La tasa de interés debe ser mayor a 0")
+        if amount.as_tuple().exponent < -2 or rate.as_tuple().exponent < -2:
+            raise ValueError("Montos y tasas admiten como máximo dos decimales")
+    
+    size = len(quotes)
+    terms = np.fromiter((int(term) for _, _, term in quotes), dtype=np.int64, count=size)
+    amount_cents = np.fromiter((_to_cents(a) for a in amounts), dtype=np.int64, count=size)
+    rate_hundredths = np.fromiter((_to_cents(r) for r in annual_rates), dtype=np.int64, count=size)
+    
+    payment_cents = _vector_monthly_payment(
+        amount_cents.astype(np.float64), rate_hundredths.astype(np.float64), terms,
+        amounts, annual_rates
+    )
+    
+    max_term = int(terms.max()) if size else 0
+    principal_cents = np.zeros((size, max_term), dtype=np.int64)
+    interest_cents = np.zeros((size, max_term), dtype=np.int64)
+    balance_cents = np.zeros((size, max_term), dtype=np.int64)
+    
+    balance = amount_cents.copy()
+    half = _RATE_DENOMINATOR // 2
+    for month in range(1, max_term + 1):
+        column = month - 1
+        active = terms >= month
+        
+        # Interés = round(saldo * r / 120000) con redondeo bancario en enteros
+        quotient, remainder = np.divmod(balance * rate_hundredths, _RATE_DENOMINATOR)
+        interest = quotient + (remainder > half)
+        ties = np.flatnonzero(active & (remainder == half))
+        for index in ties:
+            monthly_rate = annual_rates[index] / 100 / 12
+            interest[index] = _to_cents(round(from_cents(balance[index]) * monthly_rate, 2))
+        
+        principal = np.where(terms == month, balance, payment_cents - interest)
+        principal = np.where(active, principal, 0)
+        interest = np.where(active, interest, 0)
+        balance = balance - principal
+        
+        principal_cents[:, column] = principal
+        interest_cents[:, column] = interest
+        balance_cents[:, column] = np.where(active, balance, 0)
+    
+    return AmortizationBatch(
+        terms=terms,
+        monthly_payment_cents=payment_cents,
+        principal_cents=principal_cents,
+        interest_cents=interest_cents,
+        balance_cents=balance_cents,
+    )
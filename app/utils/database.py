@@ -1,7 +1,20 @@
-from sqlalchemy import create_engine
+import hashlib
+import hmac
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
 from ..config.settings import settings
+from .cache import MISSING, TTLCache
+from .security import decode_token
+from .slow_queries import slow_query_log
 
 engine = create_engine(
     settings.DATABASE_URL,
@@ -13,6 +26,247 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+AnySession = Union[Session, AsyncSession]
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Traducir la URL síncrona al driver asíncrono equivalente"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver asíncrono configurado para '{backend}'")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+if settings.DATABASE_ASYNC:
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL),
+        pool_pre_ping=True,
+        pool_recycle=300
+    )
+    # Sin expirar al hacer commit: los objetos se serializan fuera del contexto async
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+REPLICA_STRATEGIES = ("round_robin", "least_connections")
+# Clave de `Session.info` con el usuario cuyas escrituras fijan sus lecturas al primario
+READ_YOUR_WRITES_KEY = "read_your_writes_user"
+# Usuario que confirmó escrituras en la petición en curso (lo completa `_pin_after_commit`)
+_request_writer: ContextVar[Optional[dict]] = ContextVar("read_your_writes_writer", default=None)
+
+
+class ReplicaRouter:
+    """
+    Enrutamiento de lecturas a réplicas con lectura de las propias escrituras.
+
+    Cada commit de una sesión del primario asociada a un usuario lo fija al
+    primario durante `pin_seconds`, tiempo que cubre el retraso de replicación;
+    mientras tanto sus lecturas no van a las réplicas. Sin réplicas todas las
+    lecturas usan el primario.
+
+    Los pines en memoria solo valen dentro del proceso. Con varios workers o
+    contenedores `ReadYourWritesMiddleware` además devuelve la cookie
+    READ_YOUR_WRITES_COOKIE con el usuario y el vencimiento del pin, y
+    `get_read_db` la respeta en cualquier proceso; un cliente que no reenvía
+    cookies solo queda fijado en el proceso que atendió la escritura.
+    """
+    
+    def __init__(self, urls: Sequence[str], strategy: str = "round_robin", pin_seconds: float = 5.0,
+                 pin_maxsize: int = 100000, use_async: bool = False):
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Estrategia de réplicas inválida. Estrategias válidas: {', '.join(REPLICA_STRATEGIES)}")
+        self.strategy = strategy
+        self.urls = list(urls)
+        self.engines: List[Engine] = [
+            create_engine(url, pool_pre_ping=True, pool_recycle=300) for url in self.urls
+        ]
+        self.session_factories = [
+            sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in self.engines
+        ]
+        self.async_session_factories: List[async_sessionmaker] = []
+        if use_async:
+            self.async_session_factories = [
+                async_sessionmaker(
+                    create_async_engine(get_async_database_url(url), pool_pre_ping=True, pool_recycle=300),
+                    autoflush=False, expire_on_commit=False
+                )
+                for url in self.urls
+            ]
+        self.pin_seconds = pin_seconds
+        self.pins = TTLCache(maxsize=pin_maxsize if self.urls else 0, ttl=pin_seconds)
+        self._counter = itertools.count()
+        self.reads = [0] * len(self.urls)
+        self.primary_reads = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.urls)
+    
+    def pin(self, user_id: Optional[str]):
+        """Enviar al primario las lecturas del usuario durante la ventana configurada"""
+        if user_id is not None:
+            self.pins.set(user_id, True)
+    
+    def is_pinned(self, user_id: Optional[str]) -> bool:
+        return user_id is not None and self.pins.get(user_id) is not MISSING
+    
+    def _pools(self) -> list:
+        if self.async_session_factories:
+            return [factory.kw["bind"].sync_engine.pool for factory in self.async_session_factories]
+        return [replica.pool for replica in self.engines]
+    
+    def choose(self, user_id: Optional[str] = None, pinned: bool = False) -> Optional[int]:
+        """Índice de la réplica para una lectura o None si debe ir al primario"""
+        if not self.urls or pinned or self.is_pinned(user_id):
+            self.primary_reads += 1
+            return None
+        if self.strategy == "least_connections":
+            checked_out = [getattr(pool, "checkedout", lambda: 0)() for pool in self._pools()]
+            index = checked_out.index(min(checked_out))
+        else:
+            index = next(self._counter) % len(self.urls)
+        self.reads[index] += 1
+        return index
+    
+    def session(self, user_id: Optional[str] = None, pinned: bool = False) -> Session:
+        """Sesión síncrona de lectura (réplica elegida o primario)"""
+        index = self.choose(user_id, pinned)
+        return SessionLocal() if index is None else self.session_factories[index]()
+    
+    def async_session(self, user_id: Optional[str] = None, pinned: bool = False) -> AsyncSession:
+        """Sesión asíncrona de lectura (réplica elegida o primario)"""
+        index = self.choose(user_id, pinned)
+        return AsyncSessionLocal() if index is None else self.async_session_factories[index]()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": len(self.urls),
+            "strategy": self.strategy,
+            "replica_reads": list(self.reads),
+            "primary_reads": self.primary_reads,
+            "pinned_users": len(self.pins)
+        }
+
+
+replica_router = ReplicaRouter(
+    settings.DATABASE_REPLICA_URLS,
+    strategy=settings.DATABASE_REPLICA_STRATEGY,
+    pin_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    pin_maxsize=settings.READ_YOUR_WRITES_MAXSIZE,
+    use_async=settings.DATABASE_ASYNC
+)
+
+
+def all_engines() -> Dict[str, Engine]:
+    """Engines del primario y de las réplicas por nombre (los asíncronos por su `sync_engine`)"""
+    engines = {"primary": engine}
+    if async_engine is not None:
+        engines["primary_async"] = async_engine.sync_engine
+    for index, replica in enumerate(replica_router.engines):
+        engines[f"replica{index}"] = replica
+    for index, factory in enumerate(replica_router.async_session_factories):
+        engines[f"replica{index}_async"] = factory.kw["bind"].sync_engine
+    return engines
+
+
+if settings.SLOW_QUERY_LOG_ENABLED:
+    for _name, _engine in all_engines().items():
+        slow_query_log.attach(_engine, _name)
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_after_commit(session: Session):
+    user_id = session.info.get(READ_YOUR_WRITES_KEY)
+    replica_router.pin(user_id)
+    writer = _request_writer.get()
+    if user_id is not None and writer is not None:
+        writer["user_id"] = user_id
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI que, con réplicas configuradas, agrega a la respuesta de
+    una petición que confirmó escrituras la cookie READ_YOUR_WRITES_COOKIE
+    (`<usuario>:<vencimiento epoch>:<firma>`, ver `read_your_writes_cookie`),
+    para que las lecturas siguientes del usuario vayan al primario aunque las
+    atienda otro proceso.
+    """
+    
+    def __init__(self, app, cookie: str = settings.READ_YOUR_WRITES_COOKIE):
+        self.app = app
+        self.cookie = cookie
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_router.enabled:
+            await self.app(scope, receive, send)
+            return
+        
+        writer = {}
+        
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and writer.get("user_id") is not None:
+                seconds = replica_router.pin_seconds
+                value = read_your_writes_cookie(writer["user_id"], time.time() + seconds)
+                MutableHeaders(scope=message).append("Set-Cookie", (
+                    f"{self.cookie}={value}; Max-Age={max(1, round(seconds))}; Path=/; HttpOnly; SameSite=Lax"
+                ))
+            await send(message)
+        
+        token = _request_writer.set(writer)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_writer.reset(token)
+
+
+def _cookie_signature(user_id: str, until: str) -> str:
+    message = f"{user_id}:{until}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def read_your_writes_cookie(user_id: str, until: float) -> str:
+    """Valor de la cookie que fija al usuario al primario hasta `until` (epoch), firmado con SECRET_KEY"""
+    until = f"{until:.3f}"
+    return f"{user_id}:{until}:{_cookie_signature(user_id, until)}"
+
+
+def cookie_pinned(request: Request, user_id: Optional[str]) -> bool:
+    """
+    Si la cookie de lectura de las propias escrituras fija al usuario al
+    primario: firma válida y vencimiento dentro de la ventana del router
+    (una cookie con un vencimiento más lejano no la emitió este servicio).
+    """
+    parts = request.cookies.get(settings.READ_YOUR_WRITES_COOKIE, "").rsplit(":", 2)
+    if user_id is None or len(parts) != 3 or parts[0] != user_id:
+        return False
+    owner, until, signature = parts
+    if not hmac.compare_digest(signature, _cookie_signature(owner, until)):
+        return False
+    try:
+        now = time.time()
+        return now < float(until) <= now + replica_router.pin_seconds
+    except ValueError:
+        return False
+
+
+def request_user_id(request: Request) -> Optional[str]:
+    """Usuario del token Bearer de la petición o None si no hay token válido"""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token(token).get("sub")
+    except HTTPException:
+        return None
+
 
 def get_db():
     db = SessionLocal()
@@ -20,3 +274,56 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_session(request: Request):
+    """
+    Sesión de la petición en el primario: AsyncSession si DATABASE_ASYNC está activo, Session en otro caso.
+
+    Con réplicas configuradas, sus commits fijan las lecturas del usuario al primario.
+    """
+    user_id = request_user_id(request) if replica_router.enabled else None
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            db.info[READ_YOUR_WRITES_KEY] = user_id
+            yield db
+    else:
+        db = SessionLocal()
+        db.info[READ_YOUR_WRITES_KEY] = user_id
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_read_db(request: Request):
+    """
+    Sesión de solo lectura: una réplica o el primario si no hay réplicas o el
+    usuario escribió hace menos de READ_YOUR_WRITES_SECONDS (según el pin de
+    este proceso o la cookie de `ReadYourWritesMiddleware`)
+    """
+    user_id = request_user_id(request) if replica_router.enabled else None
+    pinned = cookie_pinned(request, user_id)
+    if AsyncSessionLocal is not None:
+        async with replica_router.async_session(user_id, pinned) as db:
+            yield db
+    else:
+        db = replica_router.session(user_id, pinned)
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def run_db(db: AnySession, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Ejecutar lógica de servicio/repositorio síncrona sobre la sesión de la petición.
+
+    Con AsyncSession la función corre vía `run_sync`, de modo que la E/S pasa
+    por el driver asíncrono sin bloquear el event loop. Es el único camino
+    asíncrono a la base: servicios y repositorios tienen una sola
+    implementación, síncrona, para ambos modos.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return fn(db, *args, **kwargs)
@@ -0,0 +1,53 @@
+"""
+Serialización de exportaciones por lotes en NDJSON o CSV.
+
+Cada lote de filas se convierte en un único bloque de bytes para el
+`StreamingResponse`, de modo que la memoria depende del tamaño del lote y no
+del total exportado.
+"""
+
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Sequence
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def ndjson_chunks(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """Un objeto JSON por línea"""
+    for rows in batches:
+        yield "".join(
+            json.dumps({column: _value(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+
+def csv_chunks(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """CSV con encabezado; los nulos quedan como campos vacíos"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
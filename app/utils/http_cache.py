@@ -0,0 +1,33 @@
+"""
+GET condicional con ETags fuertes.
+
+Las rutas derivan el ETag de una versión barata del recurso (una fila de
+metadatos) y, si coincide con `If-None-Match`, responden 304 sin cargar ni
+serializar el cuerpo.
+"""
+
+import hashlib
+from typing import Any, Dict, Optional
+from ..config.settings import settings
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fuerte a partir de la representación y su versión"""
+    return '"%s"' % hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match, como exige el GET condicional"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def cache_headers(etag: str, max_age: int = settings.SCHEDULE_CACHE_MAX_AGE) -> Dict[str, str]:
+    """Encabezados de la respuesta 200 y del 304; privados porque dependen del usuario"""
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={max_age}, must-revalidate",
+        "Vary": "Authorization"
+    }
@@ -0,0 +1,262 @@
+"""
+Métricas en formato de texto de Prometheus.
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas con
+etiquetas, protegidos por un lock y con costo O(log buckets) por
+observación, para poder dejarlos activos en producción. Los valores que ya
+llevan otros componentes (pools de conexiones, cachés) se leen al momento
+del scrape mediante colectores en lugar de actualizarse en cada operación.
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from sqlalchemy.engine import Engine
+from starlette.exceptions import HTTPException
+from ..config.settings import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """Métrica con etiquetas; los valores se guardan por tupla de etiquetas"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: LabelValues) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        return labels
+    
+    def add(self, value: float, *labels: str):
+        """Asignar el valor de una serie (usado por los colectores al momento del scrape)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+    
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: conteos por bucket (no acumulados, el último es +Inf), suma y total
+        self._series: Dict[LabelValues, list] = {}
+    
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+Collector = Callable[[], Iterable[Metric]]
+
+
+class Registry:
+    """Métricas registradas más colectores evaluados en cada scrape"""
+    
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Collector] = []
+    
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso por ruta", ("method", "route")
+))
+POOL_CHECKOUT = registry.register(Histogram(
+    "db_pool_checkout_seconds", "Tiempo para obtener una conexión del pool (espera incluida)", ("engine",),
+    buckets=POOL_BUCKETS
+))
+USER_SERVICE_LATENCY = registry.register(Histogram(
+    "user_service_request_duration_seconds", "Latencia de las llamadas HTTP al servicio de usuarios", ("outcome",)
+))
+
+
+class MetricsRoute(APIRoute):
+    """
+    Ruta que registra latencia y peticiones en curso con la plantilla de la
+    ruta como etiqueta (no la URL, para acotar la cardinalidad).
+
+    En respuestas en streaming la latencia llega hasta el inicio del cuerpo.
+    """
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not settings.METRICS_ENABLED:
+            return handler
+        route = self.path
+        
+        async def instrumented_handler(request):
+            method = request.method
+            REQUESTS_IN_FLIGHT.inc(method, route)
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422
+                raise
+            finally:
+                REQUESTS_IN_FLIGHT.dec(method, route)
+                REQUEST_LATENCY.observe(time.perf_counter() - start, method, route, str(status))
+        
+        return instrumented_handler
+
+
+def instrument_engine(engine: Engine, name: str):
+    """Medir el checkout de conexiones del engine (sobrevive a `dispose()`, que reemplaza el pool)"""
+    raw_connection = engine.raw_connection
+    
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            POOL_CHECKOUT.observe(time.perf_counter() - start, name)
+    
+    engine.raw_connection = timed_raw_connection
+
+
+def pool_collector(engines: Callable[[], Dict[str, Engine]]) -> Collector:
+    """Conexiones en uso, overflow y tamaño de cada pool (solo pools con cola, como QueuePool)"""
+    
+    def collect() -> Iterable[Metric]:
+        checked_out = Gauge("db_pool_checked_out", "Conexiones del pool en uso", ("engine",))
+        overflow = Gauge("db_pool_overflow", "Conexiones por encima de pool_size (negativo: sin abrir)", ("engine",))
+        size = Gauge("db_pool_size", "Tamaño configurado del pool", ("engine",))
+        for name, engine in engines().items():
+            pool = engine.pool
+            if hasattr(pool, "checkedout"):
+                checked_out.add(pool.checkedout(), name)
+                overflow.add(pool.overflow(), name)
+                size.add(pool.size(), name)
+        return [checked_out, overflow, size]
+    
+    return collect
+
+
+def cache_collector(stats: Callable[[], Dict[str, dict]]) -> Collector:
+    """Aciertos, fallos, desalojos y tamaño de las cachés a partir de sus `stats()`"""
+    
+    def collect() -> Iterable[Metric]:
+        hits = Counter("cache_hits_total", "Aciertos de caché", ("cache",))
+        misses = Counter("cache_misses_total", "Fallos de caché", ("cache",))
+        evictions = Counter("cache_evictions_total", "Entradas desalojadas por tamaño", ("cache",))
+        entries = Gauge("cache_entries", "Entradas almacenadas", ("cache",))
+        for name, cache in stats().items():
+            hits.add(cache["hits"], name)
+            misses.add(cache["misses"], name)
+            evictions.add(cache["evictions"], name)
+            entries.add(cache["size"], name)
+        return [hits, misses, evictions, entries]
+    
+    return collect
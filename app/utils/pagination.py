@@ -0,0 +1,116 @@
+"""
+Paginación por cursor (keyset) para los listados del microservicio.
+
+El cursor es opaco para el cliente: codifica en base64 los valores de las
+columnas de ordenamiento del último registro de la página. La página
+siguiente se obtiene con `WHERE (col1, col2) > (v1, v2)` en lugar de
+`OFFSET`, por lo que su costo no crece con la profundidad del listado.
+
+En SQLite las fechas se guardan como texto y se comparan como texto: las
+del servidor (CURRENT_TIMESTAMP) no tienen microsegundos y las de Python
+sí, por lo que las fechas del cursor se ligan en el mismo formato que la
+fila de la que salieron.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import DateTime, Select, String, literal, tuple_
+from sqlalchemy.types import TypeDecorator
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class CursorDateTime(TypeDecorator):
+    """
+    Fecha de un cursor ligada como la guardó la columna. En SQLite sin
+    microsegundos si no los tiene (formato de CURRENT_TIMESTAMP); de otro
+    modo '...:03' < '...:03.000000' y las filas del mismo segundo se repiten
+    o se saltan entre páginas. En los demás motores es un DateTime.
+    """
+    
+    impl = DateTime
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return super().load_dialect_impl(dialect)
+    
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None:
+            return value.strftime("%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S")
+        return value
+
+
+class Keyset:
+    """
+    Columnas (únicas en conjunto) por las que se ordena y pagina un listado
+    """
+    
+    def __init__(self, *columns, descending: bool = False):
+        self.columns = columns
+        self.descending = descending
+    
+    def encode(self, item: Any) -> str:
+        values = [self._dump(getattr(item, column.key)) for column in self.columns]
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    
+    def decode(self, cursor: str) -> List[Any]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError
+            return [self._load(column, value) for column, value in zip(self.columns, values)]
+        except (ValueError, TypeError):
+            raise ValueError("Cursor de paginación inválido")
+    
+    def apply(self, query: Select, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+        """Ordenar y paginar la consulta por cursor o, si no hay cursor, por offset"""
+        order = [column.desc() if self.descending else column.asc() for column in self.columns]
+        query = query.order_by(*order)
+        
+        if cursor:
+            values = [self._bind(column, value) for column, value in zip(self.columns, self.decode(cursor))]
+            if len(self.columns) == 1:
+                key, value = self.columns[0], values[0]
+            else:
+                key, value = tuple_(*self.columns), tuple_(*values)
+            query = query.where(key < value if self.descending else key > value)
+        elif skip:
+            query = query.offset(skip)
+        
+        return query.limit(limit)
+    
+    def next_cursor(self, items: Sequence[Any], limit: int) -> Optional[str]:
+        """Cursor de la página siguiente o None si la página no está completa"""
+        if not items or len(items) < limit:
+            return None
+        return self.encode(items[-1])
+    
+    @staticmethod
+    def _dump(value: Any) -> Any:
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+    
+    @staticmethod
+    def _bind(column, value: Any) -> Any:
+        if isinstance(value, datetime):
+            return literal(value, CursorDateTime(timezone=column.type.timezone))
+        return value
+    
+    @staticmethod
+    def _load(column, value: Any) -> Any:
+        if value is None:
+            raise ValueError
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is int and not isinstance(value, int):
+            raise ValueError
+        return value
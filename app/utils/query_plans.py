@@ -0,0 +1,22 @@
+"""
+Verificación de planes de consulta: líneas de `EXPLAIN QUERY PLAN` (SQLite)
+de una sentencia, índices esperados que no aparecen y tablas recorridas
+completas. La usan tests/test_query_plans.py y benchmarks/query_plans.py.
+"""
+
+
+def explain(connection, query) -> list:
+    """Líneas de `EXPLAIN QUERY PLAN` de una consulta con sus parámetros en línea"""
+    sql = query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return [row[-1] for row in rows]
+
+
+def missing_indexes(plan: list, expected: list) -> list:
+    """Índices esperados que no aparecen en el plan"""
+    return [index for index in expected if not any(index in line for line in plan)]
+
+
+def full_scans(plan: list) -> list:
+    """Líneas del plan que recorren una tabla completa (SCAN sin índice)"""
+    return [line for line in plan if line.startswith("SCAN ") and " USING " not in line]
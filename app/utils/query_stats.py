@@ -0,0 +1,192 @@
+"""
+Instrumentación de SQL por petición.
+
+Los eventos del engine acumulan en el `QueryStats` de la petición en curso
+(un contextvar, que también llega a `run_sync` de las sesiones asíncronas)
+la cantidad de sentencias, el tiempo en la base, las filas que informa el
+driver y cuántas veces se ejecuta cada forma de sentencia. Fuera de
+producción el resultado se expone en el encabezado `Server-Timing`.
+
+Las rutas declaran su presupuesto con `Depends(query_budget(n))`. En modo
+estricto (SQL_STRICT_MODE, para pruebas y benchmarks) una ruta que lo
+excede o que repite una misma sentencia SQL_REPEATED_STATEMENT_LIMIT veces
+(N+1) responde 500 en lugar de su respuesta; fuera de él (también en
+producción) se registra un aviso.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_START_KEY = "query_stats_start"
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Sentencia normalizada: espacios colapsados y listas IN de parámetros reducidas a uno"""
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Sentencias, tiempo y filas de SQL de una petición"""
+    
+    def __init__(self, budget: Optional[int] = None, repeat_limit: int = settings.SQL_REPEATED_STATEMENT_LIMIT):
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+        self.statements = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.shapes: Counter = Counter()
+    
+    def record(self, statement: str, duration: float, rowcount: int):
+        self.statements += 1
+        self.duration += duration
+        # SELECT solo informa filas en drivers que lo soportan (psycopg2 sí, sqlite3 no)
+        if rowcount > 0:
+            self.rows += rowcount
+        self.shapes[statement_shape(statement)] += 1
+    
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Sentencias ejecutadas al menos `repeat_limit` veces, posible N+1"""
+        if self.repeat_limit <= 0:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= self.repeat_limit]
+    
+    def violations(self) -> List[str]:
+        problems = []
+        if self.budget is not None and self.statements > self.budget:
+            problems.append(f"{self.statements} consultas para un presupuesto de {self.budget}")
+        problems.extend(f"sentencia repetida {count} veces: {shape[:200]}" for shape, count in self.repeated())
+        return problems
+    
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.statements} queries, {self.rows} rows"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(budget: Optional[int] = None) -> Iterator[QueryStats]:
+    """Acumular las sentencias del bloque (y de lo que corra en su contexto)"""
+    stats = QueryStats(budget)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def query_budget(max_queries: int, repeat_limit: Optional[int] = None) -> Callable[[], None]:
+    """Dependencia que declara el presupuesto de consultas de una ruta"""
+    
+    def declare():
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_queries
+            if repeat_limit is not None:
+                stats.repeat_limit = repeat_limit
+    
+    return declare
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get(_START_KEY)
+    if stats is not None and starts:
+        stats.record(statement, time.perf_counter() - starts.pop(), cursor.rowcount)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(_START_KEY):
+        connection.info[_START_KEY].pop()
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI que abre un `QueryStats` por petición HTTP, agrega
+    `Server-Timing` fuera de producción y verifica el presupuesto.
+    Sin `strict` explícito sigue SQL_STRICT_MODE en cada petición.
+
+    En modo estricto el presupuesto se verifica al iniciar la respuesta, que
+    se reemplaza por un 500; lo que se consulte después (cuerpos en streaming,
+    tareas en segundo plano) solo puede registrarse como error.
+    """
+    
+    def __init__(self, app, server_timing: bool = settings.ENVIRONMENT != "production",
+                 strict: Optional[bool] = None):
+        self.app = app
+        self.server_timing = server_timing
+        self.strict = strict
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        strict = settings.SQL_STRICT_MODE if self.strict is None else self.strict
+        rejected = False
+        
+        async def send_checked(message):
+            nonlocal rejected
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                problems = stats.violations() if strict else []
+                if problems:
+                    rejected = True
+                    await self._reject(scope, receive, send, stats, problems)
+                    return
+                if self.server_timing:
+                    MutableHeaders(scope=message).append(SERVER_TIMING_HEADER, stats.server_timing())
+            await send(message)
+        
+        with track_queries() as stats:
+            await self.app(scope, receive, send_checked)
+        
+        problems = stats.violations()
+        if problems and not rejected:
+            detail = self._detail(scope, problems)
+            if strict:
+                logger.error("Presupuesto de SQL excedido después de iniciar la respuesta en %s", detail)
+            else:
+                logger.warning("Presupuesto de SQL excedido en %s", detail)
+    
+    @staticmethod
+    def _detail(scope, problems: List[str]) -> str:
+        return f"{scope['method']} {scope['path']}: " + "; ".join(problems)
+    
+    async def _reject(self, scope, receive, send, stats: QueryStats, problems: List[str]):
+        detail = self._detail(scope, problems)
+        logger.error("Presupuesto de SQL excedido en %s", detail)
+        headers = {SERVER_TIMING_HEADER: stats.server_timing()} if self.server_timing else None
+        response = JSONResponse(status_code=500, content={"detail": detail}, headers=headers)
+        await response(scope, receive, send)
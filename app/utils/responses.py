@@ -0,0 +1,78 @@
+"""
+Respuestas JSON rápidas para listados grandes (opt-in con FAST_JSON_RESPONSES).
+
+El camino por defecto de FastAPI valida cada fila ORM contra el
+`response_model` con `from_attributes` y luego serializa con el `json` de la
+biblioteca estándar. Las filas ORM ya vienen tipadas (Decimal, datetime,
+enums), así que `ListEncoder` toma directamente los atributos del esquema y
+los codifica con orjson. Sin orjson instalado usa el `TypeAdapter`
+preconstruido del esquema, que valida y serializa en pydantic-core.
+
+La salida es la misma que la del camino por defecto: Decimal como cadena,
+UUID como cadena y fechas ISO 8601 con `Z` para UTC.
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Type
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    # Dependencia opcional: sin orjson se serializa con pydantic-core
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto con orjson (Decimal como cadena)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` que codifica con orjson y acepta bytes ya codificados"""
+    
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is None:
+            return super().render(content)
+        return dumps(content)
+
+
+class ListEncoder:
+    """Codificador preconstruido de listas de un esquema de respuesta"""
+    
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.adapter = TypeAdapter(List[schema])
+    
+    def _row(self, obj: Any) -> Dict[str, Any]:
+        # Los atributos ya cargados están en __dict__; leerlos ahí evita los descriptores del ORM
+        state = getattr(obj, "__dict__", {})
+        try:
+            return {name: state[name] for name in self.fields}
+        except KeyError:
+            return {name: getattr(obj, name) for name in self.fields}
+    
+    def rows(self, objs: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Atributos del esquema de cada objeto, sin revalidar"""
+        return [self._row(obj) for obj in objs]
+    
+    def validate(self, objs: Sequence[Any]) -> List[BaseModel]:
+        return self.adapter.validate_python(objs, from_attributes=True)
+    
+    def encode(self, objs: Sequence[Any]) -> bytes:
+        if orjson is not None:
+            return dumps(self.rows(objs))
+        return self.adapter.dump_json(self.validate(objs))
+    
+    def response(self, objs: Sequence[Any], headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+        return FastJSONResponse(self.encode(objs), headers=headers)
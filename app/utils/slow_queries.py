@@ -0,0 +1,208 @@
+"""
+Registro de consultas lentas con captura del plan de ejecución.
+
+Los eventos de cada engine registrado miden las sentencias. Cuando una supera
+SLOW_QUERY_THRESHOLD_MS, pasa el muestreo (SLOW_QUERY_SAMPLE_RATE) y el
+límite por minuto (SLOW_QUERY_MAX_PER_MINUTE), se registra con:
+- la sentencia normalizada;
+- la forma de los parámetros (tipos, no valores);
+- el método de repositorio que la originó;
+- el plan (EXPLAIN en PostgreSQL, EXPLAIN QUERY PLAN en SQLite).
+
+El plan se obtiene en la misma conexión, sin ejecutar la sentencia, y se
+guarda por forma de sentencia durante SLOW_QUERY_EXPLAIN_TTL_SECONDS para no
+repetir EXPLAIN sobre una consulta que ya se sabe lenta.
+"""
+
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..config.settings import settings
+from .cache import MISSING, TTLCache
+from .metrics import Counter, registry
+from .query_stats import statement_shape
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = registry.register(Counter(
+    "db_slow_queries_total", "Sentencias por encima de SLOW_QUERY_THRESHOLD_MS (antes del muestreo)", ("engine",)
+))
+
+_START_KEY = "slow_query_start"
+_APP_PACKAGE = __name__.rsplit(".", 2)[0]
+_REPOSITORIES = f"{_APP_PACKAGE}.repositories"
+_UTILS = f"{_APP_PACKAGE}.utils"
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_MAX_FRAMES = 60
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Tipos de los parámetros ligados (sin sus valores); en executemany, filas y forma de la primera"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "first": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def calling_method() -> Optional[str]:
+    """
+    Método de repositorio más externo en la pila actual (el que llamó el
+    servicio) o, si la sentencia no salió de un repositorio (cargas diferidas,
+    commits), la primera función de la aplicación fuera de `utils`
+    """
+    frame = sys._getframe(1)
+    repository = caller = None
+    for _ in range(_MAX_FRAMES):
+        if frame is None:
+            break
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(_APP_PACKAGE) and not module.startswith(_UTILS):
+            owner = frame.f_locals.get("self")
+            name = f"{type(owner).__name__}.{frame.f_code.co_name}" if owner is not None else f"{module}.{frame.f_code.co_name}"
+            if module.startswith(_REPOSITORIES):
+                repository = name
+            elif repository is not None:
+                break
+            elif caller is None:
+                caller = name
+        frame = frame.f_back
+    return repository or caller
+
+
+class SlowQueryLog:
+    """Detección, muestreo y registro de las sentencias lentas de los engines asociados"""
+    
+    def __init__(self, threshold_ms: float = settings.SLOW_QUERY_THRESHOLD_MS,
+                 sample_rate: float = settings.SLOW_QUERY_SAMPLE_RATE,
+                 max_per_minute: int = settings.SLOW_QUERY_MAX_PER_MINUTE,
+                 explain: bool = settings.SLOW_QUERY_EXPLAIN,
+                 explain_ttl: float = settings.SLOW_QUERY_EXPLAIN_TTL_SECONDS,
+                 recent_size: int = 100):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_per_minute = max_per_minute
+        self.explain = explain
+        self.plans = TTLCache(maxsize=1000, ttl=explain_ttl)
+        self.recent: Deque[dict] = deque(maxlen=recent_size)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.slow = 0
+        self.logged = 0
+        self.dropped = 0
+    
+    def attach(self, engine: Engine, name: str):
+        """Registrar los eventos de medición en el engine (síncrono o `sync_engine` de uno asíncrono)"""
+        
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+        
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get(_START_KEY)
+            if not starts:
+                return
+            duration = time.perf_counter() - starts.pop()
+            if duration >= self.threshold:
+                self.record(conn, name, statement, parameters, executemany, duration)
+        
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get(_START_KEY):
+                connection.info[_START_KEY].pop()
+    
+    def _admit(self) -> bool:
+        """Muestreo y límite de registros por ventana de un minuto"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._window_start = now
+                self._window_count = 0
+            if self._window_count >= self.max_per_minute:
+                self.dropped += 1
+                return False
+            self._window_count += 1
+            return True
+    
+    def _plan(self, conn, statement: str, parameters: Any) -> List[str]:
+        """Plan de la sentencia en la misma conexión; en PostgreSQL dentro de un savepoint"""
+        prefix = _EXPLAIN_PREFIX.get(conn.dialect.name, "EXPLAIN ")
+        postgresql = conn.dialect.name == "postgresql"
+        cursor = conn.connection.cursor()
+        try:
+            if postgresql:
+                cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                if postgresql:
+                    cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            if postgresql:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        finally:
+            cursor.close()
+        return [str(row[-1]) for row in rows]
+    
+    def record(self, conn, engine_name: str, statement: str, parameters: Any, executemany: bool,
+               duration: float):
+        SLOW_QUERIES.inc(engine_name)
+        with self._lock:
+            self.slow += 1
+        if not self._admit():
+            return
+        
+        shape = statement_shape(statement)
+        entry: Dict[str, Any] = {
+            "engine": engine_name,
+            "duration_ms": round(duration * 1000, 2),
+            "caller": calling_method(),
+            "statement": shape,
+            "parameters": parameter_shape(parameters, executemany)
+        }
+        if self.explain and not executemany and shape.lower().startswith(_EXPLAINABLE):
+            key = (engine_name, shape)
+            plan = self.plans.get(key)
+            if plan is MISSING:
+                try:
+                    plan = self._plan(conn, statement, parameters)
+                except Exception as e:
+                    plan = [f"EXPLAIN falló: {e}"]
+                self.plans.set(key, plan)
+            entry["plan"] = plan
+        
+        with self._lock:
+            self.logged += 1
+            self.recent.append(entry)
+        logger.warning("Consulta lenta: %s", json.dumps(entry, ensure_ascii=False, default=str))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "sample_rate": self.sample_rate,
+            "max_per_minute": self.max_per_minute,
+            "slow": self.slow,
+            "logged": self.logged,
+            "dropped": self.dropped,
+            "plans_cached": len(self.plans)
+        }
+
+
+slow_query_log = SlowQueryLog()
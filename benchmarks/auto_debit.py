@@ -0,0 +1,90 @@
+"""
+Benchmark del débito automático.
+
+Compara `PaymentService.process_automatic_payment` (una cuota y tres commits
+por llamada) con el job en bloque `app.jobs.auto_debit` y verifica que los
+saldos y pagos resultantes coincidan con lo cobrado.
+
+    python -m benchmarks.auto_debit
+"""
+
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from .common import sqlite_session, timed
+
+from app.jobs import auto_debit
+from app.models import Credit, CreditStatus, Payment, PaymentSchedule
+from app.services.payment import payment_service
+
+CREDITS = int(os.environ.get("BENCH_AUTO_DEBIT_CREDITS", "5000"))
+DUE_PER_CREDIT = 4
+TERM = 12
+LEGACY_SAMPLE = 300
+INSTALLMENT = Decimal("95.50")
+NOW = datetime(2026, 1, 1)
+
+
+def _seed(db):
+    connection = db.connection()
+    connection.exec_driver_sql(
+        "INSERT INTO credits (id, user_id, amount, interest_rate, term_months, status, remaining_balance) "
+        "VALUES (?, '00000000000000000000000000000001', 1000, 20, ?, ?, ?)",
+        [(credit_id, TERM, CreditStatus.ACTIVE.name, str(INSTALLMENT * TERM)) for credit_id in range(1, CREDITS + 1)]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO payment_schedule (credit_id, installment_number, due_date, principal_amount, "
+        "interest_amount, total_amount, is_paid) VALUES (?, ?, ?, 80, 15.5, ?, 0)",
+        [
+            (credit_id, number, (NOW + timedelta(days=30 * (number - DUE_PER_CREDIT))).isoformat(" "), str(INSTALLMENT))
+            for credit_id in range(1, CREDITS + 1) for number in range(1, TERM + 1)
+        ]
+    )
+    db.commit()
+
+
+def _legacy(db, schedule_ids):
+    for schedule_id in schedule_ids:
+        payment_service.process_automatic_payment(db, schedule_id)
+
+
+def run() -> dict:
+    with sqlite_session() as db:
+        _seed(db)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        
+        sample = db.scalars(
+            select(PaymentSchedule.id).where(PaymentSchedule.due_date <= NOW).limit(LEGACY_SAMPLE)
+        ).all()
+        legacy = timed(_legacy, db, sample, repeat=1)
+        
+        metrics = auto_debit.run(NOW, chunk_size=500, parallelism=4, session_factory=session_factory)
+        assert not metrics["failed_chunks"], metrics["failed_chunks"]
+        expected = CREDITS * DUE_PER_CREDIT - LEGACY_SAMPLE
+        assert metrics["installments_paid"] == expected, metrics
+        
+        # Idempotente: una segunda ejecución no encuentra cuotas vencidas
+        again = auto_debit.run(NOW, session_factory=session_factory)
+        assert again["installments_paid"] == 0, again
+        
+        db.expire_all()
+        payments = db.scalar(select(func.count(Payment.id)))
+        balance = db.scalar(select(func.sum(Credit.remaining_balance)))
+        assert payments == CREDITS * DUE_PER_CREDIT, payments
+        assert balance == INSTALLMENT * (TERM - DUE_PER_CREDIT) * CREDITS, balance
+    
+    return {
+        "auto_debit.legacy.installments_per_sec": LEGACY_SAMPLE / legacy,
+        "auto_debit.bulk.installments_per_sec": metrics["installments_per_sec"],
+        "auto_debit.bulk.installments": metrics["installments_paid"],
+        "auto_debit.bulk.seconds": metrics["elapsed_seconds"]
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.1f}")
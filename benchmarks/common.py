@@ -0,0 +1,63 @@
+"""
+Utilidades compartidas por los benchmarks
+"""
+
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+
+# Valores por defecto para poder importar la aplicación sin un .env
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("USER_SERVICE_URL", "http://localhost:8001")
+os.environ.setdefault("VEHICLE_SERVICE_URL", "http://localhost:8002")
+os.environ.setdefault("SERVICE_TOKEN", "benchmark-token")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.utils.database import Base
+
+
+@contextmanager
+def sqlite_session():
+    """Sesión sobre una base SQLite temporal en disco (fsync real por commit)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        try:
+            yield session
+        finally:
+            session.close()
+            engine.dispose()
+
+
+def timed(fn, *args, repeat: int = 5, **kwargs) -> float:
+    """Mejor tiempo (segundos) de `repeat` ejecuciones"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL que ejecuta un engine mientras está activo"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+    
+    def _on_execute(self, *args):
+        self.count += 1
+    
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
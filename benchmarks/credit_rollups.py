@@ -0,0 +1,123 @@
+"""
+Benchmark y control de desvíos de los rollups por crédito.
+
+Genera calendarios con `CreditService.generate_payment_schedule`, registra
+pagos por todos los caminos de escritura (pago manual, cuota marcada, débito
+automático individual y en bloque) y verifica que `credit_rollups` coincida
+con la reconstrucción desde las tablas de origen. Luego compara el resumen de
+pagos de un usuario leído del rollup con la agregación sobre pagos y cuotas.
+
+    python -m benchmarks.credit_rollups
+"""
+
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from .common import QueryCounter, sqlite_session, timed
+
+from app.models import Credit, CreditRollup, CreditStatus, PaymentSchedule
+from app.repositories import credit_rollup_repository, payment_repository, payment_schedule_repository
+from app.schemas import PaymentRequest
+from app.services.credit import credit_service
+from app.services.payment import payment_service
+
+CREDITS = 300
+TERM = 24
+AMOUNT = Decimal("1000.00")
+RATE = Decimal("20.00")
+# Consultas esperadas del resumen cuando no hay cuotas vencidas: solo el rollup
+ROLLUP_QUERY_BUDGET = 1
+
+
+def _seed(db) -> tuple:
+    user_id = str(uuid.uuid4())
+    monthly_payment = credit_service.calculate_monthly_payment(AMOUNT, RATE, TERM)
+    credit_ids = db.scalars(insert(Credit).returning(Credit.id), [
+        {"user_id": user_id, "amount": AMOUNT, "interest_rate": RATE, "term_months": TERM,
+         "status": CreditStatus.ACTIVE, "monthly_payment": monthly_payment, "remaining_balance": AMOUNT}
+        for _ in range(CREDITS)
+    ]).all()
+    db.commit()
+    for credit_id in credit_ids:
+        credit_service.generate_payment_schedule(db, credit_id, AMOUNT, RATE, TERM, AMOUNT, monthly_payment)
+    return user_id, credit_ids
+
+
+def _write_payments(db, user_id, credit_ids):
+    schedule_ids = {
+        credit_id: [installment.id for installment in payment_schedule_repository.get_by_credit(db, credit_id)]
+        for credit_id in credit_ids
+    }
+    for credit_id in credit_ids[:50]:
+        payment_service.create_payment(
+            db, user_id, PaymentRequest(credit_id=credit_id, amount=Decimal("12.34"), payment_method="efectivo")
+        )
+    for credit_id in credit_ids[50:100]:
+        payment_service.mark_installment_as_paid(db, user_id, schedule_ids[credit_id][0])
+    for credit_id in credit_ids[100:150]:
+        payment_service.process_automatic_payment(db, schedule_ids[credit_id][0])
+    payment_service.process_automatic_payments(
+        db, [ids[number] for ids in schedule_ids.values() for number in range(2)]
+    )
+    db.expunge_all()
+
+
+def _stored(db, credit_ids):
+    columns = [getattr(CreditRollup, name) for name in (
+        "credit_id", "payments_count", "total_paid", "last_payment_date", "paid_installments",
+        "pending_installments", "paid_amount", "pending_amount", "next_due_date"
+    )]
+    return [tuple(row) for row in db.execute(
+        select(*columns).where(CreditRollup.credit_id.in_(credit_ids)).order_by(CreditRollup.credit_id)
+    ).all()]
+
+
+def _legacy_total_paid(db, credit_id):
+    return sum(payment.amount for payment in db.scalars(payment_repository.paid_by_credit_query(credit_id)).all())
+
+
+def _aggregate_summary(db, user_id):
+    return payment_repository.get_totals(db, user_id=user_id), payment_schedule_repository.get_summary(db, user_id=user_id)
+
+
+def run() -> dict:
+    with sqlite_session() as db:
+        user_id, credit_ids = _seed(db)
+        _write_payments(db, user_id, credit_ids)
+        
+        stored = _stored(db, credit_ids)
+        rebuilt = sorted(credit_rollup_repository.get_rebuilt(db, credit_ids))
+        drift = [(a, b) for a, b in zip(stored, rebuilt) if a != b]
+        assert len(stored) == CREDITS and not drift, drift[:3]
+        
+        with QueryCounter(db.get_bind()) as counter:
+            summary = payment_service.calculate_payment_summary(db, user_id)
+        assert counter.count <= ROLLUP_QUERY_BUDGET, f"resumen: {counter.count} consultas"
+        payments, schedule = _aggregate_summary(db, user_id)
+        assert summary["total_payments"] == payments.total_payments, (summary, payments)
+        assert summary["total_amount"] == float(payments.total_amount), (summary, payments)
+        assert summary["paid_installments"] == schedule.paid_installments, (summary, schedule)
+        assert summary["pending_installments"] == schedule.pending_installments, (summary, schedule)
+        assert payment_repository.get_total_payments_by_credit(db, credit_ids[0]) == _legacy_total_paid(db, credit_ids[0])
+        db.expunge_all()
+        
+        rollup_time = timed(payment_service.calculate_payment_summary, db, user_id, repeat=20)
+        aggregate_time = timed(_aggregate_summary, db, user_id, repeat=20)
+        total_time = timed(payment_repository.get_total_payments_by_credit, db, credit_ids[0], repeat=20)
+        legacy_total_time = timed(_legacy_total_paid, db, credit_ids[0], repeat=20)
+        rebuild_time = timed(credit_rollup_repository.rebuild, db, repeat=3)
+        assert _stored(db, credit_ids) == stored
+    return {
+        f"credit_rollups.summary.aggregate.{CREDITS}c.ms": aggregate_time * 1000,
+        f"credit_rollups.summary.rollup.{CREDITS}c.ms": rollup_time * 1000,
+        "credit_rollups.total_paid.legacy.ms": legacy_total_time * 1000,
+        "credit_rollups.total_paid.rollup.ms": total_time * 1000,
+        f"credit_rollups.rebuild.{CREDITS}c.ms": rebuild_time * 1000
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.3f}")
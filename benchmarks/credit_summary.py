@@ -0,0 +1,96 @@
+"""
+Benchmark del resumen de crédito.
+
+Compara el cálculo en Python sobre las cuotas cargadas como objetos ORM con
+la agregación condicional en SQL de `PaymentScheduleRepository.get_summary`,
+para créditos de 360 cuotas con la mitad pagadas.
+
+    python -m benchmarks.credit_summary
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import update
+
+from .common import sqlite_session, timed
+
+from app.models import Credit, CreditStatus, PaymentSchedule
+from app.repositories import credit_rollup_repository, payment_schedule_repository
+from app.services.credit import credit_service
+
+TERM = 360
+AMOUNT = Decimal("250000.00")
+RATE = Decimal("12.50")
+
+
+def _legacy_summary(db, credit_id):
+    schedule = payment_schedule_repository.get_by_credit(db, credit_id)
+    paid_installments = [i for i in schedule if i.is_paid]
+    pending_installments = [i for i in schedule if not i.is_paid]
+    overdue_installments = [i for i in pending_installments if i.due_date < datetime.now()]
+    return {
+        "total_paid": float(sum(i.total_amount for i in paid_installments)),
+        "total_pending": float(sum(i.total_amount for i in pending_installments)),
+        "total_overdue": float(sum(i.total_amount for i in overdue_installments)),
+        "paid_installments": len(paid_installments),
+        "pending_installments": len(pending_installments),
+        "overdue_installments": len(overdue_installments),
+        "total_installments": len(schedule)
+    }
+
+
+def _sql_summary(db, credit_id):
+    summary = credit_service.calculate_credit_summary(db, credit_id)
+    # El mapa de identidad no debe acumular cuotas entre repeticiones
+    db.expunge_all()
+    return summary
+
+
+def _legacy_run(db, credit_id):
+    _legacy_summary(db, credit_id)
+    db.expunge_all()
+
+
+def run() -> dict:
+    with sqlite_session() as db:
+        monthly_payment = credit_service.calculate_monthly_payment(AMOUNT, RATE, TERM)
+        credit = Credit(
+            user_id=str(uuid.uuid4()), amount=AMOUNT, interest_rate=RATE, term_months=TERM,
+            status=CreditStatus.ACTIVE, monthly_payment=monthly_payment, remaining_balance=AMOUNT
+        )
+        db.add(credit)
+        db.commit()
+        credit_service.generate_payment_schedule(
+            db, credit.id, AMOUNT, RATE, TERM, AMOUNT, monthly_payment
+        )
+        # Mitad pagadas y dos tercios del calendario ya vencidos
+        shift = timedelta(days=30 * TERM * 2 // 3)
+        db.execute(update(PaymentSchedule), [
+            {"id": installment.id, "is_paid": installment.installment_number <= TERM // 2,
+             "due_date": installment.due_date - shift}
+            for installment in payment_schedule_repository.get_by_credit(db, credit.id)
+        ])
+        # La actualización directa no pasa por los repositorios: se repara el rollup
+        credit_rollup_repository.rebuild(db, credit_ids=[credit.id], commit=False)
+        db.commit()
+        credit_id = credit.id
+        db.expunge_all()
+        
+        legacy = _legacy_summary(db, credit_id)
+        sql = _sql_summary(db, credit_id)
+        assert all(legacy[key] == sql[key] for key in legacy), (legacy, sql)
+        
+        legacy_time = timed(_legacy_run, db, credit_id, repeat=20)
+        sql_time = timed(_sql_summary, db, credit_id, repeat=20)
+    return {
+        "credit_summary.legacy.360m.ms": legacy_time * 1000,
+        "credit_summary.sql.360m.ms": sql_time * 1000,
+        "credit_summary.speedup": legacy_time / sql_time
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.3f}")
@@ -0,0 +1,77 @@
+"""
+Benchmark del barrido de mora de la cartera.
+
+Genera `BENCH_SWEEP_CREDITS` créditos ACTIVE/DELINQUENT (1.000.000 por
+defecto) con dos cuotas cada uno, ejecuta `CreditService.sweep_delinquency`
+y compara la duración proyectada a un millón de créditos con el objetivo.
+
+    python -m benchmarks.delinquency_sweep
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+from .common import sqlite_session
+
+from app.models import CreditStatus
+from app.services.credit import credit_service
+
+CREDITS = int(os.environ.get("BENCH_SWEEP_CREDITS", "1000000"))
+CHUNK_SIZE = int(os.environ.get("BENCH_SWEEP_CHUNK_SIZE", "10000"))
+# Objetivo en una base local: un millón de créditos en menos de un minuto
+TARGET_SECONDS_PER_MILLION = 60.0
+NOW = datetime(2026, 1, 1)
+
+
+def _seed(db):
+    """Un tercio de créditos con cuota vencida; estados iniciales mezclados"""
+    connection = db.connection()
+    user_id = "00000000000000000000000000000001"
+    statuses = (CreditStatus.ACTIVE.name, CreditStatus.DELINQUENT.name)
+    connection.exec_driver_sql(
+        "INSERT INTO credits (id, user_id, amount, interest_rate, term_months, status, remaining_balance) "
+        "VALUES (?, ?, 1000, 20, 2, ?, 1000)",
+        [(credit_id, user_id, statuses[credit_id % 2]) for credit_id in range(1, CREDITS + 1)]
+    )
+    past, future = (NOW - timedelta(days=10)).isoformat(" "), (NOW + timedelta(days=20)).isoformat(" ")
+    connection.exec_driver_sql(
+        "INSERT INTO payment_schedule (credit_id, installment_number, due_date, principal_amount, "
+        "interest_amount, total_amount, is_paid) VALUES (?, ?, ?, 500, 10, 510, ?)",
+        [
+            (credit_id, 1, past, int(credit_id % 3 != 0)) for credit_id in range(1, CREDITS + 1)
+        ] + [
+            (credit_id, 2, future, 0) for credit_id in range(1, CREDITS + 1)
+        ]
+    )
+    db.commit()
+
+
+def run() -> dict:
+    with sqlite_session() as db:
+        _seed(db)
+        metrics = credit_service.sweep_delinquency(db, CHUNK_SIZE, now=NOW)
+        
+        # Segunda pasada: la cartera ya está al día, no debe haber cambios
+        idle = credit_service.sweep_delinquency(db, CHUNK_SIZE, now=NOW)
+        assert idle["to_delinquent"] == idle["to_active"] == 0, idle
+    
+    elapsed = metrics["elapsed_seconds"]
+    return {
+        "delinquency_sweep.credits": CREDITS,
+        "delinquency_sweep.seconds": elapsed,
+        "delinquency_sweep.credits_per_sec": CREDITS / elapsed,
+        "delinquency_sweep.seconds_per_million": elapsed * 1_000_000 / CREDITS,
+        "delinquency_sweep.idle_seconds": idle["elapsed_seconds"],
+        "delinquency_sweep.to_delinquent": metrics["to_delinquent"],
+        "delinquency_sweep.to_active": metrics["to_active"]
+    }
+
+
+if __name__ == "__main__":
+    results = run()
+    for name, value in results.items():
+        print(f"{name:50s} {value:12.2f}")
+    if results["delinquency_sweep.seconds_per_million"] > TARGET_SECONDS_PER_MILLION:
+        print(f"Por encima del objetivo de {TARGET_SECONDS_PER_MILLION:.0f}s por millón de créditos")
+        sys.exit(1)
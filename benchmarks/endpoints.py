@@ -0,0 +1,128 @@
+"""
+Benchmark de las rutas de resumen y de listados a distintas profundidades.
+
+Atiende las peticiones con la aplicación completa (TestClient) y el servicio
+de usuarios simulado en proceso. Mide el resumen de crédito y de pagos
+(global y por crédito) y, para los listados de pagos de un crédito y de un
+usuario, la primera página y una página a `DEPTH` filas de profundidad por
+offset (`skip`) y por cursor.
+
+    python -m benchmarks.endpoints
+    DATABASE_ASYNC=true python -m benchmarks.endpoints
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIR, 'bench.db')}"
+
+from .common import timed  # noqa: E402  (configura el entorno)
+from .stub_user_service import running_stub  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.config.settings import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Credit, CreditStatus, Payment, PaymentSchedule, PaymentStatus  # noqa: E402
+from app.repositories import payment_repository  # noqa: E402
+from app.services.credit import credit_service  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+from app.utils.database import SessionLocal  # noqa: E402
+
+CREDITS = 50
+TERM = 36
+PAYMENTS = int(os.environ.get("BENCH_ENDPOINT_PAYMENTS", "5000"))
+DEPTH = PAYMENTS - 100
+PAGE = 100
+REQUESTS = 60
+
+
+def _token(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {jwt.encode({'sub': user_id}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)}"}
+
+
+def _seed(user_id: str) -> int:
+    """Créditos del usuario con su calendario; el primero concentra los `PAYMENTS` pagos"""
+    now = datetime.now()
+    with SessionLocal() as db:
+        credit_ids = db.scalars(insert(Credit).returning(Credit.id), [
+            {"user_id": user_id, "amount": Decimal("5000.00"), "interest_rate": Decimal("24.00"), "term_months": TERM,
+             "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("196.16"), "remaining_balance": Decimal("5000.00")}
+            for _ in range(CREDITS)
+        ]).all()
+        db.execute(insert(PaymentSchedule), [
+            {"credit_id": credit_id, "installment_number": number,
+             "due_date": now + timedelta(days=30 * (number - TERM // 3)),
+             "principal_amount": Decimal("96.16"), "interest_amount": Decimal("100.00"),
+             "total_amount": Decimal("196.16"), "is_paid": number <= TERM // 3}
+            for credit_id in credit_ids for number in range(1, TERM + 1)
+        ])
+        db.execute(insert(Payment), [
+            {"credit_id": credit_ids[0], "amount": Decimal("1.00"), "payment_method": "efectivo",
+             "payment_date": now - timedelta(minutes=index), "status": PaymentStatus.PAID}
+            for index in range(PAYMENTS)
+        ])
+        db.commit()
+        credit_service.rebuild_rollups(db)
+    return credit_ids[0]
+
+
+def _cursor_at(depth: int, **filters) -> str:
+    """Cursor que continúa después de la fila `depth` en el orden por id de los listados"""
+    with SessionLocal() as db:
+        query = select(Payment).filter_by(**filters).order_by(Payment.id).offset(depth - 1).limit(1)
+        return payment_repository.keyset.encode(db.scalar(query))
+
+
+def _ms(client: TestClient, url: str, headers: dict) -> float:
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, (url, response.text)
+    return timed(client.get, url, headers=headers, repeat=REQUESTS) * 1000
+
+
+def run() -> dict:
+    owner = str(uuid.uuid4())
+    headers = _token(owner)
+    results = {}
+    with running_stub() as base_url:
+        user_service.user_service_url = base_url
+        with TestClient(app) as client:
+            credit_id = _seed(owner)
+            credit_cursor = _cursor_at(DEPTH, credit_id=credit_id)
+            user_cursor = _cursor_at(DEPTH)
+            
+            cases = {
+                "summary.credit": f"/api/v1/credits/{credit_id}/summary",
+                "summary.payments": "/api/v1/payments/summary",
+                "summary.payments_by_credit": f"/api/v1/payments/summary?credit_id={credit_id}",
+                "list.credit_payments.first": f"/api/v1/credits/{credit_id}/payments?limit={PAGE}",
+                "list.credit_payments.deep_offset": f"/api/v1/credits/{credit_id}/payments?limit={PAGE}&skip={DEPTH}",
+                "list.credit_payments.deep_cursor": f"/api/v1/credits/{credit_id}/payments?limit={PAGE}&cursor={credit_cursor}",
+                "list.user_payments.first": f"/api/v1/payments/?limit={PAGE}",
+                "list.user_payments.deep_offset": f"/api/v1/payments/?limit={PAGE}&skip={DEPTH}",
+                "list.user_payments.deep_cursor": f"/api/v1/payments/?limit={PAGE}&cursor={user_cursor}",
+                "list.credits.first": f"/api/v1/credits/?limit={PAGE}",
+            }
+            for name, url in cases.items():
+                results[f"endpoints.{name}_ms"] = _ms(client, url, headers)
+            
+            # El cursor y el offset deben devolver la misma página
+            by_offset = client.get(cases["list.user_payments.deep_offset"], headers=headers).json()
+            by_cursor = client.get(cases["list.user_payments.deep_cursor"], headers=headers).json()
+            assert by_offset == by_cursor and len(by_cursor) == PAGE
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        for name, value in run().items():
+            print(f"{name:55s} {value:10.2f}")
+    finally:
+        shutil.rmtree(_DIR, ignore_errors=True)
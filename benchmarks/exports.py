@@ -0,0 +1,91 @@
+"""
+Benchmark y control de memoria de las exportaciones en streaming.
+
+Exporta pagos en NDJSON y CSV con `ExportService` para dos volúmenes y
+verifica con `tracemalloc` que el pico de memoria no crezca con la cantidad
+de filas, a diferencia de `get_payments_by_date_range` que materializa todo.
+
+    python -m benchmarks.exports
+"""
+
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from .common import sqlite_session
+
+from app.models import CreditStatus, PaymentStatus
+from app.repositories import payment_repository
+from app.services.export import ExportService
+
+SIZES = (10_000, int(os.environ.get("BENCH_EXPORT_ROWS", "100000")))
+NOW = datetime(2026, 1, 1)
+# El pico del volumen mayor no debe superar este múltiplo del menor
+MAX_PEAK_GROWTH = 1.5
+
+
+def _seed(db, rows: int):
+    connection = db.connection()
+    connection.exec_driver_sql(
+        "INSERT INTO credits (id, user_id, amount, interest_rate, term_months, status, remaining_balance) "
+        "VALUES (1, '00000000000000000000000000000001', 1000, 20, 12, ?, 1000)",
+        (CreditStatus.ACTIVE.name,)
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO payments (credit_id, amount, payment_date, payment_method, description, status) "
+        "VALUES (1, '95.50', ?, 'auto_debit', ?, ?)",
+        [
+            ((NOW + timedelta(minutes=index)).isoformat(" ", timespec="microseconds"), f"Pago #{index}", PaymentStatus.PAID.name)
+            for index in range(rows)
+        ]
+    )
+    db.commit()
+
+
+def _peak(fn) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def _drain(chunks) -> int:
+    return sum(chunk.count(b"\n") for chunk in chunks)
+
+
+def run() -> dict:
+    results = {}
+    peaks = {}
+    for rows in SIZES:
+        with sqlite_session() as db:
+            _seed(db, rows)
+            service = ExportService(sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind()))
+            end = NOW + timedelta(minutes=rows)
+            for fmt, header_lines in (("ndjson", 0), ("csv", 1)):
+                lines, peak, elapsed = _peak(lambda: _drain(service.export_payments(fmt, NOW, end)))
+                assert lines == rows + header_lines, (fmt, lines)
+                peaks[(fmt, rows)] = peak
+                results[f"exports.{fmt}.{rows}.rows_per_sec"] = rows / elapsed
+                results[f"exports.{fmt}.{rows}.peak_mb"] = peak / 2 ** 20
+            
+            if rows == SIZES[0]:
+                loaded, peak, _ = _peak(lambda: len(payment_repository.get_payments_by_date_range(db, NOW, end)))
+                db.expunge_all()
+                results[f"exports.materialized.{rows}.peak_mb"] = peak / 2 ** 20
+    
+    for fmt in ("ndjson", "csv"):
+        growth = peaks[(fmt, SIZES[1])] / peaks[(fmt, SIZES[0])]
+        assert growth <= MAX_PEAK_GROWTH, f"{fmt}: el pico de memoria creció x{growth:.2f}"
+        results[f"exports.{fmt}.peak_growth"] = growth
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.3f}")
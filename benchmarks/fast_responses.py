@@ -0,0 +1,137 @@
+"""
+Benchmark de la serialización de listados grandes (FAST_JSON_RESPONSES).
+
+Compara, sobre un calendario de 360 cuotas, el camino por defecto de FastAPI
+(validar cada fila ORM con `from_attributes` y codificar con `json`) con
+`ListEncoder`, tanto aislado como de punta a punta, y verifica que ambos
+caminos devuelvan exactamente los mismos bytes y encabezados en
+`/credits/{id}/schedule`, `/schedule/overdue` y `/payments/`.
+
+    python -m benchmarks.fast_responses
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIR, 'bench.db')}"
+
+from .common import timed  # noqa: E402  (configura el entorno)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.config.settings import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Credit, CreditStatus, Payment, PaymentSchedule, PaymentStatus  # noqa: E402
+from app.repositories import payment_schedule_repository  # noqa: E402
+from app.routers.payments import schedule_list  # noqa: E402
+from app.schemas import PaymentScheduleResponse  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+from app.utils.database import Base, SessionLocal, engine  # noqa: E402
+
+TERM = 360
+PAYMENTS = 100
+REPEAT = 20
+
+
+def _token(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {jwt.encode({'sub': user_id}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)}"}
+
+
+async def _user_info(user_id: str) -> dict:
+    return {"data": {"id": user_id, "role": "admin"}, "role": "admin"}
+
+
+def _seed(user_id: str) -> int:
+    now = datetime.now()
+    with SessionLocal() as db:
+        credit_id = db.scalar(insert(Credit).returning(Credit.id), [{
+            "user_id": user_id, "amount": Decimal("100000.00"), "interest_rate": Decimal("12.00"),
+            "term_months": TERM, "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("1028.61"),
+            "remaining_balance": Decimal("100000.00"), "approved_at": now
+        }])
+        # La mitad del calendario ya venció sin pagarse, para /schedule/overdue
+        db.execute(insert(PaymentSchedule), [
+            {"credit_id": credit_id, "installment_number": number,
+             "due_date": now + timedelta(days=30 * (number - TERM // 2)),
+             "principal_amount": Decimal("28.61"), "interest_amount": Decimal("1000.00"),
+             "total_amount": Decimal("1028.61"), "is_paid": number <= 10,
+             "paid_date": now - timedelta(days=30 * (TERM // 2 - number)) if number <= 10 else None}
+            for number in range(1, TERM + 1)
+        ])
+        db.execute(insert(Payment), [
+            {"credit_id": credit_id, "amount": Decimal("1028.61"), "payment_method": "transferencia",
+             "description": "Cuota ñ", "payment_date": now - timedelta(days=index), "status": PaymentStatus.PAID}
+            for index in range(PAYMENTS)
+        ])
+        db.commit()
+    return credit_id
+
+
+def _default_path(adapter: TypeAdapter, rows: list) -> bytes:
+    """Lo que hace FastAPI con `response_model`: validar, volcar a JSON-able y codificar con json"""
+    content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _get_both(client: TestClient, url: str, headers: dict):
+    settings.FAST_JSON_RESPONSES = False
+    default = client.get(url, headers=headers)
+    settings.FAST_JSON_RESPONSES = True
+    fast = client.get(url, headers=headers)
+    settings.FAST_JSON_RESPONSES = False
+    return default, fast
+
+
+def run() -> dict:
+    user_service.get_user_info = _user_info
+    owner = str(uuid.uuid4())
+    headers = _token(owner)
+    results = {}
+    with TestClient(app) as client:
+        Base.metadata.create_all(bind=engine)
+        credit_id = _seed(owner)
+        
+        urls = {
+            "schedule": f"/api/v1/credits/{credit_id}/schedule",
+            "overdue": f"/api/v1/schedule/overdue?credit_id={credit_id}",
+            "payments": "/api/v1/payments/?limit=100",
+        }
+        for name, url in urls.items():
+            default, fast = _get_both(client, url, headers)
+            assert default.status_code == fast.status_code == 200, (default.text, fast.text)
+            assert default.content == fast.content, name
+            assert default.headers.get("etag") == fast.headers.get("etag")
+            assert default.headers.get("x-next-cursor") == fast.headers.get("x-next-cursor")
+            
+            for enabled in (False, True):
+                settings.FAST_JSON_RESPONSES = enabled
+                results[f"fast_responses.endpoint.{name}.{'fast' if enabled else 'default'}_ms"] = timed(
+                    lambda: [client.get(url, headers=headers) for _ in range(REPEAT)], repeat=3
+                ) / REPEAT * 1000
+            settings.FAST_JSON_RESPONSES = False
+    
+    with SessionLocal() as db:
+        rows = payment_schedule_repository.get_by_credit(db, credit_id)
+        adapter = TypeAdapter(List[PaymentScheduleResponse])
+        assert _default_path(adapter, rows) == schedule_list.encode(rows)
+        results["fast_responses.encode.default_ms"] = timed(_default_path, adapter, rows, repeat=20) * 1000
+        results["fast_responses.encode.fast_ms"] = timed(schedule_list.encode, rows, repeat=20) * 1000
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        for name, value in run().items():
+            print(f"{name:55s} {value:10.2f}")
+    finally:
+        shutil.rmtree(_DIR, ignore_errors=True)
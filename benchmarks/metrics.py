@@ -0,0 +1,75 @@
+"""
+Costo y formato de las métricas de Prometheus.
+
+Mide el costo por observación de histogramas y gauges (lo que suma cada
+petición instrumentada) y el de generar /metrics con muchas series, y
+verifica de punta a punta que los conteos por ruta coincidan con las
+peticiones hechas y que cada línea respete el formato de texto.
+
+    python -m benchmarks.metrics
+"""
+
+import re
+import uuid
+
+from .common import timed
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.config.settings import settings
+from app.main import app
+from app.utils.metrics import Gauge, Histogram, Registry
+
+OBSERVATIONS = 100000
+ROUTES = 40
+REQUESTS = 25
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? [^ ]+$')
+
+
+def _check_format(text: str):
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or SAMPLE_LINE.match(line), line
+
+
+def run() -> dict:
+    results = {}
+    histogram = Histogram("bench_seconds", "bench", ("method", "route", "status"))
+    gauge = Gauge("bench_in_flight", "bench", ("method", "route"))
+    
+    def observe():
+        for index in range(OBSERVATIONS):
+            histogram.observe(index / OBSERVATIONS, "GET", "/api/v1/credits/{credit_id}", "200")
+    
+    def in_flight():
+        for _ in range(OBSERVATIONS):
+            gauge.inc("GET", "/api/v1/credits/{credit_id}")
+            gauge.dec("GET", "/api/v1/credits/{credit_id}")
+    
+    results["metrics.histogram_observe_ns"] = timed(observe, repeat=3) / OBSERVATIONS * 1e9
+    results["metrics.gauge_inc_dec_ns"] = timed(in_flight, repeat=3) / OBSERVATIONS * 1e9
+    
+    registry = Registry()
+    histogram = registry.register(Histogram("bench_seconds", "bench", ("method", "route", "status")))
+    for route in range(ROUTES):
+        for status in ("200", "400", "404", "500"):
+            histogram.observe(0.01, "GET", f"/route/{route}", status)
+    _check_format(registry.render())
+    results["metrics.render_ms"] = timed(registry.render, repeat=20) * 1000
+    
+    token = jwt.encode({"sub": str(uuid.uuid4())}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    with TestClient(app) as client:
+        for _ in range(REQUESTS):
+            client.get("/api/v1/credits/", headers={"Authorization": f"Bearer {token}"})
+        text = client.get("/metrics").text
+    _check_format(text)
+    count = re.search(r'http_request_duration_seconds_count\{method="GET",route="/api/v1/credits/",status="200"\} (\d+)', text)
+    assert count and int(count.group(1)) == REQUESTS, text
+    assert 'http_requests_in_flight{method="GET",route="/api/v1/credits/"} 0.0' in text
+    assert 'db_pool_checkout_seconds_count{engine="primary"}' in text
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.2f}")
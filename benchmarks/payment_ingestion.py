@@ -0,0 +1,136 @@
+"""
+Benchmark y verificación de la carga masiva de pagos.
+
+Compara `PaymentService.create_payment` fila por fila con
+`PaymentIngestionService.ingest` para un archivo de conciliación con filas
+válidas, inválidas y que exceden el saldo, y verifica que ambos caminos
+dejen los mismos saldos, estados y rollups.
+
+    python -m benchmarks.payment_ingestion
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from .common import QueryCounter, sqlite_session
+
+from app.models import Credit, CreditRollup, CreditStatus, Payment
+from app.repositories import credit_rollup_repository
+from app.schemas import PaymentRequest
+from app.services.payment import payment_service
+from app.services.payment_ingestion import payment_ingestion_service
+
+CREDITS = 500
+ROWS = int(os.environ.get("BENCH_INGESTION_ROWS", "5000"))
+CHUNK_SIZE = 1000
+USER_ID = "00000000-0000-0000-0000-000000000001"
+BALANCE = Decimal("1000.00")
+
+
+def _rows() -> list:
+    """Filas del archivo: montos que agotan algunos saldos, créditos inexistentes y filas mal formadas"""
+    rows = []
+    for index in range(ROWS):
+        credit_id = index % CREDITS + 1
+        if index % 97 == 0:
+            credit_id = CREDITS + 1
+        amount = Decimal("75.25") if credit_id % 10 else Decimal("500.00")
+        rows.append({"credit_id": credit_id, "amount": str(amount), "payment_method": "transferencia",
+                     "description": f"Liquidación #{index}"})
+    rows[7]["amount"] = "-5"
+    rows[11]["credit_id"] = "abc"
+    return rows
+
+
+def _csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["credit_id", "amount", "payment_method", "description"])
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _seed(db):
+    connection = db.connection()
+    connection.exec_driver_sql(
+        "INSERT INTO credits (id, user_id, amount, interest_rate, term_months, status, remaining_balance) "
+        "VALUES (?, ?, ?, 20, 12, ?, ?)",
+        [
+            (credit_id, USER_ID.replace("-", ""), str(BALANCE),
+             (CreditStatus.ACTIVE if credit_id % 50 else CreditStatus.PAID).name, str(BALANCE))
+            for credit_id in range(1, CREDITS + 1)
+        ]
+    )
+    db.commit()
+    credit_rollup_repository.rebuild(db)
+
+
+def _state(db):
+    credits = db.execute(select(Credit.id, Credit.remaining_balance, Credit.status).order_by(Credit.id)).all()
+    rollups = db.execute(
+        select(CreditRollup.credit_id, CreditRollup.payments_count, CreditRollup.total_paid).order_by(CreditRollup.credit_id)
+    ).all()
+    payments = db.scalar(select(func.count(Payment.id)))
+    return [tuple(row) for row in credits], [tuple(row) for row in rollups], payments
+
+
+def _legacy(db, rows) -> list:
+    accepted = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            payment = PaymentRequest(**row)
+            payment_service.create_payment(db, USER_ID, payment)
+            accepted.append(number)
+        except ValueError:
+            pass
+    return accepted
+
+
+def run() -> dict:
+    rows = _rows()
+    with sqlite_session() as db:
+        _seed(db)
+        started = time.perf_counter()
+        legacy_accepted = _legacy(db, rows)
+        legacy_time = time.perf_counter() - started
+        legacy_state = _state(db)
+    
+    with sqlite_session() as db:
+        _seed(db)
+        with QueryCounter(db.get_bind()) as counter:
+            started = time.perf_counter()
+            report = payment_ingestion_service.ingest(db, _csv(rows), "csv", CHUNK_SIZE)
+            bulk_time = time.perf_counter() - started
+        bulk_state = _state(db)
+        
+    
+    ndjson = "\n".join(json.dumps(row) for row in rows).encode()
+    parsed = list(payment_ingestion_service.parse(ndjson, "ndjson"))
+    assert [number for number, _, _ in parsed] == list(range(1, ROWS + 1))
+    assert [number for number, row, _ in parsed if row is None] == [8, 12]
+    
+    accepted = [result["row"] for result in report["results"] if result["accepted"]]
+    assert accepted == legacy_accepted, (len(accepted), len(legacy_accepted))
+    assert bulk_state == legacy_state
+    assert report["credits_paid"] > 0
+    assert report["total_rows"] == ROWS and report["rejected"] == ROWS - len(accepted), report["rejected"]
+    chunks = -(-ROWS // CHUNK_SIZE)
+    return {
+        "payment_ingestion.legacy.rows_per_sec": ROWS / legacy_time,
+        "payment_ingestion.bulk.rows_per_sec": ROWS / bulk_time,
+        "payment_ingestion.bulk.statements_per_chunk": counter.count / chunks,
+        "payment_ingestion.accepted": len(accepted),
+        "payment_ingestion.rejected": report["rejected"],
+        "payment_ingestion.credits_paid": report["credits_paid"]
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.2f}")
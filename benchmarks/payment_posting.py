@@ -0,0 +1,131 @@
+"""
+Benchmark y prueba de concurrencia del registro de pagos.
+
+Mide las sentencias SQL por pago del flujo anterior (tres commits y tres
+lecturas del crédito) frente a `PaymentService.create_payment` y lanza pagos
+concurrentes desde varios hilos contra un mismo crédito para verificar que
+el saldo nunca se pisa ni queda negativo.
+
+    python -m benchmarks.payment_posting
+"""
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from .common import QueryCounter, sqlite_session, timed
+
+from app.models import Credit, CreditStatus, Payment, PaymentStatus
+from app.repositories import credit_repository, payment_repository
+from app.schemas import PaymentRequest
+from app.services.payment import payment_service
+
+THREADS = int(os.environ.get("BENCH_PAYMENT_THREADS", "8"))
+ATTEMPTS_PER_THREAD = 50
+BALANCE = Decimal("1000.00")
+AMOUNT = Decimal("7.00")
+
+
+def _legacy_create_payment(db, user_id, payment_data):
+    """Flujo previo: inserción, saldo y estado con un commit cada uno"""
+    payment_data_dict = payment_data.dict()
+    payment_data_dict.update({"payment_date": datetime.now(), "status": PaymentStatus.PAID})
+    payment = payment_repository.create(db, obj_in=payment_data_dict)
+    payment_service.update_credit_balance(db, payment.credit_id, payment.amount)
+    payment_service.check_and_update_credit_status(db, payment.credit_id)
+    return payment
+
+
+def _create_credit(db, user_id, balance) -> int:
+    """Crédito activo del usuario con el saldo indicado"""
+    credit = Credit(
+        user_id=user_id, amount=balance, interest_rate=Decimal("20.00"), term_months=12,
+        status=CreditStatus.ACTIVE, monthly_payment=Decimal("1.00"), remaining_balance=balance
+    )
+    db.add(credit)
+    db.commit()
+    return credit.id
+
+
+def _statements_per_payment(db, fn, user_id, credit_id) -> int:
+    payment = PaymentRequest(credit_id=credit_id, amount=AMOUNT, payment_method="efectivo")
+    with QueryCounter(db.get_bind()) as counter:
+        if fn is _legacy_create_payment:
+            # Lectura de validaciones del flujo anterior
+            credit_repository.get(db, credit_id)
+        created = fn(db, user_id, payment)
+        # Serialización de la respuesta
+        created.created_at
+    db.expunge_all()
+    return counter.count
+
+
+def _stress(session_factory, user_id, credit_id, threads: int = THREADS,
+            attempts_per_thread: int = ATTEMPTS_PER_THREAD) -> dict:
+    """Pagos de AMOUNT desde `threads` hilos (una sesión cada uno); aceptados y rechazados"""
+    
+    def worker(_):
+        accepted = rejected = 0
+        db = session_factory()
+        try:
+            for _ in range(attempts_per_thread):
+                payment = PaymentRequest(credit_id=credit_id, amount=AMOUNT, payment_method="efectivo")
+                try:
+                    payment_service.create_payment(db, user_id, payment)
+                    accepted += 1
+                except ValueError:
+                    rejected += 1
+        finally:
+            db.close()
+        return accepted, rejected
+    
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, range(threads)))
+    return {
+        "accepted": sum(accepted for accepted, _ in results),
+        "rejected": sum(rejected for _, rejected in results)
+    }
+
+
+def run() -> dict:
+    results = {}
+    with sqlite_session() as db:
+        user_id = str(uuid.uuid4())
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        
+        credit_id = _create_credit(db, user_id, Decimal("100000.00"))
+        results["payment_posting.legacy.statements"] = _statements_per_payment(
+            db, _legacy_create_payment, user_id, credit_id
+        )
+        results["payment_posting.atomic.statements"] = _statements_per_payment(
+            db, payment_service.create_payment, user_id, credit_id
+        )
+        payment = PaymentRequest(credit_id=credit_id, amount=AMOUNT, payment_method="efectivo")
+        results["payment_posting.legacy.ms"] = timed(_legacy_create_payment, db, user_id, payment, repeat=20) * 1000
+        results["payment_posting.atomic.ms"] = timed(payment_service.create_payment, db, user_id, payment, repeat=20) * 1000
+        
+        credit_id = _create_credit(db, user_id, BALANCE)
+        stress_seconds = timed(lambda: results.update(_stress(session_factory, user_id, credit_id)), repeat=1)
+        
+        db.expire_all()
+        credit = db.get(Credit, credit_id)
+        paid = db.scalar(select(func.coalesce(func.sum(Payment.amount), 0)).where(Payment.credit_id == credit_id))
+        expected_accepted = int(BALANCE // AMOUNT)
+        assert results["accepted"] == expected_accepted, results
+        assert credit.remaining_balance == BALANCE - paid == BALANCE - AMOUNT * expected_accepted, credit.remaining_balance
+        assert credit.remaining_balance >= 0
+    
+    results["payment_posting.stress.payments_per_sec"] = (results["accepted"] + results["rejected"]) / stress_seconds
+    results["payment_posting.stress.accepted"] = results.pop("accepted")
+    results["payment_posting.stress.rejected"] = results.pop("rejected")
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.2f}")
@@ -0,0 +1,69 @@
+"""
+Benchmark del resumen y listado de pagos por usuario.
+
+Mide `calculate_payment_summary` (sin `credit_id`) y `get_user_payments`
+para usuarios con distinta cantidad de créditos. El control de consultas
+(sin N+1) está en tests/test_payment_summary.py.
+
+    python -m benchmarks.payment_summary
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from .common import sqlite_session, timed
+
+from app.models import Credit, CreditStatus, Payment, PaymentSchedule, PaymentStatus
+from app.services.payment import payment_service
+
+CREDIT_COUNTS = (1, 50, 300)
+TERM = 24
+AMOUNT = Decimal("1000.00")
+
+
+def _seed_user(db, credits: int) -> str:
+    """Usuario con `credits` créditos, un cuarto de sus cuotas pagadas y la mitad vencidas"""
+    user_id = str(uuid.uuid4())
+    now = datetime.now()
+    rows = [
+        {"user_id": user_id, "amount": AMOUNT, "interest_rate": Decimal("20.00"), "term_months": TERM,
+         "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("50.90"), "remaining_balance": AMOUNT}
+        for _ in range(credits)
+    ]
+    credit_ids = db.scalars(insert(Credit).returning(Credit.id), rows).all()
+    db.execute(insert(PaymentSchedule), [
+        {"credit_id": credit_id, "installment_number": number,
+         "due_date": now + timedelta(days=30 * (number - TERM // 2)),
+         "principal_amount": Decimal("34.23"), "interest_amount": Decimal("16.67"),
+         "total_amount": Decimal("50.90"), "is_paid": number <= TERM // 4}
+        for credit_id in credit_ids for number in range(1, TERM + 1)
+    ])
+    db.execute(insert(Payment), [
+        {"credit_id": credit_id, "amount": Decimal("50.90"), "payment_method": "efectivo",
+         "payment_date": now, "status": PaymentStatus.PAID}
+        for credit_id in credit_ids for _ in range(TERM // 4)
+    ])
+    db.commit()
+    return user_id
+
+
+def run() -> dict:
+    results = {}
+    with sqlite_session() as db:
+        for credits in CREDIT_COUNTS:
+            user_id = _seed_user(db, credits)
+            
+            summary_time = timed(payment_service.calculate_payment_summary, db, user_id)
+            listing_time = timed(payment_service.get_user_payments, db, user_id, 0, 100)
+            db.expunge_all()
+            results[f"payment_summary.summary.{credits}c.ms"] = summary_time * 1000
+            results[f"payment_summary.listing.{credits}c.ms"] = listing_time * 1000
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.3f}")
@@ -0,0 +1,151 @@
+"""
+Presupuestos de consultas por ruta y detector de N+1 (SQL_STRICT_MODE).
+
+Recorre en modo estricto las rutas con presupuesto declarado, sobre créditos
+con cuotas vencidas (que fuerzan la agregación de respaldo del rollup), de
+modo que cualquier consulta de más hace fallar la petición. Verifica además
+que el detector marque una sentencia repetida, que una ruta que excede su
+presupuesto falle y que `Server-Timing` no se emita en producción.
+
+    python -m benchmarks.query_budgets
+    DATABASE_ASYNC=true python -m benchmarks.query_budgets
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIR, 'bench.db')}"
+os.environ["SQL_STRICT_MODE"] = "true"
+
+from .common import QueryCounter  # noqa: F401,E402  (configura el entorno)
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.config.settings import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Credit, CreditStatus, Payment, PaymentSchedule, PaymentStatus  # noqa: E402
+from app.repositories import credit_repository  # noqa: E402
+from app.services.credit import credit_service  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+from app.utils.database import Base, SessionLocal, engine  # noqa: E402
+from app.utils.query_stats import QueryStatsMiddleware, query_budget, track_queries  # noqa: E402
+
+CREDITS = 20
+TERM = 24
+
+
+def _token(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {jwt.encode({'sub': user_id}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)}"}
+
+
+async def _user_info(user_id: str) -> dict:
+    return {"data": {"id": user_id, "role": "admin"}, "role": "admin"}
+
+
+def _seed(user_id: str) -> list:
+    now = datetime.now()
+    with SessionLocal() as db:
+        credit_ids = db.scalars(insert(Credit).returning(Credit.id), [
+            {"user_id": user_id, "amount": Decimal("1000.00"), "interest_rate": Decimal("20.00"), "term_months": TERM,
+             "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("50.90"), "remaining_balance": Decimal("1000.00")}
+            for _ in range(CREDITS)
+        ]).all()
+        db.execute(insert(PaymentSchedule), [
+            {"credit_id": credit_id, "installment_number": number,
+             "due_date": now + timedelta(days=30 * (number - TERM // 2)),
+             "principal_amount": Decimal("34.23"), "interest_amount": Decimal("16.67"),
+             "total_amount": Decimal("50.90"), "is_paid": number <= TERM // 4}
+            for credit_id in credit_ids for number in range(1, TERM + 1)
+        ])
+        db.execute(insert(Payment), [
+            {"credit_id": credit_id, "amount": Decimal("50.90"), "payment_method": "efectivo",
+             "payment_date": now, "status": PaymentStatus.PAID}
+            for credit_id in credit_ids for _ in range(TERM // 4)
+        ])
+        db.commit()
+        credit_service.rebuild_rollups(db)
+    return credit_ids
+
+
+def _check_detector(credit_ids: list):
+    with SessionLocal() as db, track_queries(budget=3) as stats:
+        for credit_id in credit_ids:
+            credit_repository.get(db, credit_id)
+    problems = stats.violations()
+    assert any("presupuesto" in problem for problem in problems), problems
+    assert any("repetida" in problem for problem in problems), problems
+    
+    # Identity map: mientras la instancia siga viva, volver a pedirla en la sesión no consulta
+    with SessionLocal() as db, track_queries() as stats:
+        credits = [credit_repository.get(db, credit_ids[0]) for _ in range(3)]
+    assert all(credit is credits[0] for credit in credits)
+    assert stats.statements == 1, stats.statements
+
+
+def _check_middleware(credit_ids: list):
+    probe = FastAPI()
+    probe.add_middleware(QueryStatsMiddleware, strict=True)
+    
+    @probe.get("/n-plus-one", dependencies=[Depends(query_budget(1))])
+    def n_plus_one():
+        with SessionLocal() as db:
+            return [credit_repository.get(db, credit_id).id for credit_id in credit_ids]
+    
+    response = TestClient(probe).get("/n-plus-one")
+    assert response.status_code == 500, "La ruta con N+1 no falló en modo estricto"
+    assert "presupuesto de 1" in response.json()["detail"], response.text
+    
+    production = FastAPI()
+    production.add_middleware(QueryStatsMiddleware, server_timing=False)
+    production.get("/")(lambda: {})
+    assert "server-timing" not in TestClient(production).get("/").headers
+
+
+def run() -> dict:
+    user_service.get_user_info = _user_info
+    owner = str(uuid.uuid4())
+    headers = _token(owner)
+    results = {}
+    with TestClient(app) as client:
+        Base.metadata.create_all(bind=engine)
+        credit_ids = _seed(owner)
+        credit_id = credit_ids[0]
+        urls = [
+            "/api/v1/credits/",
+            f"/api/v1/credits/{credit_id}",
+            f"/api/v1/credits/{credit_id}/summary",
+            f"/api/v1/credits/{credit_id}/payments",
+            "/api/v1/payments/",
+            "/api/v1/payments/summary",
+            f"/api/v1/payments/summary?credit_id={credit_id}",
+            f"/api/v1/credits/{credit_id}/schedule",
+            f"/api/v1/credits/{credit_id}/with-schedule",
+            f"/api/v1/schedule/overdue?credit_id={credit_id}",
+            "/api/v1/schedule/overdue",
+            f"/api/v1/credits/{credit_id}/check-status",
+        ]
+        for url in urls:
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, (url, response.text)
+            timing = response.headers["server-timing"]
+            results[f"query_budgets.{url}.queries"] = int(timing.split('desc="')[1].split(" ")[0])
+    
+    _check_detector(credit_ids)
+    _check_middleware(credit_ids)
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        for name, value in run().items():
+            print(f"{name:70s} {value:4d}")
+    finally:
+        shutil.rmtree(_DIR, ignore_errors=True)
@@ -0,0 +1,41 @@
+"""
+Control de regresión de los planes de consulta de los repositorios.
+
+Ejecuta `EXPLAIN QUERY PLAN` (SQLite) sobre cada consulta `*_query` de los
+repositorios con el esquema de los modelos y verifica que use el índice
+esperado y que ninguna tabla se recorra completa. Los casos y las
+verificaciones son los de tests/test_query_plans.py (los que corre CI); el
+script los recorre todos y termina con código 1 si algún plan regresiona.
+
+    python -m benchmarks.query_plans
+"""
+
+import sys
+
+from .common import sqlite_session
+
+from app.utils.query_plans import explain, full_scans, missing_indexes
+from tests.test_query_plans import cases
+
+
+def run() -> dict:
+    failures = {}
+    with sqlite_session() as db:
+        connection = db.connection()
+        for name, query, expected in cases():
+            plan = explain(connection, query)
+            missing = missing_indexes(plan, expected)
+            scans = full_scans(plan)
+            if missing or scans:
+                failures[name] = {"plan": plan, "missing": missing, "full_scans": scans}
+    return failures
+
+
+if __name__ == "__main__":
+    failures = run()
+    for name, detail in failures.items():
+        print(f"REGRESIÓN {name}: faltan {detail['missing']} / recorridos {detail['full_scans']}")
+        for line in detail["plan"]:
+            print(f"    {line}")
+    print(f"{len(cases()) - len(failures)}/{len(cases())} planes correctos")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,106 @@
+"""
+Verificación del enrutamiento de lecturas a réplicas.
+
+Usa tres archivos SQLite (primario y dos réplicas) sin replicación real: la
+"replicación" se simula copiando el primario. Verifica que las lecturas de
+un usuario que acaba de escribir van al primario durante la ventana
+READ_YOUR_WRITES_SECONDS, que las demás se reparten entre réplicas (round
+robin) y que `least_connections` elige la réplica con menos conexiones.
+
+    python -m benchmarks.read_replicas
+    DATABASE_ASYNC=true python -m benchmarks.read_replicas
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+_DIR = tempfile.mkdtemp()
+PRIMARY = os.path.join(_DIR, "primary.db")
+REPLICAS = [os.path.join(_DIR, f"replica{index}.db") for index in range(2)]
+PIN_SECONDS = 0.5
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = json.dumps([f"sqlite:///{path}" for path in REPLICAS])
+os.environ["READ_YOUR_WRITES_SECONDS"] = str(PIN_SECONDS)
+
+from .common import sqlite_session  # noqa: F401,E402  (configura el entorno)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.config.settings import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+from app.utils.database import Base, ReplicaRouter, replica_router  # noqa: E402
+
+
+def _token(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {jwt.encode({'sub': user_id}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)}"}
+
+
+def _replicate():
+    for path in REPLICAS:
+        shutil.copyfile(PRIMARY, path)
+
+
+async def _user_exists(user_id: str) -> bool:
+    return True
+
+
+def _check_least_connections():
+    router = ReplicaRouter([f"sqlite:///{path}" for path in REPLICAS], strategy="least_connections")
+    busy = router.engines[0].connect()
+    try:
+        assert router.choose() == 1
+    finally:
+        busy.close()
+    assert router.choose() == 0
+
+
+def run() -> dict:
+    user_service.validate_user_exists = _user_exists
+    writer, reader = str(uuid.uuid4()), str(uuid.uuid4())
+    with TestClient(app) as client:
+        for replica in replica_router.engines:
+            Base.metadata.create_all(bind=replica)
+        
+        created = client.post(
+            "/api/v1/credits/", json={"amount": "5000", "interest_rate": "18", "term_months": 12},
+            headers=_token(writer)
+        )
+        assert created.status_code == 201, created.text
+        
+        # Recién escrito: lee del primario aunque las réplicas aún no lo tengan
+        assert len(client.get("/api/v1/credits/", headers=_token(writer)).json()) == 1
+        # Otro usuario no está fijado: sus lecturas se reparten entre las réplicas
+        primary_reads = replica_router.primary_reads
+        replica_reads = list(replica_router.reads)
+        for _ in range(4):
+            client.get("/api/v1/credits/", headers=_token(reader))
+        assert replica_router.primary_reads == primary_reads
+        assert [after - before for before, after in zip(replica_reads, replica_router.reads)] == [2, 2]
+        
+        # Vencida la ventana el escritor vuelve a las réplicas (todavía sin replicar)
+        time.sleep(PIN_SECONDS + 0.1)
+        assert client.get("/api/v1/credits/", headers=_token(writer)).json() == []
+        _replicate()
+        assert len(client.get("/api/v1/credits/", headers=_token(writer)).json()) == 1
+        
+        stats = client.get("/health").json()["database"]
+    
+    _check_least_connections()
+    return {
+        "read_replicas.replica_reads": sum(stats["replica_reads"]),
+        "read_replicas.primary_reads": stats["primary_reads"]
+    }
+
+
+if __name__ == "__main__":
+    try:
+        for name, value in run().items():
+            print(f"{name:50s} {value:12.0f}")
+    finally:
+        shutil.rmtree(_DIR, ignore_errors=True)
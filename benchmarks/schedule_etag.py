@@ -0,0 +1,114 @@
+"""
+Benchmark del GET condicional sobre calendarios de 360 cuotas.
+
+Compara la respuesta completa de `/credits/{id}/schedule` y
+`/credits/{id}/with-schedule` con la revalidación por `If-None-Match` (304)
+y verifica que el ETag cambie al pagar una cuota y que el permiso se
+compruebe antes de responder 304.
+
+    python -m benchmarks.schedule_etag
+    DATABASE_ASYNC=true python -m benchmarks.schedule_etag
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIR, 'bench.db')}"
+
+from .common import timed  # noqa: E402  (configura el entorno)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.config.settings import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Credit, CreditStatus, PaymentSchedule  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+from app.utils.database import Base, SessionLocal, engine  # noqa: E402
+
+TERM = 360
+REPEAT = 50
+
+
+def _token(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {jwt.encode({'sub': user_id}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)}"}
+
+
+async def _user_info(user_id: str) -> dict:
+    return {"data": {"id": user_id, "role": "user"}}
+
+
+def _seed(user_id: str) -> int:
+    now = datetime.now()
+    with SessionLocal() as db:
+        credit_id = db.scalar(insert(Credit).returning(Credit.id), [{
+            "user_id": user_id, "amount": Decimal("100000.00"), "interest_rate": Decimal("12.00"),
+            "term_months": TERM, "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("1028.61"),
+            "remaining_balance": Decimal("100000.00"), "approved_at": now
+        }])
+        db.execute(insert(PaymentSchedule), [
+            {"credit_id": credit_id, "installment_number": number, "due_date": now + timedelta(days=30 * number),
+             "principal_amount": Decimal("28.61"), "interest_amount": Decimal("1000.00"),
+             "total_amount": Decimal("1028.61"), "is_paid": False}
+            for number in range(1, TERM + 1)
+        ])
+        db.commit()
+    return credit_id
+
+
+def run() -> dict:
+    user_service.get_user_info = _user_info
+    owner = str(uuid.uuid4())
+    results = {}
+    with TestClient(app) as client:
+        Base.metadata.create_all(bind=engine)
+        credit_id = _seed(owner)
+        headers = _token(owner)
+        
+        for route in ("schedule", "with-schedule"):
+            url = f"/api/v1/credits/{credit_id}/{route}"
+            full = client.get(url, headers=headers)
+            assert full.status_code == 200, full.text
+            etag = full.headers["etag"]
+            assert full.headers["cache-control"].startswith("private")
+            assert client.get(url, headers=headers).headers["etag"] == etag
+            
+            conditional = {**headers, "If-None-Match": etag}
+            not_modified = client.get(url, headers=conditional)
+            assert not_modified.status_code == 304 and not not_modified.content
+            assert not_modified.headers["etag"] == etag
+            # El 304 no se entrega a quien no puede ver el crédito
+            assert client.get(url, headers={**_token(str(uuid.uuid4())), "If-None-Match": etag}).status_code == 403
+            
+            results[f"schedule_etag.{route}.full_ms"] = timed(
+                lambda: [client.get(url, headers=headers) for _ in range(REPEAT)], repeat=3
+            ) / REPEAT * 1000
+            results[f"schedule_etag.{route}.not_modified_ms"] = timed(
+                lambda: [client.get(url, headers=conditional) for _ in range(REPEAT)], repeat=3
+            ) / REPEAT * 1000
+        
+        # Pagar una cuota invalida ambos ETags
+        etags = {route: client.get(f"/api/v1/credits/{credit_id}/{route}", headers=headers).headers["etag"]
+                 for route in ("schedule", "with-schedule")}
+        assert etags["schedule"] != etags["with-schedule"]
+        first = client.get(f"/api/v1/credits/{credit_id}/schedule", headers=headers).json()[0]
+        paid = client.put(f"/api/v1/schedule/{first['id']}", json={"is_paid": True}, headers=headers)
+        assert paid.status_code == 200, paid.text
+        for route, etag in etags.items():
+            after = client.get(f"/api/v1/credits/{credit_id}/{route}", headers={**headers, "If-None-Match": etag})
+            assert after.status_code == 200 and after.headers["etag"] != etag
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        for name, value in run().items():
+            print(f"{name:50s} {value:12.2f}")
+    finally:
+        shutil.rmtree(_DIR, ignore_errors=True)
@@ -0,0 +1,59 @@
+"""
+Benchmark de la generación del calendario de pagos por plazo.
+
+Para cada plazo mide el cálculo de cuotas con Decimal (`installments`), la
+generación completa de `CreditService.generate_payment_schedule` (cálculo y
+escritura en bloque) y el cálculo vectorizado de `amortize_batch` para un
+lote de créditos del mismo plazo, y verifica que este último coincida con
+`installments`.
+
+    python -m benchmarks.schedule_generation
+"""
+
+import uuid
+from decimal import Decimal
+
+from .common import sqlite_session, timed
+
+from app.models import Credit, CreditStatus
+from app.services.credit import credit_service
+from app.utils import amortization
+
+TERMS = (6, 12, 24, 36, 60, 120, 240, 360)
+BATCH = 1000
+AMOUNT = Decimal("25000.00")
+RATE = Decimal("18.50")
+
+
+def run() -> dict:
+    results = {}
+    with sqlite_session() as db:
+        for term in TERMS:
+            monthly_payment = amortization.monthly_payment(AMOUNT, RATE, term)
+            rows = amortization.installments(AMOUNT, RATE, term, monthly_payment)
+            
+            batch = amortization.amortize_batch([(AMOUNT, RATE, term)] * BATCH)
+            assert [row[:3] for row in batch.schedule(0)] == rows, term
+            
+            credit = Credit(
+                user_id=str(uuid.uuid4()), amount=AMOUNT, interest_rate=RATE, term_months=term,
+                status=CreditStatus.PENDING, monthly_payment=monthly_payment, remaining_balance=AMOUNT
+            )
+            db.add(credit)
+            db.commit()
+            
+            installments = timed(amortization.installments, AMOUNT, RATE, term, monthly_payment, repeat=20)
+            generate = timed(
+                credit_service.generate_payment_schedule,
+                db, credit.id, AMOUNT, RATE, term, AMOUNT, monthly_payment, repeat=5
+            )
+            vectorized = timed(amortization.amortize_batch, [(AMOUNT, RATE, term)] * BATCH, repeat=3)
+            results[f"schedule_generation.{term}m.installments_us"] = installments * 1e6
+            results[f"schedule_generation.{term}m.generate_ms"] = generate * 1000
+            results[f"schedule_generation.{term}m.batch_credits_per_sec"] = BATCH / vectorized
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:55s} {value:12.2f}")
@@ -0,0 +1,59 @@
+"""
+Benchmark de escritura del calendario de pagos.
+
+Compara la escritura fila a fila (commit + refresh por cuota) con la
+escritura en bloque de `PaymentScheduleRepository.replace_for_credit`.
+
+    python -m benchmarks.schedule_writer
+"""
+
+import uuid
+from decimal import Decimal
+
+from .common import sqlite_session, timed
+
+from app.models import Credit, CreditStatus
+from app.repositories import payment_schedule_repository
+from app.services.credit import credit_service
+
+TERMS = (12, 60, 360)
+AMOUNT = Decimal("25000.00")
+RATE = Decimal("18.50")
+
+
+def _legacy_write(db, credit_id, rows):
+    for installment in payment_schedule_repository.get_by_credit(db, credit_id):
+        db.delete(installment)
+        db.commit()
+    for row in rows:
+        payment_schedule_repository.create(db, obj_in=row)
+
+
+def _bulk_write(db, credit_id, rows):
+    payment_schedule_repository.replace_for_credit(db, credit_id, rows)
+
+
+def run() -> dict:
+    results = {}
+    with sqlite_session() as db:
+        for term in TERMS:
+            monthly_payment = credit_service.calculate_monthly_payment(AMOUNT, RATE, term)
+            credit = Credit(
+                user_id=str(uuid.uuid4()), amount=AMOUNT, interest_rate=RATE, term_months=term,
+                status=CreditStatus.PENDING, monthly_payment=monthly_payment, remaining_balance=AMOUNT
+            )
+            db.add(credit)
+            db.commit()
+            rows = credit_service.generate_payment_schedule(
+                db, credit.id, AMOUNT, RATE, term, AMOUNT, monthly_payment
+            )
+            legacy = timed(_legacy_write, db, credit.id, rows, repeat=3)
+            bulk = timed(_bulk_write, db, credit.id, rows, repeat=3)
+            results[f"schedule_writer.legacy.{term}m.rows_per_sec"] = term / legacy
+            results[f"schedule_writer.bulk.{term}m.rows_per_sec"] = term / bulk
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.0f}")
@@ -0,0 +1,143 @@
+"""
+Registro de consultas lentas: costo por sentencia y contenido del registro.
+
+Mide lo que agregan los eventos del registro a cada sentencia por debajo del
+umbral (el caso normal en producción) y verifica sobre SQLite que una
+sentencia lenta (una función `sleep_ms` registrada en la conexión) se
+registre con su forma normalizada, los tipos de sus parámetros, el método de
+repositorio que la originó y el plan de EXPLAIN QUERY PLAN; que el plan se
+obtenga una vez por forma y que el muestreo y el límite por minuto descarten
+lo que exceda.
+
+    python -m benchmarks.slow_queries
+"""
+
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from .common import timed
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Credit, CreditStatus, PaymentSchedule
+from app.repositories import payment_schedule_repository
+from app.utils.database import Base
+from app.utils.slow_queries import SlowQueryLog
+
+STATEMENTS = 2000
+ROUNDS = 10
+
+
+def _engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    
+    @event.listens_for(engine, "connect")
+    def register_sleep(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or ms)
+    
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _seed(engine) -> int:
+    with sessionmaker(bind=engine)() as db:
+        credit_id = db.scalar(insert(Credit).returning(Credit.id), {
+            "user_id": "bench", "amount": Decimal("1000.00"), "interest_rate": Decimal("20.00"),
+            "term_months": 12, "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("92.63"),
+            "remaining_balance": Decimal("1000.00")
+        })
+        db.execute(insert(PaymentSchedule), [
+            {"credit_id": credit_id, "installment_number": number,
+             "due_date": datetime.now() - timedelta(days=30 * (12 - number)),
+             "principal_amount": Decimal("75.96"), "interest_amount": Decimal("16.67"),
+             "total_amount": Decimal("92.63"), "is_paid": False}
+            for number in range(1, 13)
+        ])
+        db.commit()
+    return credit_id
+
+
+def _per_statement(*engines) -> list:
+    """Mejor tiempo por sentencia de cada engine, alternando las mediciones para repartir el ruido"""
+    statement = text("SELECT 1")
+    best = [float("inf")] * len(engines)
+    connections = [engine.connect() for engine in engines]
+    try:
+        for _ in range(ROUNDS):
+            for index, conn in enumerate(connections):
+                elapsed = timed(lambda: [conn.execute(statement) for _ in range(STATEMENTS)], repeat=1)
+                best[index] = min(best[index], elapsed / STATEMENTS)
+    finally:
+        for conn in connections:
+            conn.close()
+    return best
+
+
+def run() -> dict:
+    logging.getLogger("app.utils.slow_queries").setLevel(logging.ERROR)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Costo con el registro asociado y la sentencia por debajo del umbral
+        bare = _engine(os.path.join(tmp, "bare.db"))
+        attached = _engine(os.path.join(tmp, "attached.db"))
+        SlowQueryLog(threshold_ms=1000).attach(attached, "attached")
+        bare_ns, attached_ns = (seconds * 1e9 for seconds in _per_statement(bare, attached))
+        results["slow_queries.statement_bare_ns"] = round(bare_ns, 1)
+        results["slow_queries.statement_attached_ns"] = round(attached_ns, 1)
+        results["slow_queries.overhead_ns"] = round(attached_ns - bare_ns, 1)
+        
+        engine = _engine(os.path.join(tmp, "bench.db"))
+        credit_id = _seed(engine)
+        log = SlowQueryLog(threshold_ms=20, max_per_minute=100)
+        log.attach(engine, "primary")
+        explains = []
+        plan = log._plan
+        log._plan = lambda *args: explains.append(args[1]) or plan(*args)
+        
+        # Sentencia lenta desde un repositorio; la rápida no se registra
+        with sessionmaker(bind=engine)() as db:
+            original = payment_schedule_repository.overdue_installments_query
+            payment_schedule_repository.overdue_installments_query = lambda credit_id=None: original(credit_id).where(
+                text("sleep_ms(30) > 0")
+            )
+            try:
+                for _ in range(2):
+                    payment_schedule_repository.get_overdue_installments(db, credit_id)
+            finally:
+                payment_schedule_repository.overdue_installments_query = original
+            payment_schedule_repository.get_overdue_installments(db, credit_id)
+        
+        assert log.logged == 2, log.stats()
+        entry = log.recent[-1]
+        assert entry["caller"] == "PaymentScheduleRepository.get_overdue_installments", entry
+        assert entry["duration_ms"] >= 20, entry
+        assert entry["statement"].startswith("SELECT payment_schedule.id"), entry
+        assert entry["parameters"] and all(kind in ("int", "str") for kind in entry["parameters"]), entry
+        assert any("payment_schedule" in line for line in entry["plan"]), entry
+        assert len(explains) == 1, explains
+        results["slow_queries.logged_duration_ms"] = entry["duration_ms"]
+        
+        # Límite por minuto y muestreo
+        limited = SlowQueryLog(threshold_ms=0, max_per_minute=3, explain=False)
+        sampled = SlowQueryLog(threshold_ms=0, sample_rate=0.0)
+        limited.attach(engine, "limited")
+        sampled.attach(engine, "sampled")
+        with engine.connect() as conn:
+            for _ in range(10):
+                conn.execute(text("SELECT 1"))
+        assert (limited.logged, limited.dropped) == (3, 7), limited.stats()
+        assert sampled.slow == 10 and sampled.logged == 0, sampled.stats()
+        
+        for named in (bare, attached, engine):
+            named.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:10.2f}")
@@ -0,0 +1,42 @@
+"""
+Servicio de usuarios simulado para los benchmarks
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+
+stub_app = FastAPI()
+
+
+@stub_app.get("/api/v1/users/{user_id}")
+async def get_user(user_id: str):
+    if user_id.startswith("missing"):
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return {"data": {"id": user_id, "role": "user", "is_admin": False}}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_stub():
+    """Levanta el servicio simulado en un hilo y devuelve su URL base"""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
@@ -0,0 +1,277 @@
+"""
+Suite de benchmarks reproducible con comparación contra una línea base.
+
+Ejecuta cada módulo de benchmark en su propio proceso (varios configuran la
+base de datos antes de importar la aplicación), sin red salvo el servicio
+de usuarios simulado en proceso, y guarda los resultados en JSON junto con
+el commit, la versión de Python y la plataforma. `compare` marca como
+regresión una métrica de tiempo o throughput que empeore más que la
+tolerancia, o un conteo (sentencias, consultas, planes) que aumente.
+
+    python -m benchmarks.suite run                      # suite por defecto -> benchmarks/results/latest.json
+    python -m benchmarks.suite run --save-baseline      # además la guarda como benchmarks/results/baseline.json
+    python -m benchmarks.suite run --only endpoints,token_verification --repeat 3
+    python -m benchmarks.suite compare                  # latest.json contra baseline.json; código 1 si hay regresiones
+    python -m benchmarks.suite compare base.json actual.json --tolerance 0.10
+    python -m benchmarks.suite list
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+LATEST = os.path.join(RESULTS_DIR, "latest.json")
+BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+
+# Suite por defecto: unos minutos sobre SQLite
+SUITE = (
+    "schedule_generation",
+    "schedule_writer",
+    "payment_posting",
+    "payment_summary",
+    "credit_summary",
+    "endpoints",
+    "token_verification",
+    "fast_responses",
+    "schedule_etag",
+    "query_budgets",
+    "query_plans",
+    "metrics",
+    "slow_queries",
+)
+# Más lentos o con carga de toda la cartera: solo con --only o --all
+EXTENDED = (
+    "auto_debit",
+    "payment_ingestion",
+    "credit_rollups",
+    "exports",
+    "async_db",
+    "user_client",
+    "read_replicas",
+    "delinquency_sweep",
+    "portfolio",
+)
+
+# Módulos cuyo `run()` no devuelve métricas numéricas
+_ADAPTERS: Dict[str, Callable[[dict], dict]] = {
+    "query_plans": lambda failures: {"query_plans.regressions": len(failures)},
+}
+
+HIGHER = "higher"
+LOWER = "lower"
+EXACT = "exact"
+_TIME_UNITS = ("ms", "us", "ns", "s", "seconds", "mb", "growth")
+_COUNTS = ("statements", "queries", "regressions")
+
+
+def direction(metric: str) -> Optional[str]:
+    """
+    Sentido de mejora según el sufijo del nombre: throughput (`*_per_sec`,
+    `speedup`) hacia arriba, tiempos y memoria hacia abajo y conteos
+    deterministas exactos. None para métricas informativas (no se comparan).
+    """
+    name = metric.rsplit(".", 1)[-1]
+    if "per_sec" in name or name.endswith("speedup"):
+        return HIGHER
+    if name.startswith(_COUNTS):
+        return EXACT
+    if name.startswith("seconds") or name in _TIME_UNITS or name.endswith(tuple(f"_{unit}" for unit in _TIME_UNITS)):
+        return LOWER
+    return None
+
+
+def _numeric(results: dict) -> Dict[str, float]:
+    return {
+        name: float(value) for name, value in results.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def _worker(module: str, output: str):
+    results = importlib.import_module(f"benchmarks.{module}").run()
+    results = _ADAPTERS.get(module, lambda value: value)(results)
+    with open(output, "w") as handle:
+        json.dump(_numeric(results), handle)
+
+
+def _run_module(module: str, timeout: float) -> dict:
+    """Resultados de un módulo ejecutado en un proceso aparte"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "results.json")
+        env = {**os.environ, "PYTHONHASHSEED": "0"}
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "worker", module, output],
+            env=env, capture_output=True, text=True, timeout=timeout
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                               f"código de salida {completed.returncode}")
+        with open(output) as handle:
+            return json.load(handle)
+
+
+def _best(metric: str, values: List[float]) -> float:
+    """Mejor valor de las repeticiones según el sentido de la métrica (mediana si es informativa)"""
+    sense = direction(metric)
+    if sense == HIGHER:
+        return max(values)
+    if sense in (LOWER, EXACT):
+        return min(values)
+    return statistics.median(values)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(modules: List[str], repeat: int = 1, timeout: float = 1800) -> dict:
+    samples: Dict[str, List[float]] = {}
+    benchmarks = {}
+    for module in modules:
+        start = time.perf_counter()
+        error = None
+        for _ in range(repeat):
+            try:
+                for metric, value in _run_module(module, timeout).items():
+                    samples.setdefault(metric, []).append(value)
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                error = str(e)
+                break
+        benchmarks[module] = {"seconds": round(time.perf_counter() - start, 2), "error": error}
+        print(f"{module:25s} {benchmarks[module]['seconds']:8.2f}s {'ERROR: ' + error if error else 'ok'}",
+              file=sys.stderr)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "benchmarks": benchmarks,
+        "results": {metric: _best(metric, values) for metric, values in sorted(samples.items())},
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.15) -> List[dict]:
+    """Filas de la comparación por métrica con su estado (regression, improvement, ok, info, new, missing)"""
+    rows = []
+    before, after = baseline["results"], current["results"]
+    for metric in sorted(set(before) | set(after)):
+        old, new = before.get(metric), after.get(metric)
+        sense = direction(metric)
+        change = (new - old) / abs(old) if old not in (None, 0) and new is not None else None
+        if old is None:
+            state = "new"
+        elif new is None:
+            state = "missing"
+        elif sense is None:
+            state = "info"
+        elif sense == EXACT:
+            state = "regression" if new > old else "improvement" if new < old else "ok"
+        elif change is None:
+            state = "ok"
+        else:
+            worse = -change if sense == HIGHER else change
+            state = "regression" if worse > tolerance else "improvement" if worse < -tolerance else "ok"
+        rows.append({"metric": metric, "baseline": old, "current": new, "change": change, "state": state})
+    return rows
+
+
+def _format(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.4g}"
+
+
+def _load(path: str) -> dict:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Suite de benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="Ejecutar la suite y guardar los resultados")
+    run_parser.add_argument("--only", help="Módulos separados por comas (de la suite o extendidos)")
+    run_parser.add_argument("--all", action="store_true", help="Incluir los benchmarks extendidos")
+    run_parser.add_argument("--repeat", type=int, default=1, help="Ejecuciones por módulo; se guarda el mejor valor")
+    run_parser.add_argument("--timeout", type=float, default=1800, help="Segundos máximos por ejecución de un módulo")
+    run_parser.add_argument("--output", default=LATEST)
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"Copiar el resultado a {BASELINE}")
+    
+    compare_parser = commands.add_parser("compare", help="Comparar resultados contra una línea base")
+    compare_parser.add_argument("baseline", nargs="?", default=BASELINE)
+    compare_parser.add_argument("current", nargs="?", default=LATEST)
+    compare_parser.add_argument("--tolerance", type=float, default=0.15,
+                                help="Empeoramiento relativo admitido en tiempos y throughput")
+    compare_parser.add_argument("--all-metrics", action="store_true", help="Mostrar también las métricas sin cambios")
+    
+    commands.add_parser("list", help="Listar los módulos disponibles")
+    
+    worker_parser = commands.add_parser("worker")
+    worker_parser.add_argument("module")
+    worker_parser.add_argument("output")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "worker":
+        _worker(args.module, args.output)
+        return 0
+    
+    if args.command == "list":
+        for module in SUITE:
+            print(module)
+        for module in EXTENDED:
+            print(f"{module} (extendido)")
+        return 0
+    
+    if args.command == "run":
+        modules = list(SUITE + EXTENDED if args.all else SUITE)
+        if args.only:
+            modules = [module.strip() for module in args.only.split(",") if module.strip()]
+            unknown = [module for module in modules if module not in SUITE + EXTENDED]
+            if unknown:
+                parser.error(f"Módulos desconocidos: {', '.join(unknown)}")
+        report = run_suite(modules, repeat=args.repeat, timeout=args.timeout)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        if args.save_baseline:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            shutil.copyfile(args.output, BASELINE)
+        print(f"{len(report['results'])} métricas en {args.output}", file=sys.stderr)
+        return 1 if any(bench["error"] for bench in report["benchmarks"].values()) else 0
+    
+    baseline, current = _load(args.baseline), _load(args.current)
+    rows = compare(baseline, current, args.tolerance)
+    print(f"Línea base: {baseline.get('commit')} ({baseline.get('created_at')})  "
+          f"Actual: {current.get('commit')} ({current.get('created_at')})")
+    for row in rows:
+        if row["state"] in ("ok", "info") and not args.all_metrics:
+            continue
+        change = "" if row["change"] is None else f"{row['change']:+.1%}"
+        print(f"{row['state']:12s} {row['metric']:65s} {_format(row['baseline']):>12s} -> "
+              f"{_format(row['current']):>12s} {change:>9s}")
+    regressions = [row for row in rows if row["state"] == "regression"]
+    print(f"{len(regressions)} regresiones, {sum(row['state'] == 'improvement' for row in rows)} mejoras "
+          f"(tolerancia {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
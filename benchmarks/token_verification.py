@@ -0,0 +1,71 @@
+"""
+Benchmark de la verificación de tokens JWT.
+
+Mide `verify_token` con tokens distintos (caché vacía: verificación de
+firma), con los mismos tokens repetidos (resueltos desde `token_cache`) y
+con tokens de firma inválida, que siempre se verifican y nunca se cachean.
+
+    python -m benchmarks.token_verification
+"""
+
+import time
+
+from .common import timed
+
+from fastapi import HTTPException
+from jose import jwt
+
+from app.config.settings import settings
+from app.utils.security import token_cache, verify_token
+
+TOKENS = 2000
+
+
+def _tokens(secret: str) -> list:
+    expires = int(time.time()) + 3600
+    return [
+        jwt.encode({"sub": f"user-{index}", "exp": expires}, secret, algorithm=settings.ALGORITHM)
+        for index in range(TOKENS)
+    ]
+
+
+def _verify_all(tokens: list):
+    for token in tokens:
+        verify_token(token)
+
+
+def _verify_cold(tokens: list):
+    token_cache.clear()
+    _verify_all(tokens)
+
+
+def _reject_all(tokens: list):
+    for token in tokens:
+        try:
+            verify_token(token)
+        except HTTPException:
+            pass
+        else:
+            raise AssertionError("Se aceptó un token con firma inválida")
+
+
+def run() -> dict:
+    tokens = _tokens(settings.SECRET_KEY)
+    forged = _tokens(settings.SECRET_KEY + "-forged")
+    
+    cold = timed(_verify_cold, tokens, repeat=3)
+    _verify_cold(tokens)
+    cached = timed(_verify_all, tokens, repeat=3)
+    invalid = timed(_reject_all, forged, repeat=3)
+    assert len(token_cache) == TOKENS
+    token_cache.clear()
+    return {
+        "token_verification.cold_us": cold / TOKENS * 1e6,
+        "token_verification.cached_us": cached / TOKENS * 1e6,
+        "token_verification.invalid_us": invalid / TOKENS * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:10.2f}")
@@ -0,0 +1,56 @@
+"""
+Latencia por llamada al servicio de usuarios: cliente nuevo por petición
+frente al cliente compartido con pool de conexiones de `UserService`.
+
+    python -m benchmarks.user_client
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from .common import sqlite_session  # noqa: F401  (configura el entorno)
+from .stub_user_service import running_stub
+
+from app.services.user import UserService
+
+CALLS = 300
+
+
+async def _per_call_client(base_url: str) -> float:
+    start = time.perf_counter()
+    for index in range(CALLS):
+        async with httpx.AsyncClient() as client:
+            await client.get(f"{base_url}/api/v1/users/user-{index}")
+    return (time.perf_counter() - start) / CALLS
+
+
+async def _pooled_client(base_url: str) -> float:
+    service = UserService()
+    service.user_service_url = base_url
+    await service.startup()
+    await service.verify_user_with_service("warmup")
+    start = time.perf_counter()
+    for index in range(CALLS):
+        await service.verify_user_with_service(f"user-{index}")
+    elapsed = time.perf_counter() - start
+    await service.shutdown()
+    return elapsed / CALLS
+
+
+async def _run(base_url: str) -> dict:
+    return {
+        "user_client.per_call.latency_ms": await _per_call_client(base_url) * 1000,
+        "user_client.pooled.latency_ms": await _pooled_client(base_url) * 1000,
+    }
+
+
+def run() -> dict:
+    with running_stub() as base_url:
+        return asyncio.run(_run(base_url))
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:50s} {value:12.3f}")
@@ -0,0 +1,28 @@
+"""add payment external reference
+
+Revision ID: 3d9f1b6a8e27
+Revises: e7c2a91f5d30
+Create Date: 2026-10-17 19:12:37.884120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9f1b6a8e27'
+down_revision: Union[str, None] = 'e7c2a91f5d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('payments', sa.Column('external_reference', sa.Text(), nullable=True))
+    op.create_index('ix_payments_external_reference', 'payments', ['external_reference'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_external_reference', table_name='payments')
+    op.drop_column('payments', 'external_reference')
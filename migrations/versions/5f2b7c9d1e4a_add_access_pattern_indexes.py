@@ -0,0 +1,64 @@
+"""add access pattern indexes
+
+Revision ID: 5f2b7c9d1e4a
+Revises: cc5a0d8fb482
+Create Date: 2026-10-17 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2b7c9d1e4a'
+down_revision: Union[str, None] = 'cc5a0d8fb482'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _pending() -> dict:
+    # Predicado de los índices parciales (cuotas pendientes) en cada dialecto soportado
+    return {
+        'postgresql_where': sa.text('is_paid = false'),
+        'sqlite_where': sa.text('is_paid = 0'),
+    }
+
+
+def upgrade() -> None:
+    # credits: listados por usuario/estado ordenados por id y créditos recientes
+    op.create_index('ix_credits_user_id_id', 'credits', ['user_id', 'id'], unique=False)
+    op.create_index('ix_credits_status_id', 'credits', ['status', 'id'], unique=False)
+    op.create_index('ix_credits_created_at', 'credits', ['created_at'], unique=False)
+    
+    # payments: pagos por crédito, pagos recientes (created_at, id) y rangos de fecha
+    op.create_index('ix_payments_credit_id_id', 'payments', ['credit_id', 'id'], unique=False)
+    op.create_index('ix_payments_created_at_id', 'payments', ['created_at', 'id'], unique=False)
+    op.create_index('ix_payments_payment_date', 'payments', ['payment_date'], unique=False)
+    
+    # payment_schedule: calendario por crédito y cuotas pendientes/vencidas
+    op.create_index(
+        'ix_payment_schedule_credit_id_installment_number', 'payment_schedule',
+        ['credit_id', 'installment_number'], unique=False
+    )
+    op.create_index(
+        'ix_payment_schedule_pending_credit_id', 'payment_schedule',
+        ['credit_id', 'installment_number'], unique=False, **_pending()
+    )
+    op.create_index(
+        'ix_payment_schedule_pending_due_date', 'payment_schedule',
+        ['due_date'], unique=False, **_pending()
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_schedule_pending_due_date', table_name='payment_schedule')
+    op.drop_index('ix_payment_schedule_pending_credit_id', table_name='payment_schedule')
+    op.drop_index('ix_payment_schedule_credit_id_installment_number', table_name='payment_schedule')
+    op.drop_index('ix_payments_payment_date', table_name='payments')
+    op.drop_index('ix_payments_created_at_id', table_name='payments')
+    op.drop_index('ix_payments_credit_id_id', table_name='payments')
+    op.drop_index('ix_credits_created_at', table_name='credits')
+    op.drop_index('ix_credits_status_id', table_name='credits')
+    op.drop_index('ix_credits_user_id_id', table_name='credits')
@@ -0,0 +1,74 @@
+"""add credit rollups
+
+Revision ID: b41d7a9e03c5
+Revises: 8a3e6f2c4b71
+Create Date: 2026-10-17 15:26:41.118032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41d7a9e03c5'
+down_revision: Union[str, None] = '8a3e6f2c4b71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('credit_rollups',
+    sa.Column('credit_id', sa.Integer(), nullable=False),
+    sa.Column('payments_count', sa.Integer(), nullable=False),
+    sa.Column('total_paid', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('last_payment_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('paid_installments', sa.Integer(), nullable=False),
+    sa.Column('pending_installments', sa.Integer(), nullable=False),
+    sa.Column('paid_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('pending_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('next_due_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['credit_id'], ['credits.id'], ),
+    sa.PrimaryKeyConstraint('credit_id')
+    )
+    # Carga inicial; también disponible como `python -m app.jobs.rebuild_rollups`
+    op.execute("""
+        INSERT INTO credit_rollups (
+            credit_id, payments_count, total_paid, last_payment_date,
+            paid_installments, pending_installments, paid_amount, pending_amount, next_due_date
+        )
+        SELECT
+            c.id,
+            COALESCE(p.payments_count, 0),
+            COALESCE(p.total_paid, 0),
+            p.last_payment_date,
+            COALESCE(s.paid_installments, 0),
+            COALESCE(s.pending_installments, 0),
+            COALESCE(s.paid_amount, 0),
+            COALESCE(s.pending_amount, 0),
+            s.next_due_date
+        FROM credits c
+        LEFT JOIN (
+            SELECT credit_id, COUNT(id) AS payments_count, SUM(amount) AS total_paid,
+                   MAX(payment_date) AS last_payment_date
+            FROM payments
+            WHERE status = 'PAID'
+            GROUP BY credit_id
+        ) p ON p.credit_id = c.id
+        LEFT JOIN (
+            SELECT credit_id,
+                   COUNT(CASE WHEN is_paid THEN 1 END) AS paid_installments,
+                   COUNT(CASE WHEN NOT is_paid THEN 1 END) AS pending_installments,
+                   SUM(CASE WHEN is_paid THEN total_amount ELSE 0 END) AS paid_amount,
+                   SUM(CASE WHEN NOT is_paid THEN total_amount ELSE 0 END) AS pending_amount,
+                   MIN(CASE WHEN NOT is_paid THEN due_date END) AS next_due_date
+            FROM payment_schedule
+            GROUP BY credit_id
+        ) s ON s.credit_id = c.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('credit_rollups')
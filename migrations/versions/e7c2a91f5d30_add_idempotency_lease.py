@@ -0,0 +1,31 @@
+"""add idempotency lease
+
+Revision ID: e7c2a91f5d30
+Revises: b41d7a9e03c5
+Create Date: 2026-10-17 18:04:12.503871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c2a91f5d30'
+down_revision: Union[str, None] = 'b41d7a9e03c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('idempotency_keys', sa.Column('committed_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute('UPDATE idempotency_keys SET claimed_at = created_at')
+    with op.batch_alter_table('idempotency_keys') as batch_op:
+        batch_op.alter_column('claimed_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'committed_at')
+    op.drop_column('idempotency_keys', 'claimed_at')
@@ -0,0 +1,177 @@
+"""
+Configuración compartida de las pruebas.
+
+Las variables de entorno se fijan antes de importar la aplicación (la
+configuración y los engines se crean al importar). Sin DATABASE_URL las
+pruebas usan un SQLite temporal en disco.
+"""
+
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DIR, 'test.db')}")
+os.environ.setdefault("USER_SERVICE_URL", "http://localhost:8001")
+os.environ.setdefault("VEHICLE_SERVICE_URL", "http://localhost:8002")
+os.environ.setdefault("SERVICE_TOKEN", "test-token")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.config.settings import settings  # noqa: E402
+from app.schemas import PaymentRequest  # noqa: E402
+from app.services.payment import payment_service  # noqa: E402
+from app.models import Credit, CreditStatus, Payment, PaymentSchedule, PaymentStatus  # noqa: E402
+from app.services.user import user_service  # noqa: E402
+from app.utils.database import Base  # noqa: E402
+
+
+# Cuotas por crédito de `seed_user`: un cuarto pagadas y la mitad vencidas
+TERM = 24
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL que ejecuta un engine mientras está activo"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+    
+    def _on_execute(self, *args):
+        self.count += 1
+    
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def seed_user(db, credits: int) -> str:
+    """Usuario con `credits` créditos activos de TERM cuotas, un cuarto pagadas y la mitad vencidas"""
+    user_id = str(uuid.uuid4())
+    now = datetime.now()
+    credit_ids = db.scalars(insert(Credit).returning(Credit.id), [
+        {"user_id": user_id, "amount": Decimal("1000.00"), "interest_rate": Decimal("20.00"), "term_months": TERM,
+         "status": CreditStatus.ACTIVE, "monthly_payment": Decimal("50.90"), "remaining_balance": Decimal("1000.00")}
+        for _ in range(credits)
+    ]).all()
+    db.execute(insert(PaymentSchedule), [
+        {"credit_id": credit_id, "installment_number": number,
+         "due_date": now + timedelta(days=30 * (number - TERM // 2)),
+         "principal_amount": Decimal("34.23"), "interest_amount": Decimal("16.67"),
+         "total_amount": Decimal("50.90"), "is_paid": number <= TERM // 4}
+        for credit_id in credit_ids for number in range(1, TERM + 1)
+    ])
+    db.execute(insert(Payment), [
+        {"credit_id": credit_id, "amount": Decimal("50.90"), "payment_method": "efectivo",
+         "payment_date": now, "status": PaymentStatus.PAID}
+        for credit_id in credit_ids for _ in range(TERM // 4)
+    ])
+    db.commit()
+    return user_id
+
+
+def create_credit(db, user_id: str, balance: Decimal) -> int:
+    """Crédito activo del usuario con el saldo indicado"""
+    credit = Credit(
+        user_id=user_id, amount=balance, interest_rate=Decimal("20.00"), term_months=12,
+        status=CreditStatus.ACTIVE, monthly_payment=Decimal("1.00"), remaining_balance=balance
+    )
+    db.add(credit)
+    db.commit()
+    return credit.id
+
+
+def post_payments_concurrently(session_factory, user_id: str, credit_id: int, amount: Decimal,
+                               threads: int, attempts_per_thread: int) -> dict:
+    """Pagos de `amount` con `create_payment` desde varios hilos (una sesión cada uno); aceptados y rechazados"""
+    
+    def worker(_):
+        accepted = rejected = 0
+        db = session_factory()
+        try:
+            for _ in range(attempts_per_thread):
+                payment = PaymentRequest(credit_id=credit_id, amount=amount, payment_method="efectivo")
+                try:
+                    payment_service.create_payment(db, user_id, payment)
+                    accepted += 1
+                except ValueError:
+                    rejected += 1
+        finally:
+            db.close()
+        return accepted, rejected
+    
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, range(threads)))
+    return {
+        "accepted": sum(accepted for accepted, _ in results),
+        "rejected": sum(rejected for _, rejected in results)
+    }
+
+
+def auth_headers(user_id: str) -> dict:
+    """Encabezado Bearer con un token firmado con SECRET_KEY para el usuario"""
+    token = jwt.encode({"sub": user_id}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Fábrica de sesiones sobre un SQLite en disco propio de la prueba"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user_id() -> str:
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def query_counter(db):
+    """Fábrica de `QueryCounter` sobre el engine de `db`"""
+    return lambda: QueryCounter(db.get_bind())
+
+
+@pytest.fixture
+def seeded_user(db):
+    """Fábrica de usuarios sembrados con `seed_user` en `db`"""
+    return lambda credits: seed_user(db, credits)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente de la aplicación sobre DATABASE_URL con el servicio de usuarios simulado (rol admin)"""
+    from app.main import app
+    
+    async def user_exists(user_id: str) -> bool:
+        return True
+    
+    async def user_info(user_id: str) -> dict:
+        return {"data": {"id": user_id, "role": "admin"}, "role": "admin"}
+    
+    monkeypatch.setattr(user_service, "validate_user_exists", user_exists)
+    monkeypatch.setattr(user_service, "get_user_info", user_info)
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,173 @@
+"""
+Idempotency-Key en POST /payments: los reintentos repiten la respuesta sin
+un segundo pago, una clave reusada con otro cuerpo se rechaza y una reserva
+abandonada vence sin dejar la clave bloqueada.
+"""
+
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+
+from app.config.settings import settings
+from app.models import IdempotencyKey, Payment
+from app.schemas import PaymentRequest, PaymentResponse
+from app.services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyService
+from app.services.payment import payment_service
+from app.utils.database import SessionLocal
+
+from .conftest import auth_headers, create_credit
+
+SCOPE = "payments.create"
+BALANCE = Decimal("100.00")
+
+
+def _payments(credit_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Payment).where(Payment.credit_id == credit_id))
+
+
+@pytest.fixture
+def credit(client, user_id):
+    with SessionLocal() as db:
+        return create_credit(db, user_id, BALANCE)
+
+
+def _post(client, user_id: str, credit_id: int, key: str, amount: str = "10.00"):
+    headers = {**auth_headers(user_id), IDEMPOTENCY_HEADER: key}
+    body = {"credit_id": credit_id, "amount": amount, "payment_method": "efectivo"}
+    return client.post("/api/v1/payments/", json=body, headers=headers)
+
+
+def test_replay_returns_stored_response_without_second_payment(client, user_id, credit):
+    key = str(uuid.uuid4())
+    
+    first = _post(client, user_id, credit, key)
+    second = _post(client, user_id, credit, key)
+    
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert REPLAYED_HEADER not in first.headers
+    assert second.headers[REPLAYED_HEADER] == "true"
+    assert _payments(credit) == 1
+
+
+def test_same_key_with_different_body_is_rejected(client, user_id, credit):
+    key = str(uuid.uuid4())
+    
+    assert _post(client, user_id, credit, key).status_code == 201
+    response = _post(client, user_id, credit, key, amount="20.00")
+    
+    assert response.status_code == 422
+    assert _payments(credit) == 1
+
+
+def test_concurrent_requests_with_one_key_make_one_payment(client, user_id, credit):
+    key = str(uuid.uuid4())
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: _post(client, user_id, credit, key), range(4)))
+    
+    assert [response.status_code for response in responses] == [201] * 4
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert _payments(credit) == 1
+
+
+def _execute(service, db, user_id, key, payment, handler):
+    return service.execute(db, user_id, SCOPE, key, payment, handler, PaymentResponse, 201)
+
+
+def test_concurrent_processes_with_one_key_make_one_payment(session_factory, user_id):
+    """Dos instancias del servicio (sin caché ni SingleFlight compartidos) con sesiones propias"""
+    sessions = [session_factory() for _ in range(2)]
+    credit_id = create_credit(sessions[0], user_id, BALANCE)
+    payment = PaymentRequest(credit_id=credit_id, amount=Decimal("10.00"), payment_method="efectivo")
+    key = str(uuid.uuid4())
+    
+    def handler_for(db):
+        async def handler():
+            await asyncio.sleep(0.2)
+            return payment_service.create_payment(db, user_id, payment)
+        return handler
+    
+    async def run():
+        return await asyncio.gather(*[
+            _execute(IdempotencyService(), db, user_id, key, payment, handler_for(db)) for db in sessions
+        ])
+    
+    try:
+        responses = asyncio.run(run())
+        assert sorted(response.headers.get(REPLAYED_HEADER, "false") for response in responses) == ["false", "true"]
+        assert responses[0].body == responses[1].body
+        assert sessions[0].scalar(select(func.count()).select_from(Payment)) == 1
+    finally:
+        for db in sessions:
+            db.close()
+
+
+def _abandoned_claim(db, user_id: str, key: str, payment: PaymentRequest, committed: bool):
+    claimed_at = datetime.now() - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS + 1)
+    db.execute(insert(IdempotencyKey).values(
+        user_id=user_id, scope=SCOPE, key=key, request_hash=IdempotencyService.request_hash(payment),
+        created_at=claimed_at, claimed_at=claimed_at, committed_at=claimed_at if committed else None
+    ))
+    db.commit()
+
+
+def test_expired_claim_without_committed_work_is_taken_over(db, user_id):
+    credit_id = create_credit(db, user_id, BALANCE)
+    payment = PaymentRequest(credit_id=credit_id, amount=Decimal("10.00"), payment_method="efectivo")
+    key = str(uuid.uuid4())
+    _abandoned_claim(db, user_id, key, payment, committed=False)
+    
+    async def handler():
+        return payment_service.create_payment(db, user_id, payment)
+    
+    response = asyncio.run(_execute(IdempotencyService(), db, user_id, key, payment, handler))
+    
+    assert response.status_code == 201
+    assert REPLAYED_HEADER not in response.headers
+    assert db.scalar(select(func.count()).select_from(Payment)) == 1
+
+
+def test_expired_claim_with_committed_work_is_rejected(db, user_id):
+    credit_id = create_credit(db, user_id, BALANCE)
+    payment = PaymentRequest(credit_id=credit_id, amount=Decimal("10.00"), payment_method="efectivo")
+    key = str(uuid.uuid4())
+    _abandoned_claim(db, user_id, key, payment, committed=True)
+    
+    async def handler():
+        raise AssertionError("el trabajo confirmado no debe repetirse")
+    
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_execute(IdempotencyService(), db, user_id, key, payment, handler))
+    
+    assert error.value.status_code == 409
+    assert "se aplicó" in error.value.detail
+
+
+def test_work_committed_before_failure_keeps_the_claim(db, user_id, monkeypatch):
+    credit_id = create_credit(db, user_id, BALANCE)
+    payment = PaymentRequest(credit_id=credit_id, amount=Decimal("10.00"), payment_method="efectivo")
+    key = str(uuid.uuid4())
+    
+    async def handler():
+        payment_service.create_payment(db, user_id, payment)
+        raise RuntimeError("respuesta perdida")
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(_execute(IdempotencyService(), db, user_id, key, payment, handler))
+    
+    row = db.execute(select(IdempotencyKey.status_code, IdempotencyKey.committed_at)).one()
+    assert row.status_code is None and row.committed_at is not None
+    
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LEASE_SECONDS", 0.0)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_execute(IdempotencyService(), db, user_id, key, payment, handler))
+    assert error.value.status_code == 409
+    assert db.scalar(select(func.count()).select_from(Payment)) == 1
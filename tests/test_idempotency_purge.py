@@ -0,0 +1,34 @@
+"""
+Limpieza de Idempotency-Key vencidas por lotes.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app.config.settings import settings
+from app.models import IdempotencyKey
+from app.services.idempotency import idempotency_service
+
+
+def _seed(db, user_id: str, count: int, created_at: datetime, prefix: str):
+    db.execute(insert(IdempotencyKey), [
+        {"user_id": user_id, "scope": "payments", "key": f"{prefix}-{index}", "request_hash": "hash",
+         "status_code": 201, "response_body": {}, "created_at": created_at, "claimed_at": created_at}
+        for index in range(count)
+    ])
+    db.commit()
+
+
+def test_purge_deletes_only_expired_keys_in_chunks(db, user_id):
+    now = datetime.now()
+    _seed(db, user_id, 25, now - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS + 60), "expired")
+    _seed(db, user_id, 5, now - timedelta(seconds=60), "live")
+    
+    metrics = idempotency_service.purge_expired(db, chunk_size=10, as_of=now)
+    
+    assert metrics["deleted"] == 25
+    assert metrics["chunks"] == 3
+    remaining = db.scalars(select(IdempotencyKey.key)).all()
+    assert sorted(remaining) == [f"live-{index}" for index in range(5)]
+    assert db.scalar(select(func.count()).select_from(IdempotencyKey)) == 5
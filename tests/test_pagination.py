@@ -0,0 +1,66 @@
+"""
+Paginación por cursor: recorrer un listado página a página devuelve cada
+fila una sola vez y en el mismo orden que sin paginar.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.models import Payment, PaymentStatus
+from app.repositories import credit_repository, payment_repository
+
+from .conftest import seed_user
+
+
+def _pages(fetch, keyset, limit: int, max_pages: int = 50) -> list:
+    """Ids de todas las páginas siguiendo el cursor (acotado si el cursor no avanza)"""
+    ids, cursor = [], None
+    for _ in range(max_pages):
+        page = fetch(cursor)
+        ids.extend(item.id for item in page)
+        cursor = keyset.next_cursor(page, limit)
+        if cursor is None:
+            break
+    return ids
+
+
+def test_recent_payments_cursor_with_shared_timestamps(db):
+    credit_id = credit_repository.get_by_user(db, seed_user(db, 1))[0].id
+    # Sin created_at: CURRENT_TIMESTAMP del servidor, sin microsegundos en SQLite y compartido por el lote
+    db.execute(insert(Payment), [
+        {"credit_id": credit_id, "amount": Decimal("10.00"), "payment_method": "efectivo",
+         "payment_date": datetime.now(), "status": PaymentStatus.PAID}
+        for _ in range(7)
+    ])
+    db.commit()
+    expected = [payment.id for payment in payment_repository.get_recent_payments(db, 0, 100)]
+    
+    paged = _pages(
+        lambda cursor: payment_repository.get_recent_payments(db, 0, 2, cursor),
+        payment_repository.recent_keyset, 2
+    )
+    
+    assert paged == expected
+    assert len(set(paged)) == len(expected) == 13
+
+
+def test_recent_payments_cursor_with_shared_microsecond_timestamps(db):
+    credit_id = credit_repository.get_by_user(db, seed_user(db, 1))[0].id
+    created_at = datetime(2026, 1, 1, 10, 0, 0, 500000)
+    db.execute(insert(Payment), [
+        {"credit_id": credit_id, "amount": Decimal("10.00"), "payment_method": "efectivo",
+         "payment_date": created_at, "status": PaymentStatus.PAID, "created_at": created_at}
+        for _ in range(5)
+    ])
+    db.commit()
+    expected = [payment.id for payment in payment_repository.get_recent_payments(db, 0, 100)]
+    
+    paged = _pages(
+        lambda cursor: payment_repository.get_recent_payments(db, 0, 2, cursor),
+        payment_repository.recent_keyset, 2
+    )
+    
+    assert paged == expected
+    assert len(set(paged)) == len(expected) == 11
@@ -0,0 +1,77 @@
+"""
+Carga masiva de pagos: volver a cargar un archivo no duplica los pagos ya
+registrados (referencia externa por fila o hash del archivo y número de fila).
+"""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import Credit, Payment
+from app.repositories import payment_repository
+from app.services.payment_ingestion import payment_ingestion_service
+
+from .conftest import create_credit
+
+BALANCE = Decimal("100.00")
+
+
+def _csv(*rows: str, header: str = "credit_id,amount,payment_method") -> bytes:
+    return "\n".join([header, *rows]).encode()
+
+
+def _state(db, credit_id: int):
+    payments = db.scalar(select(func.count()).select_from(Payment).where(Payment.credit_id == credit_id))
+    return payments, db.scalar(select(Credit.remaining_balance).where(Credit.id == credit_id))
+
+
+def test_reuploading_a_file_does_not_post_twice(db, user_id):
+    credit_id = create_credit(db, user_id, BALANCE)
+    content = _csv(f"{credit_id},10,efectivo", f"{credit_id},10,efectivo")
+    
+    first = payment_ingestion_service.ingest(db, content, "csv")
+    second = payment_ingestion_service.ingest(db, content, "csv")
+    
+    assert first["accepted"] == 2
+    assert second["accepted"] == 0 and second["total_amount"] == 0
+    assert all("ya registrado" in result["error"] for result in second["results"])
+    assert _state(db, credit_id) == (2, Decimal("80.00"))
+
+
+def test_retry_after_a_failed_chunk_posts_only_the_missing_rows(db, user_id, monkeypatch):
+    credit_id = create_credit(db, user_id, BALANCE)
+    content = _csv(*[f"{credit_id},5,efectivo" for _ in range(5)])
+    copy_create = payment_repository.copy_create
+    calls = []
+    
+    def fail_second_chunk(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("conexión perdida")
+        return copy_create(*args, **kwargs)
+    
+    monkeypatch.setattr(payment_repository, "copy_create", fail_second_chunk)
+    with pytest.raises(RuntimeError):
+        payment_ingestion_service.ingest(db, content, "csv", chunk_size=2)
+    assert _state(db, credit_id) == (2, Decimal("90.00"))
+    
+    report = payment_ingestion_service.ingest(db, content, "csv", chunk_size=2)
+    
+    assert [result["accepted"] for result in report["results"]] == [False, False, True, True, True]
+    assert _state(db, credit_id) == (5, Decimal("75.00"))
+
+
+def test_explicit_references_are_unique_across_files(db, user_id):
+    credit_id = create_credit(db, user_id, BALANCE)
+    header = "credit_id,amount,payment_method,reference"
+    
+    first = payment_ingestion_service.ingest(db, _csv(f"{credit_id},10,efectivo,TX-1", header=header), "csv")
+    second = payment_ingestion_service.ingest(db, _csv(
+        f"{credit_id},10,transferencia,TX-1", f"{credit_id},10,efectivo,TX-2", f"{credit_id},10,efectivo,TX-2",
+        header=header
+    ), "csv")
+    
+    assert first["accepted"] == 1
+    assert [result["accepted"] for result in second["results"]] == [False, True, False]
+    assert _state(db, credit_id) == (2, Decimal("80.00"))
@@ -0,0 +1,46 @@
+"""
+Registro atómico de pagos: pagos concurrentes contra un mismo crédito no
+pisan el saldo ni lo dejan negativo.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models import Credit, CreditStatus, Payment
+
+from .conftest import create_credit, post_payments_concurrently
+
+AMOUNT = Decimal("7.00")
+BALANCE = Decimal("100.00")
+THREADS = 4
+ATTEMPTS_PER_THREAD = 10
+
+
+def test_concurrent_payments_never_overdraw(db, session_factory, user_id):
+    credit_id = create_credit(db, user_id, BALANCE)
+    
+    results = post_payments_concurrently(session_factory, user_id, credit_id, AMOUNT, THREADS, ATTEMPTS_PER_THREAD)
+    
+    expected_accepted = int(BALANCE // AMOUNT)
+    db.expire_all()
+    credit = db.get(Credit, credit_id)
+    payments = db.scalar(select(func.count()).select_from(Payment).where(Payment.credit_id == credit_id))
+    paid = db.scalar(select(func.sum(Payment.amount)).where(Payment.credit_id == credit_id))
+    assert results == {"accepted": expected_accepted, "rejected": THREADS * ATTEMPTS_PER_THREAD - expected_accepted}
+    assert payments == expected_accepted
+    assert credit.remaining_balance == BALANCE - paid == BALANCE - AMOUNT * expected_accepted
+    assert credit.remaining_balance >= 0
+    assert credit.status == CreditStatus.ACTIVE
+
+
+def test_payment_settling_balance_marks_credit_paid(db, session_factory, user_id):
+    credit_id = create_credit(db, user_id, AMOUNT * 3)
+    
+    results = post_payments_concurrently(session_factory, user_id, credit_id, AMOUNT, 3, 2)
+    
+    db.expire_all()
+    credit = db.get(Credit, credit_id)
+    assert results == {"accepted": 3, "rejected": 3}
+    assert credit.remaining_balance == 0
+    assert credit.status == CreditStatus.PAID
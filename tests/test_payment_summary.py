@@ -0,0 +1,37 @@
+"""
+Regresión de consultas del resumen y listado de pagos por usuario: la
+cantidad de sentencias no crece con la cantidad de créditos (sin N+1).
+"""
+
+import pytest
+
+from app.services.payment import payment_service
+
+from .conftest import TERM
+
+# Rollup (hay cuotas vencidas) + totales de pagos + agregado de cuotas
+SUMMARY_QUERY_BUDGET = 3
+LISTING_QUERY_BUDGET = 1
+
+
+@pytest.mark.parametrize("credits", [1, 50])
+def test_summary_queries_do_not_grow_with_credits(db, seeded_user, query_counter, credits):
+    user_id = seeded_user(credits)
+    
+    with query_counter() as counter:
+        summary = payment_service.calculate_payment_summary(db, user_id)
+    
+    assert counter.count <= SUMMARY_QUERY_BUDGET
+    assert summary["total_installments"] == credits * TERM
+    assert summary["total_payments"] == credits * (TERM // 4)
+
+
+@pytest.mark.parametrize("credits", [1, 50])
+def test_listing_is_a_single_query(db, seeded_user, query_counter, credits):
+    user_id = seeded_user(credits)
+    
+    with query_counter() as counter:
+        payments = payment_service.get_user_payments(db, user_id, 0, 100)
+    
+    assert counter.count <= LISTING_QUERY_BUDGET
+    assert len(payments) == min(100, credits * (TERM // 4))
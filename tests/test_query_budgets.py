@@ -0,0 +1,134 @@
+"""
+Presupuestos de consultas por ruta en modo estricto (SQL_STRICT_MODE): una
+ruta que excede su presupuesto o repite una sentencia (N+1) responde 500.
+"""
+
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.config.settings import settings
+from app.models import Credit
+from app.repositories import credit_repository
+from app.services.credit import credit_service
+from app.utils.database import Base, SessionLocal, engine
+from app.utils.query_stats import SERVER_TIMING_HEADER, QueryStatsMiddleware, query_budget
+
+from .conftest import auth_headers, seed_user
+
+CREDITS = 20
+# (ruta, presupuesto declarado); {credit_id} se reemplaza por un crédito del usuario
+BUDGETED_ROUTES = [
+    ("/api/v1/credits/", 1),
+    ("/api/v1/credits/{credit_id}", 1),
+    ("/api/v1/credits/{credit_id}/summary", 3),
+    ("/api/v1/credits/{credit_id}/check-status", 3),
+    ("/api/v1/credits/{credit_id}/payments", 2),
+    ("/api/v1/payments/", 1),
+    ("/api/v1/payments/summary", 4),
+    ("/api/v1/payments/summary?credit_id={credit_id}", 4),
+    ("/api/v1/credits/{credit_id}/schedule", 2),
+    ("/api/v1/credits/{credit_id}/with-schedule", 3),
+    ("/api/v1/schedule/overdue", 1),
+    ("/api/v1/schedule/overdue?credit_id={credit_id}", 1),
+]
+
+
+@pytest.fixture
+def strict_client(client, monkeypatch):
+    """Cliente de la aplicación con SQL_STRICT_MODE activo"""
+    monkeypatch.setattr(settings, "SQL_STRICT_MODE", True)
+    return client
+
+
+@pytest.fixture(scope="module")
+def portfolio():
+    """Usuario con varios créditos y cuotas vencidas (fuerzan la agregación de respaldo del rollup)"""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user_id = seed_user(db, CREDITS)
+        credit_ids = db.scalars(select(Credit.id).where(Credit.user_id == user_id).order_by(Credit.id)).all()
+        credit_service.rebuild_rollups(db, credit_ids=credit_ids)
+    return user_id, credit_ids[0]
+
+
+@pytest.mark.parametrize("route, budget", BUDGETED_ROUTES, ids=[route for route, _ in BUDGETED_ROUTES])
+def test_route_within_query_budget(strict_client, portfolio, route, budget):
+    user_id, credit_id = portfolio
+    
+    response = strict_client.get(route.format(credit_id=credit_id), headers=auth_headers(user_id))
+    
+    assert response.status_code == 200, response.text
+    queries = int(response.headers[SERVER_TIMING_HEADER].split('desc="')[1].split(" ")[0])
+    assert queries <= budget
+
+
+@pytest.mark.parametrize("route", ["/api/v1/credits/{credit_id}", "/api/v1/credits/{credit_id}/check-status"])
+def test_missing_credit_is_not_found(strict_client, portfolio, route):
+    user_id, _ = portfolio
+    
+    response = strict_client.get(route.format(credit_id=10 ** 9), headers=auth_headers(user_id))
+    
+    assert response.status_code == 404, response.text
+
+
+def _n_plus_one_app(credit_ids, **middleware) -> FastAPI:
+    probe = FastAPI()
+    probe.add_middleware(QueryStatsMiddleware, **middleware)
+    
+    @probe.get("/n-plus-one", dependencies=[Depends(query_budget(1))])
+    def n_plus_one():
+        with SessionLocal() as db:
+            return [credit_repository.get(db, credit_id).id for credit_id in credit_ids]
+    
+    return probe
+
+
+def test_strict_mode_fails_route_over_budget(portfolio, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_STRICT_MODE", True)
+    _, first = portfolio
+    credit_ids = list(range(first, first + settings.SQL_REPEATED_STATEMENT_LIMIT))
+    
+    response = TestClient(_n_plus_one_app(credit_ids)).get("/n-plus-one")
+    
+    assert response.status_code == 500
+    assert "presupuesto de 1" in response.json()["detail"]
+
+
+def test_strict_mode_logs_queries_after_the_response_started(portfolio, caplog):
+    _, first = portfolio
+    credit_ids = list(range(first, first + settings.SQL_REPEATED_STATEMENT_LIMIT))
+    probe = FastAPI()
+    probe.add_middleware(QueryStatsMiddleware, strict=True)
+    
+    @probe.get("/streaming", dependencies=[Depends(query_budget(1))])
+    def streaming():
+        def rows():
+            with SessionLocal() as db:
+                for credit_id in credit_ids:
+                    yield f"{credit_repository.get(db, credit_id).id}\n"
+        return StreamingResponse(rows())
+    
+    with caplog.at_level(logging.ERROR, logger="app.utils.query_stats"):
+        response = TestClient(probe).get("/streaming")
+    
+    # El cuerpo ya empezó a enviarse: el exceso solo puede registrarse
+    assert response.status_code == 200
+    assert any("después de iniciar la respuesta" in record.getMessage() for record in caplog.records)
+
+
+def test_violations_are_logged_in_production(portfolio, caplog):
+    _, first = portfolio
+    credit_ids = list(range(first, first + settings.SQL_REPEATED_STATEMENT_LIMIT))
+    
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_stats"):
+        response = TestClient(_n_plus_one_app(credit_ids, server_timing=False, strict=False)).get("/n-plus-one")
+    
+    assert response.status_code == 200
+    assert SERVER_TIMING_HEADER.lower() not in response.headers
+    assert any("presupuesto de 1" in record.getMessage() for record in caplog.records)
+    assert any("sentencia repetida" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,80 @@
+"""
+Planes de las consultas de los repositorios (EXPLAIN QUERY PLAN en SQLite):
+cada una usa su índice esperado y ninguna recorre una tabla completa.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import CreditStatus, PaymentStatus
+from app.repositories import (
+    credit_repository, credit_rollup_repository, payment_repository, payment_schedule_repository
+)
+from app.utils.query_plans import explain, full_scans, missing_indexes
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+NOW = datetime(2026, 1, 1)
+
+
+def cases():
+    """(nombre, consulta, índices que deben aparecer en el plan)"""
+    credits, payments, schedule = credit_repository, payment_repository, payment_schedule_repository
+    cursor = credits.keyset.encode(type("Row", (), {"id": 10})())
+    recent_cursor = payments.recent_keyset.encode(type("Row", (), {"created_at": NOW, "id": 10})())
+    return [
+        ("credits.get", credits.get_query(1), ["PRIMARY KEY"]),
+        ("credits.get_multi", credits.get_multi_query(0, 10, cursor), ["PRIMARY KEY"]),
+        ("credits.by_user", credits.by_user_query(USER_ID), ["ix_credits_user_id_id"]),
+        ("credits.by_user.cursor", credits.by_user_query(USER_ID, 0, 10, cursor), ["ix_credits_user_id_id"]),
+        ("credits.by_status", credits.by_status_query(CreditStatus.PENDING), ["ix_credits_status_id"]),
+        ("credits.active", credits.active_credits_query(USER_ID), ["ix_credits_user_id_id"]),
+        ("credits.overdue", credits.overdue_credits_query(), ["ix_credits_status_id"]),
+        ("credits.recent", credits.recent_credits_query(), ["ix_credits_created_at"]),
+        ("credits.payment_targets", credits.payment_targets_query([1, 2, 3]), ["PRIMARY KEY"]),
+        ("payments.by_credit", payments.by_credit_query(1), ["ix_payments_credit_id_id"]),
+        ("payments.by_user", payments.by_user_query(USER_ID),
+         ["ix_credits_user_id_id", "ix_payments_credit_id_id"]),
+        ("payments.recent", payments.recent_payments_query(), ["ix_payments_created_at_id"]),
+        ("payments.recent.cursor", payments.recent_payments_query(0, 50, recent_cursor),
+         ["ix_payments_created_at_id"]),
+        ("payments.date_range", payments.date_range_query(NOW, NOW + timedelta(days=30)),
+         ["ix_payments_payment_date"]),
+        ("payments.paid_by_credit", payments.paid_by_credit_query(1), ["ix_payments_credit_id_id"]),
+        ("payments.references", payments.references_query(["a", "b"]), ["ix_payments_external_reference"]),
+        ("payments.totals.credit", payments.totals_query(credit_id=1), ["ix_payments_credit_id_id"]),
+        ("payments.totals.user", payments.totals_query(user_id=USER_ID),
+         ["ix_credits_user_id_id", "ix_payments_credit_id_id"]),
+        ("schedule.by_credit", schedule.by_credit_query(1), ["ix_payment_schedule_credit_id_installment_number"]),
+        ("schedule.pending", schedule.pending_installments_query(1), ["ix_payment_schedule_pending_credit_id"]),
+        ("schedule.overdue", schedule.overdue_installments_query(), ["ix_payment_schedule_pending_due_date"]),
+        ("schedule.overdue.credit", schedule.overdue_installments_query(1), ["ix_payment_schedule_pending_credit_id"]),
+        ("schedule.by_number", schedule.installment_by_number_query(1, 3),
+         ["ix_payment_schedule_credit_id_installment_number"]),
+        ("schedule.summary.credit", schedule.summary_query(credit_id=1),
+         ["ix_payment_schedule_credit_id_installment_number"]),
+        ("schedule.summary.user", schedule.summary_query(user_id=USER_ID),
+         ["ix_credits_user_id_id", "ix_payment_schedule_credit_id_installment_number"]),
+        ("schedule.version", schedule.version_query(1),
+         ["ix_payment_schedule_credit_id_installment_number"]),
+        ("payments.export", payments.export_query(NOW, NOW + timedelta(days=30), PaymentStatus.PAID),
+         ["ix_payments_payment_date"]),
+        ("schedule.export.overdue", schedule.export_query(NOW, NOW + timedelta(days=30), PaymentStatus.OVERDUE, NOW),
+         ["ix_payment_schedule_pending_due_date"]),
+        ("rollups.get", credit_rollup_repository.get_query(1), ["PRIMARY KEY"]),
+        ("rollups.summary.credit", credit_rollup_repository.summary_query(credit_id=1, now=NOW), ["PRIMARY KEY"]),
+        ("rollups.summary.user", credit_rollup_repository.summary_query(user_id=USER_ID, now=NOW),
+         ["ix_credits_user_id_id"]),
+        ("rollups.total_paid", credit_rollup_repository.total_paid_query(1), ["PRIMARY KEY"]),
+    ]
+
+
+CASES = cases()
+
+
+@pytest.mark.parametrize("name, query, expected", CASES, ids=[name for name, _, _ in CASES])
+def test_query_uses_expected_index(db, name, query, expected):
+    plan = explain(db.connection(), query)
+    
+    assert missing_indexes(plan, expected) == [], plan
+    assert full_scans(plan) == [], plan
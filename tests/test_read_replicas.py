@@ -0,0 +1,85 @@
+"""
+Lecturas a réplicas con lectura de las propias escrituras, sobre dos
+archivos SQLite (primario en DATABASE_URL y una réplica sin replicación).
+"""
+
+import time
+
+import pytest
+
+from app.config.settings import settings
+from app.utils import database
+from app.utils.database import Base, ReplicaRouter, read_your_writes_cookie
+
+from .conftest import auth_headers
+
+PIN_SECONDS = 0.3
+CREDIT = {"amount": "5000", "interest_rate": "18", "term_months": 12}
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    router = ReplicaRouter(
+        [f"sqlite:///{tmp_path / 'replica.db'}"], pin_seconds=PIN_SECONDS, use_async=settings.DATABASE_ASYNC
+    )
+    Base.metadata.create_all(bind=router.engines[0])
+    monkeypatch.setattr(database, "replica_router", router)
+    yield router
+    router.engines[0].dispose()
+
+
+def _credits(client, user_id: str) -> list:
+    response = client.get("/api/v1/credits/", headers=auth_headers(user_id))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_read_after_write_goes_to_primary_until_window_expires(client, router, user_id):
+    created = client.post("/api/v1/credits/", json=CREDIT, headers=auth_headers(user_id))
+    assert created.status_code == 201, created.text
+    
+    # La réplica todavía no tiene el crédito: solo el primario lo devuelve
+    assert len(_credits(client, user_id)) == 1
+    assert router.primary_reads == 1
+    assert router.reads == [0]
+    
+    time.sleep(PIN_SECONDS + 0.1)
+    assert _credits(client, user_id) == []
+    assert router.reads == [1]
+
+
+def test_other_users_read_from_replica(client, router, user_id):
+    client.post("/api/v1/credits/", json=CREDIT, headers=auth_headers(user_id))
+    
+    other = "00000000-0000-0000-0000-000000000002"
+    assert _credits(client, other) == []
+    assert router.reads == [1]
+    assert router.primary_reads == 0
+
+
+def test_cookie_pins_reads_in_other_processes(client, router, user_id):
+    created = client.post("/api/v1/credits/", json=CREDIT, headers=auth_headers(user_id))
+    assert created.cookies.get("read_your_writes", "").startswith(f"{user_id}:")
+    
+    # Otro proceso no tiene el pin en memoria pero recibe la cookie
+    router.pins.clear()
+    assert len(_credits(client, user_id)) == 1
+    assert router.reads == [0]
+    
+    time.sleep(PIN_SECONDS + 0.1)
+    assert _credits(client, user_id) == []
+
+
+@pytest.mark.parametrize("cookie", [
+    lambda user_id: f"{user_id}:{time.time() + PIN_SECONDS:.3f}",
+    lambda user_id: f"{user_id}:{time.time() + PIN_SECONDS:.3f}:{'0' * 64}",
+    lambda user_id: read_your_writes_cookie(user_id, time.time() + 3600),
+], ids=["unsigned", "forged", "far-future"])
+def test_untrusted_cookie_does_not_pin_reads(client, router, user_id, cookie):
+    client.post("/api/v1/credits/", json=CREDIT, headers=auth_headers(user_id))
+    router.pins.clear()
+    client.cookies.clear()
+    
+    client.cookies.set(settings.READ_YOUR_WRITES_COOKIE, cookie(user_id))
+    assert _credits(client, user_id) == []
+    assert router.reads == [1]